@@ -1,87 +1,129 @@
-import numpy as np
-from mpi4py import MPI
-import openmdao.api as om
-from nrel_openmdao_extensions.intermittent_component import IntermittentComponent
-
-
-rosenbrock_size = 4
-num_procs = 2
-
-class Rosenbrock1(IntermittentComponent):
-    
-    def initialize(self):
-        # This is required only if you have something to add to the initialize(),
-        # such as OpenMDAO options declarations
-        super().initialize()
-        self.options.declare('multiplier', 1.)
-        
-    def setup(self):
-        # This is required to run the original setup() contained within IntermittentComponent
-        super().setup()
-        
-        self.add_input("x", np.ones(rosenbrock_size))
-        self.add_output("f1", 0.0)
-                
-    def internal_compute(self, inputs, outputs):
-        """
-        This is the actual method where the computations should occur.
-        """
-        x = inputs["x"]
-        x_0 = x[:-1]
-        outputs["f1"] = self.options['multiplier'] * sum((1 - x_0) ** 2)
-        
-class Rosenbrock2(IntermittentComponent):
-    
-    def initialize(self):
-        # This is required only if you have something to add to the initialize(),
-        # such as OpenMDAO options declarations
-        super().initialize()
-        self.options.declare('multiplier', 100.)
-    
-    def setup(self):
-        # This is required to run the original setup() contained within IntermittentComponent
-        super().setup()
-        
-        self.add_input("x", np.ones(rosenbrock_size))
-        self.add_output("f2", 0.0)
-                
-    def internal_compute(self, inputs, outputs):
-        """
-        This is the actual method where the computations should occur.
-        """
-        x = inputs["x"]
-        x_0 = x[:-1]
-        x_1 = x[1:]
-        outputs["f2"] = self.options['multiplier'] * sum((x_1 - x_0 ** 2) ** 2)
-
-
-prob = om.Problem(model=om.Group(num_par_fd=num_procs))
-prob.model.approx_totals(method='fd')
-indeps = prob.model.add_subsystem('indeps', om.IndepVarComp(), promotes=['*'])
-indeps.add_output('x', 1.2*np.ones(rosenbrock_size))
-
-prob.model.add_subsystem('rosenbrock1', Rosenbrock1(num_iterations_between_calls=900, multiplier=1.), promotes=['*'])
-prob.model.add_subsystem('rosenbrock2', Rosenbrock2(num_iterations_between_calls=1, multiplier=100.), promotes=['*'])
-prob.model.add_subsystem('objective_comp', om.ExecComp('f = f1 + f2'), promotes=['*'])
-
-# setup the optimization
-prob.driver = om.ScipyOptimizeDriver()
-prob.driver.options['optimizer'] = 'SLSQP'
-prob.driver.opt_settings['tol'] = 1e-9
-
-prob.model.add_design_var('x', lower=-1.5, upper=1.5)
-prob.model.add_objective('f')
-
-prob.setup()
-prob.run_driver()
-
-comm = MPI.COMM_WORLD
-rank = comm.Get_rank()
-
-if rank == 0:
-    # minimum value
-    print(f"Optimum found: {prob['f'][0]}")
-    # location of the minimum
-    print(f"Optimal design: {prob['x']}")
-    print()
-    print(f'Number of actual compute calls: {prob.model.rosenbrock1.actual_compute_calls} and {prob.model.rosenbrock2.actual_compute_calls}')
\ No newline at end of file
+import numpy as np
+from mpi4py import MPI
+import openmdao.api as om
+from nrel_openmdao_extensions.intermittent_component import IntermittentComponent
+
+
+rosenbrock_size = 4
+num_procs = 2
+
+class Rosenbrock1(IntermittentComponent):
+    
+    def initialize(self):
+        # This is required only if you have something to add to the initialize(),
+        # such as OpenMDAO options declarations
+        super().initialize()
+        self.options.declare('multiplier', 1.)
+        
+    def setup(self):
+        # This is required to run the original setup() contained within IntermittentComponent
+        super().setup()
+        
+        self.add_input("x", np.ones(rosenbrock_size))
+        self.add_output("f1", 0.0)
+                
+    def internal_compute(self, inputs, outputs):
+        """
+        This is the actual method where the computations should occur.
+        """
+        x = inputs["x"]
+        x_0 = x[:-1]
+        outputs["f1"] = self.options['multiplier'] * sum((1 - x_0) ** 2)
+        
+    def internal_compute_partials(self, inputs, partials):
+        """
+        This is only needed to extrapolate with analytic partial derivatives.
+        """
+        x = inputs["x"]
+        df1_dx = np.zeros(rosenbrock_size)
+        df1_dx[:-1] = -2 * self.options['multiplier'] * (1 - x[:-1])
+        partials["f1", "x"] = df1_dx
+        
+class Rosenbrock2(IntermittentComponent):
+    
+    def initialize(self):
+        # This is required only if you have something to add to the initialize(),
+        # such as OpenMDAO options declarations
+        super().initialize()
+        self.options.declare('multiplier', 100.)
+    
+    def setup(self):
+        # This is required to run the original setup() contained within IntermittentComponent
+        super().setup()
+        
+        self.add_input("x", np.ones(rosenbrock_size))
+        self.add_output("f2", 0.0)
+                
+    def internal_compute(self, inputs, outputs):
+        """
+        This is the actual method where the computations should occur.
+        """
+        x = inputs["x"]
+        x_0 = x[:-1]
+        x_1 = x[1:]
+        outputs["f2"] = self.options['multiplier'] * sum((x_1 - x_0 ** 2) ** 2)
+        
+    def internal_compute_partials(self, inputs, partials):
+        """
+        This is only needed to extrapolate with analytic partial derivatives.
+        """
+        x = inputs["x"]
+        residual = x[1:] - x[:-1] ** 2
+        df2_dx = np.zeros(rosenbrock_size)
+        df2_dx[1:] += 2 * self.options['multiplier'] * residual
+        df2_dx[:-1] -= 4 * self.options['multiplier'] * residual * x[:-1]
+        partials["f2", "x"] = df2_dx
+
+
+def run_optimization(rosenbrock1_options, rosenbrock2_options):
+    prob = om.Problem(model=om.Group(num_par_fd=num_procs))
+    prob.model.approx_totals(method='fd')
+    indeps = prob.model.add_subsystem('indeps', om.IndepVarComp(), promotes=['*'])
+    indeps.add_output('x', 1.2*np.ones(rosenbrock_size))
+
+    prob.model.add_subsystem('rosenbrock1', Rosenbrock1(multiplier=1., **rosenbrock1_options), promotes=['*'])
+    prob.model.add_subsystem('rosenbrock2', Rosenbrock2(multiplier=100., **rosenbrock2_options), promotes=['*'])
+    prob.model.add_subsystem('objective_comp', om.ExecComp('f = f1 + f2'), promotes=['*'])
+
+    # setup the optimization
+    prob.driver = om.ScipyOptimizeDriver()
+    prob.driver.options['optimizer'] = 'SLSQP'
+    prob.driver.options['disp'] = False
+    prob.driver.opt_settings['tol'] = 1e-9
+
+    prob.model.add_design_var('x', lower=-1.5, upper=1.5)
+    prob.model.add_objective('f')
+
+    prob.setup()
+    prob.run_driver()
+    return prob
+
+
+# The first term is frozen at the initial design while the second one is computed at
+# every call, including the finite difference steps of the gradient.
+# With extrapolation, the first term is computed every third call and follows its tangent
+# in between. The tangent needs its analytic partial derivatives at every actual call, so
+# those are counted as well.
+extrapolation = {'extrapolate': True, 'extrapolation_partials': 'analytic'}
+cases = {
+    'every call': ({'num_iterations_between_calls': 1}, {'num_iterations_between_calls': 1}),
+    'intermittent': ({'num_iterations_between_calls': 900}, {'num_iterations_between_calls': 1}),
+    'extrapolated': ({'num_iterations_between_calls': 3, **extrapolation},
+                     {'num_iterations_between_calls': 1}),
+}
+
+comm = MPI.COMM_WORLD
+rank = comm.Get_rank()
+
+for name, (rosenbrock1_options, rosenbrock2_options) in cases.items():
+    prob = run_optimization(rosenbrock1_options, rosenbrock2_options)
+
+    if rank == 0:
+        print(f"Case: {name}")
+        # minimum value
+        print(f"Optimum found: {prob['f'][0]}")
+        # location of the minimum
+        print(f"Optimal design: {prob['x']}")
+        print(f'Number of actual compute calls: {prob.model.rosenbrock1.actual_compute_calls} and {prob.model.rosenbrock2.actual_compute_calls}')
+        print(f'Number of actual compute_partials calls: {prob.model.rosenbrock1.actual_compute_partials_calls} and {prob.model.rosenbrock2.actual_compute_partials_calls}')
+        print()
@@ -0,0 +1,56 @@
+"""
+Additional drivers and components for OpenMDAO.
+
+The public classes are only imported when they are first accessed, so that importing the
+package, for instance to look up its entry points, does not import OpenMDAO or NLopt.
+"""
+
+import importlib
+
+# Module that defines each of the public classes
+_registry = {
+    "BayesianOptimizationDriver": "nrel_openmdao_extensions.bayesian_optimization_driver",
+    "NLoptDriver": "nrel_openmdao_extensions.nlopt_driver",
+    "DakotaOptimizer": "nrel_openmdao_extensions.dakota_driver",
+    "DifferentialEvolutionDriver": "nrel_openmdao_extensions.differential_evolution_driver",
+    "IntermittentComponent": "nrel_openmdao_extensions.intermittent_component",
+}
+
+__all__ = sorted(_registry)
+
+
+def __getattr__(name):
+    """
+    Import a public class on first access.
+
+    Parameters
+    ----------
+    name : str
+        Name of the attribute.
+
+    Returns
+    -------
+    type
+        The class of that name.
+    """
+    module_name = _registry.get(name)
+    if module_name is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    value = getattr(importlib.import_module(module_name), name)
+
+    # Later accesses find the class without going through this function
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    List the attributes of the package, including the classes not imported yet.
+
+    Returns
+    -------
+    list of str
+        Names of the attributes.
+    """
+    return sorted(set(globals()) | set(_registry))
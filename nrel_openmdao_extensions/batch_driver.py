@@ -0,0 +1,489 @@
+"""
+Base class of the drivers that evaluate batches of independent design points at once.
+
+A batch is evaluated on forked copies of the model, or on MPI sub-communicators, so that it
+takes about as long as one model evaluation.
+"""
+
+import multiprocessing
+import time
+import traceback
+
+import numpy as np
+
+import openmdao
+from openmdao.core.analysis_error import AnalysisError
+from openmdao.core.driver import Driver, RecordingDebugging
+from openmdao.utils.mpi import MPI
+
+from nrel_openmdao_extensions.driver_utils import (
+    can_fork,
+    constraint_violation,
+    is_better,
+    stop_recording,
+)
+
+
+class BatchDriver(Driver):
+    """
+    Base class of the drivers that evaluate batches of design points concurrently.
+
+    Every design variable needs finite bounds. Points are compared the way NLoptDriver
+    picks its best point: feasible points beat infeasible ones, then the objective or the
+    largest constraint violation decides. A point the model raises an AnalysisError on
+    loses against every other point.
+
+    Attributes
+    ----------
+    fail : bool
+        Flag that indicates that the best point of the last run is infeasible.
+    iter_count : int
+        Counter for function evaluations.
+    _concurrent_pop_size : int
+        Number of model sub-communicators that share each batch, or 0 if batches are not
+        evaluated in parallel under MPI.
+    _concurrent_color : int
+        Index of the model sub-communicator of this rank.
+    _workers : list of tuple
+        Process and parent end of the pipe of each worker process of the current run.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Initialize the BatchDriver.
+
+        Parameters
+        ----------
+        **kwargs : dict of keyword arguments
+            Keyword arguments that will be mapped into the Driver options.
+        """
+        super(BatchDriver, self).__init__(**kwargs)
+
+        # What we support
+        self.supports["inequality_constraints"] = True
+        self.supports["equality_constraints"] = True
+        self.supports["two_sided_constraints"] = True
+        self.supports["linear_constraints"] = True
+
+        # What we don't support
+        self.supports["gradients"] = False
+        self.supports["multiple_objectives"] = False
+        self.supports["active_set"] = False
+        self.supports["integer_design_vars"] = False
+        self.supports["distributed_design_vars"] = False
+        self.supports._read_only = True
+
+        self.fail = False
+        self.iter_count = 0
+        self._concurrent_pop_size = 0
+        self._concurrent_color = 0
+        self._workers = []
+
+    def _declare_options(self):
+        """
+        Declare options before kwargs are processed in the init method.
+        """
+        self.options.declare(
+            "seed",
+            None,
+            types=int,
+            allow_none=True,
+            desc="Seed of the random number generator, for repeatable runs.",
+        )
+        self.options.declare(
+            "num_procs",
+            1,
+            lower=1,
+            desc="Number of forked processes that evaluate each batch. With 1, the points "
+            "are evaluated one after the other by the model of the problem, and every "
+            "evaluation is recorded.",
+        )
+        self.options.declare(
+            "run_parallel",
+            False,
+            types=bool,
+            desc="Set to True to evaluate each batch on MPI sub-communicators.",
+        )
+        self.options.declare(
+            "procs_per_model",
+            1,
+            lower=1,
+            desc="Number of processors to give each model under MPI.",
+        )
+
+    def _setup_driver(self, problem):
+        """
+        Prepare the driver for execution.
+
+        This is the final thing to run during setup.
+
+        Parameters
+        ----------
+        problem : <Problem>
+            Pointer to the containing problem.
+        """
+        super(BatchDriver, self)._setup_driver(problem)
+
+        if self.options["num_procs"] > 1 and problem.comm.size > 1:
+            msg = "{}: Option 'num_procs' cannot be used under MPI, use 'run_parallel' instead."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        # Raises error if multiple objectives are not supported, but more objectives were defined.
+        if len(self._objs) > 1:
+            msg = "{} currently does not support multiple objectives."
+            raise RuntimeError(msg.format(self.msginfo))
+
+    def _setup_comm(self, comm):
+        """
+        Perform any driver-specific setup of communicators for the model.
+
+        Here, we generate the model communicators.
+
+        Parameters
+        ----------
+        comm : MPI.Comm or <FakeComm> or None
+            The communicator for the Problem.
+
+        Returns
+        -------
+        MPI.Comm or <FakeComm> or None
+            The communicator for the Problem model.
+        """
+        procs_per_model = self.options["procs_per_model"]
+        if MPI and self.options["run_parallel"]:
+            full_size = comm.size
+            size = full_size // procs_per_model
+            if full_size != size * procs_per_model:
+                msg = (
+                    "The total number of processors is not evenly divisible by the specified "
+                    "number of processors per model.\n Provide a number of processors that is "
+                    "a multiple of {0}, or specify a number of processors per model that "
+                    "divides into {1}."
+                )
+                raise RuntimeError(msg.format(procs_per_model, full_size))
+
+            # Each sub-communicator evaluates every size-th point of a batch
+            color = comm.rank % size
+            self._concurrent_pop_size = size
+            self._concurrent_color = color
+            return comm.Split(color)
+
+        self._concurrent_pop_size = 0
+        self._concurrent_color = 0
+        return comm
+
+    def _initial_design(self):
+        """
+        Return the initial design point and the bounds of the design variables.
+
+        Returns
+        -------
+        ndarray
+            Driver-scaled initial design point, clipped to the bounds.
+        ndarray
+            Driver-scaled lower bounds.
+        ndarray
+            Driver-scaled upper bounds.
+        """
+        for name, meta in self._designvars.items():
+            if np.any(meta["lower"] <= -openmdao.INF_BOUND) or np.any(
+                meta["upper"] >= openmdao.INF_BOUND
+            ):
+                msg = "{}: Design variable '{}' needs finite lower and upper bounds."
+                raise RuntimeError(msg.format(self.msginfo, name))
+
+        desvar_vals = self.get_design_var_values()
+        x0 = np.concatenate([np.ravel(desvar_vals[name]) for name in self._designvars])
+
+        lower = [np.broadcast_to(m["lower"], m["size"]) for m in self._designvars.values()]
+        upper = [np.broadcast_to(m["upper"], m["size"]) for m in self._designvars.values()]
+        lower = np.concatenate(lower)
+        upper = np.concatenate(upper)
+        return np.clip(x0, lower, upper), lower, upper
+
+    def _random_state(self):
+        """
+        Return the random number generator of a run, the same on every rank.
+
+        Returns
+        -------
+        RandomState
+            Random number generator seeded with the `seed` option.
+        """
+        seed = self.options["seed"]
+        comm = self._problem().comm
+        if comm.size > 1:
+            if seed is None:
+                seed = np.random.randint(2 ** 31)
+            seed = comm.bcast(seed, root=0)
+        return np.random.RandomState(seed)
+
+    def _evaluate_batch(self, points):
+        """
+        Evaluate a batch of design points.
+
+        Parameters
+        ----------
+        points : ndarray
+            Driver-scaled design points, one row per point.
+
+        Returns
+        -------
+        ndarray
+            Objective value at each point.
+        ndarray
+            Largest constraint violation at each point.
+        ndarray
+            Constraint margins at each point, one row per point.
+        """
+        num = points.shape[0]
+        start_count = self.iter_count
+        results = [None] * num
+
+        if self._concurrent_pop_size > 0:
+            size = self._concurrent_pop_size
+            local = {}
+            for k in range(self._concurrent_color, num, size):
+                local[k] = self._evaluate_candidate(points[k])
+
+            # Only the root rank of each sub-communicator shares its results
+            problem = self._problem()
+            shared = problem.comm.allgather(local if problem.model.comm.rank == 0 else {})
+            for group in shared:
+                for k, result in group.items():
+                    results[k] = result
+
+        elif self._workers:
+            num_workers = len(self._workers)
+            for w, (worker, conn) in enumerate(self._workers):
+                conn.send(points[w::num_workers])
+            errors = []
+            for w, (worker, conn) in enumerate(self._workers):
+                group, error = conn.recv()
+                if error:
+                    errors.append(error)
+                else:
+                    results[w::num_workers] = group
+            if errors:
+                raise RuntimeError("Evaluation of the batch failed:\n" + "\n".join(errors))
+
+        else:
+            results = [self._evaluate_candidate(x) for x in points]
+
+        self.iter_count = start_count + num
+        f, cv, margins = zip(*results)
+        return np.array(f), np.array(cv), np.array(margins).reshape(num, -1)
+
+    def _evaluate_candidate(self, x, record=True):
+        """
+        Run the model at a design point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        record : bool
+            If True, the evaluation is recorded.
+
+        Returns
+        -------
+        float
+            Value of the objective, or infinity if the model raised an AnalysisError.
+        float
+            Largest constraint violation, or infinity if the model raised an AnalysisError.
+        ndarray
+            Constraint margins, all infinite if the model raised an AnalysisError.
+        """
+        model = self._problem().model
+        self._set_design_point(x)
+
+        try:
+            if record:
+                with RecordingDebugging(self._get_name(), self.iter_count, self) as rec:
+                    self.iter_count += 1
+                    model.run_solve_nonlinear()
+            else:
+                self.iter_count += 1
+                model.run_solve_nonlinear()
+        except AnalysisError:
+            model._clear_iprint()
+            zeros = {name: np.zeros(meta["size"]) for name, meta in self._cons.items()}
+            return np.inf, np.inf, np.full(self._constraint_margins(zeros).size, np.inf)
+
+        f = float(list(self.get_objective_values().values())[0])
+        cons = self.get_constraint_values()
+        return f, constraint_violation(cons, self._cons), self._constraint_margins(cons)
+
+    def _constraint_margins(self, cons):
+        """
+        Return by how much every constraint bound is satisfied, as values that are at most 0.
+
+        Parameters
+        ----------
+        cons : dict
+            Driver-scaled constraint values keyed by constraint name.
+
+        Returns
+        -------
+        ndarray
+            Value minus upper bound and lower bound minus value of every bounded constraint
+            entry, and distance to the target of every equality constraint entry.
+        """
+        margins = []
+        for name, meta in self._cons.items():
+            val = np.ravel(cons[name])
+            if meta["equals"] is not None:
+                margins.append(np.abs(val - meta["equals"]))
+                continue
+
+            upper = np.broadcast_to(meta["upper"], val.shape)
+            lower = np.broadcast_to(meta["lower"], val.shape)
+            margins.append((val - upper)[upper < openmdao.INF_BOUND])
+            margins.append((lower - val)[lower > -openmdao.INF_BOUND])
+
+        if not margins:
+            return np.zeros(0)
+        return np.concatenate(margins)
+
+    def _set_design_point(self, x):
+        """
+        Pass a flattened design point to the design variables of the model.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        """
+        i = 0
+        for name, meta in self._designvars.items():
+            size = meta["size"]
+            self.set_design_var(name, x[i: i + size])
+            i += size
+
+    def _best_index(self, f, cv):
+        """
+        Return the index of the best of several points.
+
+        Parameters
+        ----------
+        f : ndarray
+            Objective value at each point.
+        cv : ndarray
+            Largest constraint violation at each point.
+
+        Returns
+        -------
+        int
+            Index of the first point that no other point beats.
+        """
+        best = 0
+        for k in range(1, f.size):
+            if is_better(f[k], cv[k], f[best], cv[best]):
+                best = k
+        return best
+
+    def _history_entry(self, f, cv, evaluations, start_time):
+        """
+        Summarize the best of the points evaluated so far for the history of the run.
+
+        Parameters
+        ----------
+        f : ndarray
+            Objective value at each point.
+        cv : ndarray
+            Largest constraint violation at each point.
+        evaluations : int
+            Number of model evaluations of the last batch.
+        start_time : float
+            Value of `time.perf_counter()` when the last batch started.
+
+        Returns
+        -------
+        dict
+            Objective value and max constraint violation of the best point, and the number
+            of model evaluations and time of the last batch.
+        """
+        best = self._best_index(f, cv)
+        return {
+            "objective": float(f[best]),
+            "max_violation": float(cv[best]),
+            "evaluations": evaluations,
+            "time": time.perf_counter() - start_time,
+        }
+
+    def _run_final(self, x):
+        """
+        Leave the model at a design point, with a recorded evaluation there.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        """
+        self._set_design_point(x)
+        with RecordingDebugging(self._get_name(), self.iter_count, self) as rec:
+            self._problem().model.run_solve_nonlinear()
+            rec.abs = 0.0
+            rec.rel = 0.0
+        self.iter_count += 1
+
+    def _start_workers(self):
+        """
+        Fork the worker processes that evaluate the batches, if more than one is used.
+        """
+        num_procs = self.options["num_procs"]
+        if num_procs < 2:
+            return
+
+        if not can_fork():
+            msg = "{}: Option 'num_procs' needs to fork processes, which this platform cannot do."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        # Workers are forked, so that they get a copy of the problem of the driver
+        ctx = multiprocessing.get_context("fork")
+        for _ in range(num_procs):
+            conn, child_conn = ctx.Pipe()
+            worker = ctx.Process(target=_batch_worker, args=(self, child_conn), daemon=True)
+            worker.start()
+            child_conn.close()
+            self._workers.append((worker, conn))
+
+    def _stop_workers(self):
+        """
+        Stop the worker processes.
+        """
+        for worker, conn in self._workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for worker, conn in self._workers:
+            worker.join()
+        self._workers = []
+
+
+def _batch_worker(driver, conn):
+    """
+    Evaluate design points in a forked process until told to stop.
+
+    Parameters
+    ----------
+    driver : BatchDriver
+        Copy of the driver, with a copy of its problem.
+    conn : multiprocessing.Connection
+        End of the pipe that design points come from and results are sent to.
+    """
+    # Only the parent process records
+    stop_recording(driver._problem())
+
+    while True:
+        points = conn.recv()
+        if points is None:
+            break
+        try:
+            conn.send(([driver._evaluate_candidate(x, record=False) for x in points], None))
+        except Exception:
+            conn.send((None, traceback.format_exc()))
+
+    conn.close()
@@ -0,0 +1,586 @@
+"""
+OpenMDAO driver for the Bayesian optimization of expensive models.
+
+Gaussian processes are fit to the objective and constraints evaluated so far, and batches of
+new points are proposed by maximizing the constrained expected improvement with the Kriging
+believer heuristic. Each batch is evaluated at once, on forked copies of the model or on MPI
+sub-communicators.
+"""
+
+import time
+
+import numpy as np
+from scipy.linalg import LinAlgError, cho_factor, cho_solve, solve_triangular
+from scipy.optimize import minimize
+from scipy.stats import norm
+
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+from nrel_openmdao_extensions.batch_driver import BatchDriver
+from nrel_openmdao_extensions.driver_utils import FEASIBILITY_TOL
+from nrel_openmdao_extensions.nlopt_driver import optimizer_methods
+
+# Derivative-free NLopt algorithms that can maximize the acquisition function within bounds
+_acquisition_optimizers = {name for name in optimizer_methods if name[:3] in ("GN_", "LN_")}
+
+# Bounds of the log10 of the length scales of the Gaussian processes, in the unit hypercube
+_LOG_LENGTH_BOUNDS = (-2.0, 1.0)
+
+# Jitter added to the diagonal of the correlation matrices of the Gaussian processes, and
+# the largest one tried when the factorization of a correlation matrix fails
+_NUGGET = 1.0e-8
+_MAX_NUGGET = 1.0e-4
+
+CITATIONS = """
+@article{jones_efficient_1998,
+ author = {Jones, Donald R. and Schonlau, Matthias and Welch, William J.},
+ title = "{Efficient Global Optimization of Expensive Black-Box Functions}",
+ journal = {Journal of Global Optimization},
+ volume = {13},
+ pages = {455--492},
+ year = {1998},
+ }
+"""
+
+
+class BayesianOptimizationDriver(BatchDriver):
+    """
+    Driver that minimizes an expensive objective with batches of Bayesian optimization.
+
+    Every design variable needs finite bounds. The initial design is a Latin hypercube
+    sample that includes the initial point. Each following batch is proposed by maximizing
+    the expected improvement of the objective times the probability that every constraint
+    is satisfied, with the Kriging believer heuristic: after each proposal, the Gaussian
+    processes are conditioned on their own prediction there.
+
+    Attributes
+    ----------
+    batch_history : list of dict
+        One entry per batch of the last run, starting with the initial design, with the
+        objective value and max constraint violation of the best point so far, and the
+        number of model evaluations and time of the batch.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Initialize the BayesianOptimizationDriver.
+
+        Parameters
+        ----------
+        **kwargs : dict of keyword arguments
+            Keyword arguments that will be mapped into the Driver options.
+        """
+        super(BayesianOptimizationDriver, self).__init__(**kwargs)
+
+        self.supports._read_only = False
+        self.supports["equality_constraints"] = False
+        self.supports._read_only = True
+
+        self.batch_history = []
+
+        self.cite = CITATIONS
+
+    def _declare_options(self):
+        """
+        Declare options before kwargs are processed in the init method.
+        """
+        super(BayesianOptimizationDriver, self)._declare_options()
+
+        self.options.declare(
+            "batch_size",
+            4,
+            lower=1,
+            desc="Number of points proposed, and evaluated concurrently, per batch.",
+        )
+        self.options.declare("max_iter", 20, lower=0, desc="Maximum number of batches.")
+        self.options.declare(
+            "initial_samples",
+            0,
+            lower=0,
+            desc="Number of points of the initial design. If 0, twice the number of design "
+            "variable entries plus one, rounded up to a multiple of 'batch_size'.",
+        )
+        self.options.declare(
+            "acquisition_optimizer",
+            "LN_COBYLA" if nlopt is not None else None,
+            values=sorted(_acquisition_optimizers) + [None],
+            allow_none=True,
+            desc="NLopt algorithm that refines the best random candidate of each proposal. "
+            "If None, the best random candidate is proposed as is.",
+        )
+        self.options.declare(
+            "acquisition_maxiter",
+            200,
+            lower=1,
+            desc="Maximum number of acquisition evaluations of the NLopt algorithm.",
+        )
+        self.options.declare(
+            "acquisition_candidates",
+            1000,
+            lower=1,
+            desc="Number of random candidates the acquisition function is evaluated at "
+            "for each proposal.",
+        )
+        self.options.declare(
+            "tol",
+            1.0e-6,
+            lower=0.0,
+            desc="The run stops once a feasible point has been found and the largest "
+            "expected improvement is below this tolerance, relative to the magnitude of "
+            "the best objective value when it is larger than 1.",
+        )
+
+    def _get_name(self):
+        """
+        Get name of current optimizer.
+
+        Returns
+        -------
+        str
+            The name of the current optimizer.
+        """
+        return "BayesianOptimization"
+
+    def _setup_driver(self, problem):
+        """
+        Prepare the driver for execution.
+
+        This is the final thing to run during setup.
+
+        Parameters
+        ----------
+        problem : <Problem>
+            Pointer to the containing problem.
+        """
+        super(BayesianOptimizationDriver, self)._setup_driver(problem)
+
+        if any(meta["equals"] is not None for meta in self._cons.values()):
+            msg = "{}: Equality constraints are not supported."
+            raise RuntimeError(msg.format(self.msginfo))
+
+    def run(self):
+        """
+        Optimize the problem with batches of Bayesian optimization.
+
+        Returns
+        -------
+        bool
+            Failure flag; True if the best point found is infeasible.
+        """
+        self.iter_count = 0
+        self.batch_history = []
+        self._check_for_missing_objective()
+
+        x0, lower, upper = self._initial_design()
+        nparam = x0.size
+        batch_size = self.options["batch_size"]
+        rng = self._random_state()
+
+        num_init = self.options["initial_samples"]
+        if num_init == 0:
+            num_init = -(-(2 * nparam + 1) // batch_size) * batch_size
+
+        # Latin hypercube in the unit hypercube, with the initial point first
+        u_pts = (rng.uniform(size=(num_init, nparam)) + np.array(
+            [rng.permutation(num_init) for _ in range(nparam)]
+        ).T) / num_init
+        u_pts[0] = (x0 - lower) / (upper - lower)
+
+        try:
+            self._start_workers()
+
+            start_time = time.perf_counter()
+            f, cv, margins = self._evaluate_batch(lower + u_pts * (upper - lower))
+            self.batch_history.append(self._history_entry(f, cv, num_init, start_time))
+
+            for _ in range(self.options["max_iter"]):
+                start_time = time.perf_counter()
+                gps = self._fit_models(u_pts, f, margins)
+                f_best = self._best_feasible(f, cv)
+                new_pts, improvement = self._propose_batch(gps, f_best, rng)
+
+                if f_best is not None and improvement <= self.options["tol"] * max(
+                    abs(f_best), 1.0
+                ):
+                    break
+
+                f_new, cv_new, margins_new = self._evaluate_batch(
+                    lower + new_pts * (upper - lower)
+                )
+                u_pts = np.vstack([u_pts, new_pts])
+                f = np.concatenate([f, f_new])
+                cv = np.concatenate([cv, cv_new])
+                margins = np.vstack([margins, margins_new])
+                entry = self._history_entry(f, cv, batch_size, start_time)
+                self.batch_history.append(entry)
+
+        finally:
+            self._stop_workers()
+
+        # Pull optimal parameters back into framework and re-run, so that
+        # framework is left in the right final state
+        best = self._best_index(f, cv)
+        self._run_final(lower + u_pts[best] * (upper - lower))
+
+        self.fail = bool(cv[best] > FEASIBILITY_TOL)
+        return self.fail
+
+    def _fit_models(self, u_pts, f, margins):
+        """
+        Fit a Gaussian process to the objective and to each constraint margin.
+
+        The values at points that the model failed on are replaced by the worst value
+        evaluated elsewhere.
+
+        Parameters
+        ----------
+        u_pts : ndarray
+            Design points evaluated so far, scaled to the unit hypercube.
+        f : ndarray
+            Objective value at each point.
+        margins : ndarray
+            Constraint margins at each point, one row per point.
+
+        Returns
+        -------
+        list of _GaussianProcess
+            Gaussian process of the objective, then of each constraint margin.
+        """
+        gps = []
+        for values in [f] + list(margins.T):
+            finite = np.isfinite(values)
+            if not np.any(finite):
+                msg = "{}: The model failed at every point evaluated so far."
+                raise RuntimeError(msg.format(self.msginfo))
+            values = np.where(finite, values, np.max(values[finite]))
+            gps.append(_GaussianProcess(u_pts, values))
+
+        return gps
+
+    def _best_feasible(self, f, cv):
+        """
+        Return the best objective value of the feasible points evaluated so far.
+
+        Parameters
+        ----------
+        f : ndarray
+            Objective value at each point.
+        cv : ndarray
+            Largest constraint violation at each point.
+
+        Returns
+        -------
+        float or None
+            Smallest objective value of the feasible points, or None if there are none.
+        """
+        feasible = cv <= FEASIBILITY_TOL
+        if not np.any(feasible):
+            return None
+        return float(np.min(f[feasible]))
+
+    def _propose_batch(self, gps, f_best, rng):
+        """
+        Propose the points of the next batch with the Kriging believer heuristic.
+
+        Parameters
+        ----------
+        gps : list of _GaussianProcess
+            Gaussian process of the objective, then of each constraint margin.
+        f_best : float or None
+            Best objective value of the feasible points, or None if there are none.
+        rng : RandomState
+            Random number generator of the run.
+
+        Returns
+        -------
+        ndarray
+            Proposed points scaled to the unit hypercube, one row per point.
+        float
+            Acquisition value of the first proposed point.
+        """
+        batch = []
+        first_value = None
+        for _ in range(self.options["batch_size"]):
+            u, value = self._maximize_acquisition(gps, f_best, rng)
+            if first_value is None:
+                first_value = value
+            batch.append(u)
+
+            # Believe the predictions at the proposed point, which removes its uncertainty
+            gps = [gp.condition(u, gp.predict(u[np.newaxis])[0][0]) for gp in gps]
+
+        return np.array(batch), first_value
+
+    def _maximize_acquisition(self, gps, f_best, rng):
+        """
+        Return the best point of the acquisition function found.
+
+        The best of random candidates is refined by the NLopt algorithm of the
+        `acquisition_optimizer` option.
+
+        Parameters
+        ----------
+        gps : list of _GaussianProcess
+            Gaussian process of the objective, then of each constraint margin.
+        f_best : float or None
+            Best objective value of the feasible points, or None if there are none.
+        rng : RandomState
+            Random number generator of the run.
+
+        Returns
+        -------
+        ndarray
+            Best point found, scaled to the unit hypercube.
+        float
+            Acquisition value at that point.
+        """
+        nparam = gps[0].X.shape[1]
+        candidates = rng.uniform(size=(self.options["acquisition_candidates"], nparam))
+        values = _acquisition(candidates, gps, f_best)
+        k = int(np.argmax(values))
+        u_best = candidates[k]
+        best_value = float(values[k])
+
+        algorithm = self.options["acquisition_optimizer"]
+        if algorithm is not None:
+            if nlopt is None:
+                msg = "{}: The 'acquisition_optimizer' option needs NLopt, which is not installed."
+                raise RuntimeError(msg.format(self.msginfo))
+
+            # Stochastic algorithms draw from the generator of the run, like every rank does
+            nlopt.srand(int(rng.randint(2 ** 31)))
+            opt_prob = nlopt.opt(optimizer_methods[algorithm], nparam)
+            opt_prob.set_lower_bounds(np.zeros(nparam))
+            opt_prob.set_upper_bounds(np.ones(nparam))
+            opt_prob.set_maxeval(self.options["acquisition_maxiter"])
+            opt_prob.set_max_objective(
+                lambda u, grad: float(_acquisition(u[np.newaxis], gps, f_best)[0])
+            )
+            try:
+                u = opt_prob.optimize(u_best)
+                value = opt_prob.last_optimum_value()
+            except (nlopt.RoundoffLimited, RuntimeError):
+                value = -np.inf
+            if value > best_value:
+                u_best = np.clip(u, 0.0, 1.0)
+                best_value = value
+
+        return u_best, best_value
+
+
+def _acquisition(u, gps, f_best):
+    """
+    Return the constrained expected improvement at some points.
+
+    Parameters
+    ----------
+    u : ndarray
+        Points scaled to the unit hypercube, one row per point.
+    gps : list of _GaussianProcess
+        Gaussian process of the objective, then of each constraint margin.
+    f_best : float or None
+        Best objective value of the feasible points, or None if there are none, in which
+        case the probability of feasibility alone is returned.
+
+    Returns
+    -------
+    ndarray
+        Value of the acquisition function at each point.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        feasibility = np.ones(u.shape[0])
+        for gp in gps[1:]:
+            mean, std = gp.predict(u)
+            feasibility *= np.where(std > 0.0, norm.cdf(-mean / std), mean <= 0.0)
+
+        if f_best is None:
+            return feasibility
+
+        mean, std = gps[0].predict(u)
+        z = (f_best - mean) / std
+        improvement = np.where(
+            std > 0.0,
+            (f_best - mean) * norm.cdf(z) + std * norm.pdf(z),
+            np.maximum(f_best - mean, 0.0),
+        )
+
+    return improvement * feasibility
+
+
+class _GaussianProcess(object):
+    """
+    Gaussian process regression with a Matern 5/2 kernel on the unit hypercube.
+
+    The values are standardized, the variance is the maximum likelihood estimate, and the
+    length scales of each dimension maximize the concentrated likelihood.
+
+    Attributes
+    ----------
+    X : ndarray
+        Training points, one row per point.
+    z : ndarray
+        Standardized training values.
+    log_lengths : ndarray
+        Log10 of the length scale of each dimension.
+    sigma2 : float
+        Variance of the standardized values.
+    _y_mean : float
+        Mean of the training values.
+    _y_std : float
+        Standard deviation of the training values.
+    _chol : tuple
+        Cholesky factorization of the correlation matrix of the training points.
+    _alpha : ndarray
+        Correlation matrix of the training points solved against `z`.
+    """
+
+    def __init__(self, X, y):
+        """
+        Fit the Gaussian process to training data.
+
+        Parameters
+        ----------
+        X : ndarray
+            Training points, one row per point.
+        y : ndarray
+            Training values.
+        """
+        self.X = X
+        self._y_mean = float(np.mean(y))
+        self._y_std = float(np.std(y)) or 1.0
+        self.z = (y - self._y_mean) / self._y_std
+
+        starts = [np.full(X.shape[1], start) for start in (-1.0, -0.3)]
+        bounds = [_LOG_LENGTH_BOUNDS] * X.shape[1]
+        best = None
+        for start in starts:
+            result = minimize(
+                _neg_log_likelihood, start, args=(X, self.z), method="L-BFGS-B", bounds=bounds
+            )
+            if best is None or result.fun < best.fun:
+                best = result
+        self.log_lengths = best.x
+
+        self._factorize()
+        self.sigma2 = max(float(np.dot(self.z, self._alpha)) / X.shape[0], 1e-12)
+
+    def _factorize(self):
+        """
+        Factorize the correlation matrix of the training points.
+
+        Training points that (nearly) coincide can make the matrix numerically singular, in
+        which case the nugget grows tenfold until the factorization succeeds.
+        """
+        corr = _matern(self.X, self.X, self.log_lengths)
+        unit = np.eye(corr.shape[0])
+        nugget = _NUGGET
+        while True:
+            try:
+                self._chol = cho_factor(corr + nugget * unit, lower=True)
+                break
+            except LinAlgError:
+                if nugget >= _MAX_NUGGET:
+                    raise
+                nugget *= 10.0
+        self._alpha = cho_solve(self._chol, self.z)
+
+    def predict(self, u):
+        """
+        Return the posterior mean and standard deviation at some points.
+
+        Parameters
+        ----------
+        u : ndarray
+            Points, one row per point.
+
+        Returns
+        -------
+        ndarray
+            Posterior mean at each point.
+        ndarray
+            Posterior standard deviation at each point.
+        """
+        corr = _matern(u, self.X, self.log_lengths)
+        mean = np.dot(corr, self._alpha)
+        v = solve_triangular(self._chol[0], corr.T, lower=True)
+        var = self.sigma2 * np.maximum(1.0 - np.sum(v ** 2, axis=0), 0.0)
+        return self._y_mean + self._y_std * mean, self._y_std * np.sqrt(var)
+
+    def condition(self, x, y):
+        """
+        Return the Gaussian process with one more training point and the same parameters.
+
+        Parameters
+        ----------
+        x : ndarray
+            New training point.
+        y : float
+            Value at the new training point.
+
+        Returns
+        -------
+        _GaussianProcess
+            Gaussian process conditioned on the new point.
+        """
+        gp = _GaussianProcess.__new__(_GaussianProcess)
+        gp.__dict__.update(self.__dict__)
+        gp.X = np.vstack([self.X, x])
+        gp.z = np.append(self.z, (y - self._y_mean) / self._y_std)
+        gp._factorize()
+        return gp
+
+
+def _matern(A, B, log_lengths):
+    """
+    Return the Matern 5/2 correlation between two sets of points.
+
+    Parameters
+    ----------
+    A : ndarray
+        First points, one row per point.
+    B : ndarray
+        Second points, one row per point.
+    log_lengths : ndarray
+        Log10 of the length scale of each dimension.
+
+    Returns
+    -------
+    ndarray
+        Correlation matrix, one row per point of `A`.
+    """
+    lengths = 10.0 ** log_lengths
+    diff = (A[:, np.newaxis, :] - B[np.newaxis, :, :]) / lengths
+    r = np.sqrt(5.0 * np.sum(diff ** 2, axis=2))
+    return (1.0 + r + r ** 2 / 3.0) * np.exp(-r)
+
+
+def _neg_log_likelihood(log_lengths, X, z):
+    """
+    Return the negative concentrated log-likelihood of Gaussian process length scales.
+
+    Parameters
+    ----------
+    log_lengths : ndarray
+        Log10 of the length scale of each dimension.
+    X : ndarray
+        Training points, one row per point.
+    z : ndarray
+        Standardized training values.
+
+    Returns
+    -------
+    float
+        Negative log-likelihood, up to a constant.
+    """
+    corr = _matern(X, X, log_lengths)
+    corr[np.diag_indices_from(corr)] += _NUGGET
+    try:
+        chol = cho_factor(corr, lower=True)
+    except LinAlgError:
+        return 1.0e10
+
+    sigma2 = max(float(np.dot(z, cho_solve(chol, z))) / z.size, 1e-12)
+    return 0.5 * z.size * np.log(sigma2) + np.sum(np.log(np.diag(chol[0])))
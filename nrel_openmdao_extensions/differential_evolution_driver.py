@@ -0,0 +1,255 @@
+"""
+OpenMDAO driver that runs a differential evolution, a population-based global optimizer.
+
+Every candidate of a generation is independent of the others, so the whole generation is
+evaluated at once, on forked copies of the model or on MPI sub-communicators. A generation
+then takes about as long as one model evaluation.
+"""
+
+import time
+
+import numpy as np
+
+from nrel_openmdao_extensions.batch_driver import BatchDriver
+from nrel_openmdao_extensions.driver_utils import FEASIBILITY_TOL, is_better
+
+# Mutation strategies, named after the vector that the scaled difference is added to
+_strategies = {"rand/1/bin", "best/1/bin"}
+
+CITATIONS = """
+@article{storn_differential_1997,
+ author = {Storn, Rainer and Price, Kenneth},
+ title = "{Differential Evolution - A Simple and Efficient Heuristic for Global Optimization
+          over Continuous Spaces}",
+ journal = {Journal of Global Optimization},
+ volume = {11},
+ pages = {341--359},
+ year = {1997},
+ }
+"""
+
+
+class DifferentialEvolutionDriver(BatchDriver):
+    """
+    Driver that minimizes the objective with a differential evolution.
+
+    Every design variable needs finite bounds, which the initial population is drawn within.
+    A trial candidate replaces its parent unless the parent is better, in the sense of
+    NLoptDriver: feasible candidates beat infeasible ones, then the objective or the largest
+    constraint violation decides.
+
+    Attributes
+    ----------
+    generation_history : list of dict
+        One entry per generation of the last run, with the objective value and max
+        constraint violation of its best candidate, and the number of model evaluations
+        and time it took.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Initialize the DifferentialEvolutionDriver.
+
+        Parameters
+        ----------
+        **kwargs : dict of keyword arguments
+            Keyword arguments that will be mapped into the Driver options.
+        """
+        super(DifferentialEvolutionDriver, self).__init__(**kwargs)
+
+        self.generation_history = []
+
+        self.cite = CITATIONS
+
+    def _declare_options(self):
+        """
+        Declare options before kwargs are processed in the init method.
+        """
+        super(DifferentialEvolutionDriver, self)._declare_options()
+
+        self.options.declare(
+            "pop_size",
+            0,
+            lower=0,
+            desc="Number of candidates in the population. If 0, 10 times the number of "
+            "design variable entries, and at least 5.",
+        )
+        self.options.declare(
+            "max_gen", 100, lower=0, desc="Maximum number of generations after the first one."
+        )
+        self.options.declare(
+            "strategy",
+            "rand/1/bin",
+            values=_strategies,
+            desc="Mutation strategy. 'best/1/bin' converges faster but explores less.",
+        )
+        self.options.declare(
+            "mutation",
+            0.8,
+            lower=0.0,
+            upper=2.0,
+            desc="Differential weight F that scales the difference of two candidates.",
+        )
+        self.options.declare(
+            "crossover",
+            0.9,
+            lower=0.0,
+            upper=1.0,
+            desc="Probability CR that an entry of a trial candidate comes from the mutant.",
+        )
+        self.options.declare(
+            "tol",
+            1.0e-6,
+            lower=0.0,
+            desc="The run stops once every candidate is feasible and the standard deviation "
+            "of their objective values is below this tolerance, relative to the magnitude "
+            "of their mean objective value when it is larger than 1.",
+        )
+
+    def _get_name(self):
+        """
+        Get name of current optimizer.
+
+        Returns
+        -------
+        str
+            The name of the current optimizer.
+        """
+        return "DifferentialEvolution"
+
+    def run(self):
+        """
+        Optimize the problem with the differential evolution.
+
+        Returns
+        -------
+        bool
+            Failure flag; True if the best candidate found is infeasible.
+        """
+        self.iter_count = 0
+        self.generation_history = []
+        self._check_for_missing_objective()
+
+        x0, lower, upper = self._initial_design()
+
+        pop_size = self.options["pop_size"]
+        if pop_size == 0:
+            pop_size = max(10 * x0.size, 5)
+        min_size = 4 if self.options["strategy"] == "rand/1/bin" else 3
+        if pop_size < min_size:
+            msg = "{}: Strategy '{}' needs a population of at least {} candidates."
+            raise RuntimeError(msg.format(self.msginfo, self.options["strategy"], min_size))
+
+        rng = self._random_state()
+
+        # The initial design is one of the candidates of the first generation
+        pop = lower + rng.uniform(size=(pop_size, x0.size)) * (upper - lower)
+        pop[0] = x0
+
+        try:
+            self._start_workers()
+
+            start_time = time.perf_counter()
+            f, cv, _ = self._evaluate_batch(pop)
+            self.generation_history.append(self._history_entry(f, cv, pop_size, start_time))
+
+            for _ in range(self.options["max_gen"]):
+                if self._converged(f, cv):
+                    break
+
+                start_time = time.perf_counter()
+                trials = self._trial_population(pop, f, cv, lower, upper, rng)
+                f_trial, cv_trial, _ = self._evaluate_batch(trials)
+
+                # Ties go to the trial, so that the population can move across plateaus
+                for k in range(pop_size):
+                    if not is_better(f[k], cv[k], f_trial[k], cv_trial[k]):
+                        pop[k] = trials[k]
+                        f[k] = f_trial[k]
+                        cv[k] = cv_trial[k]
+                entry = self._history_entry(f, cv, pop_size, start_time)
+                self.generation_history.append(entry)
+
+        finally:
+            self._stop_workers()
+
+        # Pull optimal parameters back into framework and re-run, so that
+        # framework is left in the right final state
+        best = self._best_index(f, cv)
+        self._run_final(pop[best])
+
+        self.fail = bool(cv[best] > FEASIBILITY_TOL)
+        return self.fail
+
+    def _trial_population(self, pop, f, cv, lower, upper, rng):
+        """
+        Build the trial candidates of the next generation by mutation and crossover.
+
+        Parameters
+        ----------
+        pop : ndarray
+            Design points of the current population, one row per candidate.
+        f : ndarray
+            Objective value of each candidate.
+        cv : ndarray
+            Largest constraint violation of each candidate.
+        lower : ndarray
+            Driver-scaled lower bounds of the design variables.
+        upper : ndarray
+            Driver-scaled upper bounds of the design variables.
+        rng : RandomState
+            Random number generator of the run.
+
+        Returns
+        -------
+        ndarray
+            Design points of the trial candidates, one row per candidate of the population.
+        """
+        pop_size, nparam = pop.shape
+        weight = self.options["mutation"]
+
+        if self.options["strategy"] == "best/1/bin":
+            base = np.tile(pop[self._best_index(f, cv)], (pop_size, 1))
+            num_picks = 2
+        else:
+            base = None
+            num_picks = 3
+
+        mutants = np.empty_like(pop)
+        for k in range(pop_size):
+            others = np.delete(np.arange(pop_size), k)
+            picks = rng.choice(others, num_picks, replace=False)
+            if base is None:
+                mutants[k] = pop[picks[0]] + weight * (pop[picks[1]] - pop[picks[2]])
+            else:
+                mutants[k] = base[k] + weight * (pop[picks[0]] - pop[picks[1]])
+
+        # Binomial crossover, with at least one entry from the mutant
+        mask = rng.uniform(size=pop.shape) < self.options["crossover"]
+        mask[np.arange(pop_size), rng.randint(nparam, size=pop_size)] = True
+        trials = np.where(mask, mutants, pop)
+
+        # Entries out of bounds go halfway between the target candidate and the bound
+        trials = np.where(trials < lower, 0.5 * (pop + lower), trials)
+        trials = np.where(trials > upper, 0.5 * (pop + upper), trials)
+        return trials
+
+    def _converged(self, f, cv):
+        """
+        Return True if every candidate is feasible and their objective values agree.
+
+        Parameters
+        ----------
+        f : ndarray
+            Objective value of each candidate.
+        cv : ndarray
+            Largest constraint violation of each candidate.
+
+        Returns
+        -------
+        bool
+            True if the population has converged.
+        """
+        if np.any(cv > FEASIBILITY_TOL):
+            return False
+        return np.std(f) <= self.options["tol"] * max(np.abs(np.mean(f)), 1.0)
@@ -0,0 +1,127 @@
+"""
+Helpers shared by the drivers of the package.
+
+They compare design points by feasibility and objective in the same way in every driver,
+and set up the forked worker processes that several drivers evaluate designs on.
+"""
+
+import multiprocessing
+
+import numpy as np
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+import openmdao
+from openmdao.recorders.recording_manager import RecordingManager
+
+# Largest constraint violation, in driver-scaled units, for which a point counts as feasible
+FEASIBILITY_TOL = 1.0e-6
+
+# NLopt result codes that count as convergence
+if nlopt is not None:
+    CONVERGED_RESULTS = {
+        nlopt.SUCCESS,
+        nlopt.STOPVAL_REACHED,
+        nlopt.FTOL_REACHED,
+        nlopt.XTOL_REACHED,
+    }
+else:
+    CONVERGED_RESULTS = set()
+
+
+def constraint_violation(cons, cons_meta):
+    """
+    Return the largest violation of any constraint bound.
+
+    Parameters
+    ----------
+    cons : dict
+        Driver-scaled constraint values keyed by constraint name.
+    cons_meta : dict
+        Metadata of the constraints of the driver, keyed by constraint name.
+
+    Returns
+    -------
+    float
+        Largest amount by which an evaluated constraint misses its bound, or 0 if all
+        are satisfied.
+    """
+    max_cv = 0.0
+    for name, meta in cons_meta.items():
+        # Partial evaluations may not have evaluated every constraint yet
+        if name not in cons:
+            continue
+
+        val = cons[name]
+        if meta["equals"] is not None:
+            viol = np.abs(val - meta["equals"])
+        else:
+            upper = meta["upper"]
+            lower = meta["lower"]
+            viol = np.zeros(np.size(val))
+            viol = np.maximum(viol, np.where(upper < openmdao.INF_BOUND, val - upper, 0.0))
+            viol = np.maximum(viol, np.where(lower > -openmdao.INF_BOUND, lower - val, 0.0))
+        if np.size(viol) > 0:
+            max_cv = max(max_cv, float(np.max(viol)))
+
+    return max_cv
+
+
+def is_better(f, max_cv, best_f, best_cv):
+    """
+    Return True if a point beats the best one so far.
+
+    Feasible points beat infeasible ones, then the objective or the violation decides.
+
+    Parameters
+    ----------
+    f : float
+        Objective value of the point.
+    max_cv : float
+        Largest constraint violation of the point.
+    best_f : float
+        Objective value of the best point.
+    best_cv : float
+        Largest constraint violation of the best point.
+
+    Returns
+    -------
+    bool
+        True if the point is better than the best one.
+    """
+    if max_cv <= FEASIBILITY_TOL:
+        return best_cv > FEASIBILITY_TOL or f < best_f
+    return best_cv > FEASIBILITY_TOL and max_cv < best_cv
+
+
+def can_fork():
+    """
+    Return True if worker processes can be forked on this platform.
+
+    Windows, for instance, only spawns processes, which do not get a copy of the problem.
+
+    Returns
+    -------
+    bool
+        True if the "fork" start method is available.
+    """
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def stop_recording(problem):
+    """
+    Detach the case recorders of a problem, so that only the parent process records.
+
+    Parameters
+    ----------
+    problem : Problem
+        Problem whose driver, systems and solvers stop recording.
+    """
+    problem.driver._rec_mgr = RecordingManager()
+    for system in problem.model.system_iter(include_self=True, recurse=True):
+        system._rec_mgr = RecordingManager()
+        for solver in (system.nonlinear_solver, system.linear_solver):
+            if solver is not None:
+                solver._rec_mgr = RecordingManager()
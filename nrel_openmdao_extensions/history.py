@@ -0,0 +1,213 @@
+"""
+Compact, array-backed history of the evaluations of an optimization.
+
+The history is stored in a single NumPy structured array that grows geometrically, so that
+appending a row is a copy into preallocated memory, and the whole trajectory can be read
+at any time without going through the case recorders.
+"""
+
+import os
+
+import numpy as np
+
+
+class EvaluationHistory(object):
+    """
+    History of design points, objective and constraint values of an optimization.
+
+    Each row holds the design point `x`, the objective `obj`, the constraint vector `con`,
+    the largest constraint violation `max_cv`, a flag `grad` telling whether derivatives
+    were computed, and the time `time` at which the row was added.
+
+    Attributes
+    ----------
+    dtype : numpy.dtype
+        Structured data type of a row.
+    filename : str or None
+        Path of the `.npy` file backing the history, or None if it is kept in memory.
+    _data : ndarray or numpy.memmap
+        Storage of the rows, of which only the first `_size` are used.
+    _size : int
+        Number of rows added so far.
+    """
+
+    def __init__(self, num_x, num_con, capacity=64, filename=None):
+        """
+        Allocate the storage.
+
+        Parameters
+        ----------
+        num_x : int
+            Size of the design vector.
+        num_con : int
+            Size of the constraint vector.
+        capacity : int
+            Number of rows allocated up front. The storage doubles whenever it is full.
+        filename : str or None
+            If given, the rows are stored in a memory-mapped `.npy` file at this path
+            instead of in memory, which suits very long runs.
+        """
+        self.dtype = np.dtype(
+            [
+                ("x", float, (num_x,)),
+                ("obj", float),
+                ("con", float, (num_con,)),
+                ("max_cv", float),
+                ("grad", bool),
+                ("time", float),
+            ]
+        )
+        self.filename = filename
+        self._size = 0
+        self._data = self._allocate(max(int(capacity), 1))
+
+    def __len__(self):
+        """
+        Return the number of rows.
+
+        Returns
+        -------
+        int
+            Number of rows added so far.
+        """
+        return self._size
+
+    def __getitem__(self, key):
+        """
+        Return a field or rows of the read-only view of the history.
+
+        Parameters
+        ----------
+        key : str, int or slice
+            Field name, or index of the rows.
+
+        Returns
+        -------
+        ndarray
+            Read-only values.
+        """
+        return self.data[key]
+
+    @property
+    def data(self):
+        """
+        Return a read-only structured view of the rows added so far.
+
+        The view shares memory with the history, so it is only valid until the next row
+        is added.
+
+        Returns
+        -------
+        ndarray
+            Structured array with one row per evaluation.
+        """
+        view = self._data[: self._size].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def append(self, x, obj, con, max_cv, grad, time):
+        """
+        Add one evaluation to the history.
+
+        Parameters
+        ----------
+        x : ndarray
+            Design point.
+        obj : float
+            Objective value.
+        con : ndarray
+            Constraint values, with NaN for those that were not evaluated.
+        max_cv : float
+            Largest constraint violation.
+        grad : bool
+            True if derivatives were computed at this point.
+        time : float
+            Time at which the evaluation finished.
+        """
+        if self._size == self._data.shape[0]:
+            self._grow()
+
+        row = self._data[self._size]
+        row["x"] = x
+        row["obj"] = obj
+        row["con"] = con
+        row["max_cv"] = max_cv
+        row["grad"] = grad
+        row["time"] = time
+        self._size += 1
+
+    def save(self, filename):
+        """
+        Write the rows added so far to a `.npy` file.
+
+        The file can be read back with `numpy.load`, using `mmap_mode="r"` for long runs.
+
+        Parameters
+        ----------
+        filename : str
+            Path of the file.
+        """
+        np.save(filename, self._data[: self._size])
+
+    def close(self):
+        """
+        Truncate the file backing the history to the rows added so far.
+
+        The rows can still be read afterwards, but no more rows can be added. This does
+        nothing for a history kept in memory.
+        """
+        if self.filename is None or not self._data.flags.writeable:
+            return
+
+        tmp_name = self.filename + ".tmp.npy"
+        np.save(tmp_name, self._data[: self._size])
+        self._data = None
+        os.replace(tmp_name, self.filename)
+        self._data = np.load(self.filename, mmap_mode="r")
+
+    def _allocate(self, capacity):
+        """
+        Allocate storage for the given number of rows.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of rows.
+
+        Returns
+        -------
+        ndarray or numpy.memmap
+            Zeroed storage.
+        """
+        if self.filename is None:
+            return np.zeros(capacity, dtype=self.dtype)
+
+        return np.lib.format.open_memmap(
+            self.filename, mode="w+", dtype=self.dtype, shape=(capacity,)
+        )
+
+    def _grow(self):
+        """
+        Double the capacity of the storage.
+        """
+        old = self._data
+        capacity = 2 * old.shape[0]
+
+        if self.filename is None:
+            self._data = np.zeros(capacity, dtype=self.dtype)
+            self._data[: self._size] = old[: self._size]
+            return
+
+        # The header of a .npy file holds its shape, so a larger file is written next to
+        # the current one and then takes its place.
+        tmp_name = self.filename + ".tmp.npy"
+        new = np.lib.format.open_memmap(
+            tmp_name, mode="w+", dtype=self.dtype, shape=(capacity,)
+        )
+        new[: self._size] = old[: self._size]
+        new.flush()
+        del new
+        self._data = None
+        del old
+        os.replace(tmp_name, self.filename)
+        self._data = np.load(self.filename, mmap_mode="r+")
@@ -1,47 +1,312 @@
-import openmdao.api as om
-
-
-class IntermittentComponent(om.ExplicitComponent):
-    
-    def initialize(self):
-        self.options.declare('num_iterations_between_calls', 3)
-        self.frozen_outputs = {}
-        self.actual_compute_calls = 0
-    
-    def compute(self, inputs, outputs):
-        """
-        This is a wrapper for the actual compute call, `internal_compute()`,
-        which calls the compute method every `num_iterations_between_calls`.
-        This allows more expensive analyses to be run less often at the expense
-        of accuracy in an optimization context.
-        If you want the compute to be run only once at the beginning of the
-        optimization, set `num_iterations_between_calls` to a very large number.
-        """
-        
-        num_iterations_between_calls = self.options['num_iterations_between_calls']
-        
-        # Determine if we are in a compute call in which we want to update the
-        # frozen outputs
-        regular_compute = (self.iter_count_without_approx % num_iterations_between_calls) == 0 and not self.under_approx
-        approx_compute = ((self.iter_count_without_approx-1) % num_iterations_between_calls) == 0 and self.under_approx
-        
-        # If we're within one of those types of compute calls, call the actual
-        # internal_compute() method to update the results
-        if regular_compute or approx_compute:
-            self.internal_compute(inputs, outputs)
-            self.actual_compute_calls += 1
-            
-            # Save off the results to the frozen_outputs dict
-            for key in outputs:
-                self.frozen_outputs[key] = outputs[key]
-        
-        # If we're using the frozen results, simply set the outputs from those results
-        else:
-            for key in outputs:
-                outputs[key] = self.frozen_outputs[key]
-                
-    def internal_compute(self, inputs, outputs):
-        """
-        This is the actual method where the computations should occur.
-        """
-        raise NotImplementedError("Please define an `internal_compute` method.")
\ No newline at end of file
+from collections import OrderedDict
+
+import numpy as np
+from openmdao.core.explicitcomponent import ExplicitComponent
+
+
+class IntermittentComponent(ExplicitComponent):
+    
+    def initialize(self):
+        self.options.declare('num_iterations_between_calls', 3)
+        self.options.declare('refresh_policy', 'interval', values=['interval', 'adaptive'],
+                             desc="'interval' calls `internal_compute` every "
+                                  "`num_iterations_between_calls` calls. 'adaptive' calls it "
+                                  "when `refresh_distance`, `error_tol` or `max_staleness` "
+                                  "says the frozen outputs are too old, and needs "
+                                  "`refresh_distance` or `max_staleness`.")
+        self.options.declare('refresh_distance', None, allow_none=True, lower=0.0,
+                             desc='Largest relative distance of any input from its value at '
+                                  'the last actual compute call, above which the adaptive '
+                                  'policy calls `internal_compute` again.')
+        self.options.declare('error_tol', None, allow_none=True, lower=0.0,
+                             desc='Largest estimated relative error of the frozen outputs '
+                                  'for the adaptive policy. The error is extrapolated from '
+                                  'how much the outputs changed per unit of input distance '
+                                  'between the last two actual compute calls.')
+        self.options.declare('max_staleness', None, allow_none=True, lower=0,
+                             desc='Largest number of calls in a row that reuse the frozen '
+                                  'outputs under the adaptive policy.')
+        self.options.declare('memo_cache_bytes', 0, types=int, lower=0,
+                             desc='Size in bytes of the cache of the exact outputs of the '
+                                  'last actual compute calls, keyed on their inputs. Calls '
+                                  'with inputs found in it get those outputs instead of '
+                                  'running `internal_compute` or using the frozen outputs. '
+                                  'The least recently used entries are evicted first. '
+                                  'If 0, there is no cache.')
+        self.options.declare('extrapolate', False, types=bool,
+                             desc='If True, calls that reuse the frozen outputs get them '
+                                  'extrapolated to first order from the inputs of the last '
+                                  'actual compute call, with the partial derivatives '
+                                  'captured there.')
+        self.options.declare('extrapolation_partials', 'fd', values=['fd', 'analytic'],
+                             desc="How the partial derivatives for `extrapolate` are "
+                                  "captured. 'fd' finite differences `internal_compute`, "
+                                  "which counts in `actual_compute_calls`. 'analytic' calls "
+                                  "`internal_compute_partials`, which counts in "
+                                  "`actual_compute_partials_calls`.")
+        self.options.declare('extrapolation_step', 1e-6, lower=0.0,
+                             desc="Step size of the 'fd' `extrapolation_partials`.")
+        self.frozen_outputs = {}
+        self._frozen_vector = None
+        self._frozen_inputs = None
+        self._frozen_jacobian = None
+        self.actual_compute_calls = 0
+        self.actual_compute_partials_calls = 0
+        self.cache_hits = 0
+        self._memo = OrderedDict()
+        self._memo_bytes = 0
+        self._reference_inputs = {}
+        self._error_rate = None
+        self._stale_calls = 0
+        self._refreshed_last = False
+    
+    def compute(self, inputs, outputs):
+        """
+        This is a wrapper for the actual compute call, `internal_compute()`,
+        which calls the compute method every `num_iterations_between_calls`.
+        This allows more expensive analyses to be run less often at the expense
+        of accuracy in an optimization context.
+        If you want the compute to be run only once at the beginning of the
+        optimization, set `num_iterations_between_calls` to a very large number.
+
+        With the 'adaptive' `refresh_policy`, the compute method is called instead
+        when the inputs have moved too far, when the estimated error of the frozen
+        outputs is too large, or when they have been reused too many times.
+
+        With `memo_cache_bytes`, inputs that have already been computed get their
+        exact outputs back from the cache, which `cache_hits` counts.
+
+        With `extrapolate`, the frozen outputs are returned as `y0 + J @ (x - x0)`,
+        where `J` holds the partial derivatives at the last actual call `x0`.
+        """
+        
+        if self.options['refresh_policy'] == 'adaptive':
+            self._adaptive_compute(inputs, outputs)
+            return
+
+        num_iterations_between_calls = self.options['num_iterations_between_calls']
+        
+        # Determine if we are in a compute call in which we want to update the
+        # frozen outputs
+        regular_compute = (self.iter_count_without_approx % num_iterations_between_calls) == 0 and not self.under_approx
+        approx_compute = ((self.iter_count_without_approx-1) % num_iterations_between_calls) == 0 and self.under_approx
+        
+        # The extrapolation already gives the derivatives around the frozen point
+        approx_compute = approx_compute and self._frozen_jacobian is None
+        
+        # If we're within one of those types of compute calls, call the actual
+        # internal_compute() method to update the results
+        if regular_compute or approx_compute:
+            self._compute_or_recall(inputs, outputs)
+            
+            # Save off the results to the frozen output vector
+            self._freeze(inputs, outputs)
+        
+        # If we're using the frozen results, simply set the outputs from those results
+        elif not self._recall(inputs, outputs):
+            outputs.set_val(self._extrapolate(inputs))
+
+    def _adaptive_compute(self, inputs, outputs):
+        """
+        Compute call of the 'adaptive' `refresh_policy`.
+        """
+        # The error rate comes from the last two actual calls, so `error_tol` alone never
+        # gets to make the second one
+        if self.options['refresh_distance'] is None and self.options['max_staleness'] is None:
+            msg = ("{}: Option refresh_policy='adaptive' requires 'refresh_distance' or "
+                   "'max_staleness'.")
+            raise RuntimeError(msg.format(self.msginfo))
+
+        # Finite differences around a point that was just computed see the actual
+        # analysis, or its extrapolation, but do not move the frozen point
+        if self.under_approx:
+            if self._refreshed_last and self._frozen_jacobian is None:
+                self._compute_or_recall(inputs, outputs)
+            elif not self._recall(inputs, outputs):
+                outputs.set_val(self._extrapolate(inputs))
+            return
+
+        distance = self._input_distance(inputs)
+        refresh = not self.frozen_outputs
+        max_staleness = self.options['max_staleness']
+        if max_staleness is not None and self._stale_calls >= max_staleness:
+            refresh = True
+        refresh_distance = self.options['refresh_distance']
+        if refresh_distance is not None and distance > refresh_distance:
+            refresh = True
+        error_tol = self.options['error_tol']
+        if error_tol is not None and self._error_rate is not None and \
+                self._error_rate * distance > error_tol:
+            refresh = True
+
+        if not refresh:
+            if not self._recall(inputs, outputs):
+                outputs.set_val(self._extrapolate(inputs))
+            self._stale_calls += 1
+            self._refreshed_last = False
+            return
+
+        self._compute_or_recall(inputs, outputs)
+
+        # How much the outputs change per unit of input distance, to estimate the error
+        # of the frozen outputs from the distance alone
+        if self.frozen_outputs and distance > 0.0:
+            predicted = self._extrapolate(inputs)
+            reference = {name: predicted[idxs]
+                         for name, idxs in self._vector_slices(outputs).items()}
+            self._error_rate = _relative_change(outputs, reference) / distance
+
+        self._freeze(inputs, outputs)
+        for key in inputs:
+            self._reference_inputs[key] = inputs[key].copy()
+        self._stale_calls = 0
+        self._refreshed_last = True
+
+    def _compute_or_recall(self, inputs, outputs):
+        """
+        Get the exact outputs from the memo cache, or from `internal_compute` otherwise.
+        """
+        if self._recall(inputs, outputs):
+            return
+
+        self.internal_compute(inputs, outputs)
+        self.actual_compute_calls += 1
+
+        budget = self.options['memo_cache_bytes']
+        if budget == 0:
+            return
+
+        key = inputs.asarray().tobytes()
+        values = outputs.asarray(copy=True)
+        size = len(key) + values.nbytes
+        if size > budget:
+            return
+
+        self._memo[key] = (values, size)
+        self._memo_bytes += size
+        while self._memo_bytes > budget:
+            self._memo_bytes -= self._memo.popitem(last=False)[1][1]
+
+    def _recall(self, inputs, outputs):
+        """
+        Set the outputs from the memo cache if it holds these inputs, and return True if so.
+        """
+        if not self._memo:
+            return False
+
+        key = inputs.asarray().tobytes()
+        entry = self._memo.get(key)
+        if entry is None:
+            return False
+
+        self._memo.move_to_end(key)
+        outputs.set_val(entry[0])
+        self.cache_hits += 1
+        return True
+
+    def _freeze(self, inputs, outputs):
+        """
+        Copy the output vector into the frozen snapshot, which `frozen_outputs` views by name.
+        """
+        data = outputs.asarray().real
+        if self._frozen_vector is not None and self._frozen_vector.shape == data.shape:
+            self._frozen_vector[:] = data
+        else:
+            self._frozen_vector = data.copy()
+            self.frozen_outputs = {
+                name: self._frozen_vector[idxs].reshape(self._var_rel2meta[name]['shape'])
+                for name, idxs in self._vector_slices(outputs).items()
+            }
+
+        if self.options['extrapolate']:
+            self._frozen_inputs = inputs.asarray().real.copy()
+            self._frozen_jacobian = self._capture_partials(inputs, outputs)
+
+    def _capture_partials(self, inputs, outputs):
+        """
+        Dense partial derivatives of the output vector with respect to the input vector.
+        """
+        x0 = inputs.asarray().real.copy()
+        y0 = outputs.asarray().real.copy()
+        jacobian = np.zeros((y0.size, x0.size))
+
+        if self.options['extrapolation_partials'] == 'analytic':
+            partials = {}
+            self.internal_compute_partials(inputs, partials)
+            self.actual_compute_partials_calls += 1
+            input_slices = self._vector_slices(inputs)
+            output_slices = self._vector_slices(outputs)
+            for (of, wrt), val in partials.items():
+                rows, cols = output_slices[of], input_slices[wrt]
+                jacobian[rows, cols] = np.reshape(val, (rows.stop - rows.start,
+                                                        cols.stop - cols.start))
+            return jacobian
+
+        saved_inputs = inputs.asarray(copy=True)
+        saved_outputs = outputs.asarray(copy=True)
+        step = self.options['extrapolation_step']
+        for j in range(x0.size):
+            x = x0.copy()
+            x[j] += step
+            inputs.set_val(x)
+            self.internal_compute(inputs, outputs)
+            self.actual_compute_calls += 1
+            jacobian[:, j] = (outputs.asarray().real - y0) / step
+
+        inputs.set_val(saved_inputs)
+        outputs.set_val(saved_outputs)
+        return jacobian
+
+    def _extrapolate(self, inputs):
+        """
+        Output vector predicted from the frozen snapshot for these inputs.
+        """
+        if self._frozen_jacobian is None:
+            return self._frozen_vector
+        step = inputs.asarray() - self._frozen_inputs
+        return self._frozen_vector + self._frozen_jacobian.dot(step)
+
+    def _vector_slices(self, vector):
+        """
+        Slices of each variable in the flat data of a vector of this component.
+        """
+        slices = {}
+        start = 0
+        for name in vector:
+            end = start + self._var_rel2meta[name]['size']
+            slices[name] = slice(start, end)
+            start = end
+        return slices
+
+    def _input_distance(self, inputs):
+        """
+        Largest relative distance of any input from its value at the last actual compute call.
+        """
+        if not self._reference_inputs:
+            return np.inf
+        return _relative_change(inputs, self._reference_inputs)
+
+    def internal_compute(self, inputs, outputs):
+        """
+        This is the actual method where the computations should occur.
+        """
+        raise NotImplementedError("Please define an `internal_compute` method.")
+
+    def internal_compute_partials(self, inputs, partials):
+        """
+        This is where the partial derivatives for the 'analytic' `extrapolation_partials`
+        should be set, as dense arrays in `partials[of, wrt]`.
+        """
+        raise NotImplementedError("Please define an `internal_compute_partials` method.")
+
+
+def _relative_change(values, reference):
+    """
+    Largest norm of the change of any variable, relative to the norm of its reference
+    value when that is larger than 1.
+    """
+    change = 0.0
+    for key, ref in reference.items():
+        diff = np.linalg.norm(np.ravel(values[key]) - np.ravel(ref))
+        change = max(change, diff / max(np.linalg.norm(ref), 1.0))
+    return change
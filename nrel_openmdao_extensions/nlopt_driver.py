@@ -1,562 +1,2556 @@
-"""
-OpenMDAO Wrapper for the NLopt package of optimizers.
-
-More info at https://nlopt.readthedocs.io/
-"""
-
-
-import numpy as np
-try:
-    import nlopt
-except ImportError:
-    nlopt = None
-
-import openmdao
-import openmdao.utils.coloring as coloring_mod
-from openmdao.core.driver import Driver, RecordingDebugging
-from openmdao.utils.general_utils import simple_warning
-from openmdao.utils.class_util import weak_method_wrapper
-
-
-# All optimizers in NLopt that we support and their corresponding package name.
-# Other optimizers could be added, but we've focused on those that can
-# handle either inequality or equality constraints.
-if nlopt is not None:
-    optimizer_methods = {
-        "GN_DIRECT": nlopt.GN_DIRECT,
-        "GN_DIRECT_L": nlopt.GN_DIRECT_L,
-        "GN_DIRECT_L_NOSCAL": nlopt.GN_DIRECT_L_NOSCAL,
-        "GN_ORIG_DIRECT": nlopt.GN_ORIG_DIRECT,
-        "GN_ORIG_DIRECT_L": nlopt.GN_ORIG_DIRECT_L,
-        "GN_AGS": nlopt.GN_AGS,
-        "GN_ISRES": nlopt.GN_ISRES,
-        "LN_COBYLA": nlopt.LN_COBYLA,
-        "LD_MMA": nlopt.LD_MMA,
-        "LD_CCSAQ": nlopt.LD_CCSAQ,
-        "LD_SLSQP": nlopt.LD_SLSQP,
-    }
-else:
-    optimizer_methods = {}
-
-_optimizers = set(optimizer_methods)
-
-# Define subsets of optimizers that support different functions
-_gradient_optimizers = {"LD_MMA", "LD_SLSQP", "LD_CCSAQ"}
-_bounds_optimizers = _optimizers
-_constraint_optimizers = {
-    "LD_SLSQP",
-    "LN_COBYLA",
-    "LD_MMA",
-    "LD_CCSAQ",
-    "GN_ORIG_DIRECT",
-    "GN_ORIG_DIRECT_L",
-    "GN_AGS",
-    "GN_ISRES",
-}
-_constraint_grad_optimizers = _gradient_optimizers & _constraint_optimizers
-_eq_constraint_optimizers = {"LD_SLSQP", "LN_COBYLA", "GN_ISRES"}
-_global_optimizers = {
-    "GN_DIRECT",
-    "GN_DIRECT_L",
-    "GN_ORIG_DIRECT",
-    "GN_ORIG_DIRECT_L",
-    "GN_DIRECT_L_NOSCAL",
-    "GN_AGS",
-    "GN_ISRES",
-}
-
-CITATIONS = """
-@article{johnson_nlopt
- author = {Johnson, Steven G.},
- title = "{The NLopt nonlinear-optimization package}",
- url = {http://github.com/stevengj/nlopt},
- }
-"""
-
-
-class NLoptDriver(Driver):
-    """
-    Driver wrapper for NLopt.
-
-    NLopt is an open-source nonlinear optimization framework.
-
-    Attributes
-    ----------
-    fail : bool
-        Flag that indicates failure of most recent optimization.
-    iter_count : int
-        Counter for function evaluations.
-    result : OptimizeResult
-        Result returned from NLopt.optimize call.
-    _con_cache : dict
-        Cached result of constraint evaluations because NLopt asks for them in a separate function.
-    _con_idx : dict
-        Used for constraint bookkeeping in the presence of 2-sided constraints.
-    _grad_cache : OrderedDict
-        Cached result of nonlinear constraint derivatives because NLopt asks for them in a separate
-        function.
-    _exc_info : 3 item tuple
-        Storage for exception and traceback information.
-    _obj_and_nlcons : list
-        List of objective + nonlinear constraints. Used to compute total derivatives
-        for all except linear constraints.
-    _dvlist : list
-        Copy of _designvars.
-    _lincongrad_cache : np.ndarray
-        Pre-calculated gradients of linear constraints.
-    """
-
-    def __init__(self, **kwargs):
-        """
-        Initialize the NLoptDriver.
-
-        Parameters
-        ----------
-        **kwargs : dict of keyword arguments
-            Keyword arguments that will be mapped into the Driver options.
-        """
-        if nlopt is None:
-            raise RuntimeError('NLoptDriver is not available, NLopt is not installed.')
-
-        super(NLoptDriver, self).__init__(**kwargs)
-
-        # What we support
-        self.supports["inequality_constraints"] = True
-        self.supports["equality_constraints"] = True
-        self.supports["two_sided_constraints"] = True
-        self.supports["linear_constraints"] = True
-        self.supports["simultaneous_derivatives"] = True
-
-        # What we don't support
-        self.supports["multiple_objectives"] = False
-        self.supports["active_set"] = False
-        self.supports["integer_design_vars"] = False
-        self.supports._read_only = True
-
-        self.result = None
-        self._grad_cache = None
-        self._con_cache = None
-        self._con_idx = {}
-        self._obj_and_nlcons = None
-        self._dvlist = None
-        self._lincongrad_cache = None
-        self.iter_count = 0
-        self._exc_info = None
-
-        self.cite = CITATIONS
-
-    def _declare_options(self):
-        """
-        Declare options before kwargs are processed in the init method.
-        """
-        self.options.declare(
-            "optimizer", "LD_SLSQP", values=_optimizers, desc="Name of optimizer to use"
-        )
-        self.options.declare(
-            "tol",
-            1.0e-6,
-            lower=0.0,
-            desc="Tolerance for termination. Based on "
-            + "relative function value change. Uses the "
-            + "method `set_ftol_rel()` from NLOpt.",
-        )
-        self.options.declare(
-            "maxiter", 200, lower=0, desc="Maximum number of iterations."
-        )
-        self.options.declare(
-            "maxtime",
-            0.0,
-            lower=0.0,
-            desc="Maximum time in seconds to perform optimization.",
-        )
-
-    def _get_name(self):
-        """
-        Get name of current optimizer.
-
-        Returns
-        -------
-        str
-            The name of the current optimizer.
-        """
-        return "NLopt" + self.options["optimizer"]
-
-    def _setup_driver(self, problem):
-        """
-        Prepare the driver for execution.
-
-        This is the final thing to run during setup.
-
-        Parameters
-        ----------
-        problem : <Problem>
-            Pointer
-        """
-        super(NLoptDriver, self)._setup_driver(problem)
-        opt = self.options["optimizer"]
-
-        self.supports._read_only = False
-        self.supports["gradients"] = opt in _gradient_optimizers
-        self.supports["inequality_constraints"] = opt in _constraint_optimizers
-        self.supports["two_sided_constraints"] = opt in _constraint_optimizers
-        self.supports["equality_constraints"] = opt in _eq_constraint_optimizers
-        self.supports._read_only = True
-
-        # Raises error if multiple objectives are not supported, but more objectives were defined.
-        if not self.supports["multiple_objectives"] and len(self._objs) > 1:
-            msg = "{} currently does not support multiple objectives."
-            raise RuntimeError(msg.format(self.msginfo))
-
-    def run(self):
-        """
-        Optimize the problem using selected NLopt optimizer.
-        """
-        problem = self._problem()
-        opt = self.options["optimizer"]
-        model = problem.model
-        self.iter_count = 0
-        self._total_jac = None
-
-        self._check_for_missing_objective()
-
-        # Initial Run
-        with RecordingDebugging(self._get_name(), self.iter_count, self) as rec:
-            model.run_solve_nonlinear()
-            self.iter_count += 1
-
-        self._con_cache = self.get_constraint_values()
-        desvar_vals = self.get_design_var_values()
-        self._dvlist = list(self._designvars)
-
-        # Size Problem
-        nparam = 0
-        for param in self._designvars.values():
-            nparam += param["size"]
-        x_init = np.empty(nparam)
-
-        # Initialize the NLopt problem with the method and number of design vars
-        opt_prob = nlopt.opt(optimizer_methods[opt], int(nparam))
-
-        # Initial Design Vars
-        i = 0
-        use_bounds = opt in _bounds_optimizers
-        if use_bounds:
-            bounds = []
-        else:
-            bounds = None
-
-        # Loop through all OpenMDAO design variables and process their bounds
-        for name, meta in self._designvars.items():
-            size = meta["size"]
-            x_init[i: i + size] = desvar_vals[name]
-            i += size
-
-            # Bounds if our optimizer supports them
-            if use_bounds:
-                meta_low = meta["lower"]
-                meta_high = meta["upper"]
-                for j in range(size):
-
-                    if isinstance(meta_low, np.ndarray):
-                        p_low = meta_low[j]
-                    else:
-                        p_low = meta_low
-
-                    if isinstance(meta_high, np.ndarray):
-                        p_high = meta_high[j]
-                    else:
-                        p_high = meta_high
-
-                    bounds.append((p_low, p_high))
-
-        # Actually add the bounds to the optimization problem.
-        if bounds is not None:
-            lower_bound, upper_bound = zip(*bounds)
-            lower = np.array([x if x is not None else -np.inf for x in lower_bound])
-            upper = np.array([x if x is not None else np.inf for x in upper_bound])
-            opt_prob.set_lower_bounds(lower)
-            opt_prob.set_upper_bounds(upper)
-
-        # Constraints
-        i = 1  # start at 1 since row 0 is the objective.  Constraints start at row 1.
-        lin_i = 0  # counter for linear constraint jacobian
-        lincons = []  # list of linear constraints
-        self._obj_and_nlcons = list(self._objs)
-
-        # Process and add constraints to the optimization problem.
-        if opt in _constraint_optimizers:
-            for name, meta in self._cons.items():
-                size = meta["global_size"] if meta["distributed"] else meta["size"]
-                upper = meta["upper"]
-                lower = meta["lower"]
-                equals = meta["equals"]
-
-                if opt in _gradient_optimizers and "linear" in meta and meta["linear"]:
-                    lincons.append(name)
-                    self._con_idx[name] = lin_i
-                    lin_i += size
-                else:
-                    self._obj_and_nlcons.append(name)
-                    self._con_idx[name] = i
-                    i += size
-
-                # Loop over every index separately,
-                # because it's easier to defined each
-                # constraint by index.
-                for j in range(size):
-
-                    # Equality constraints are added as two inequality constraints
-                    if equals is not None:
-                        args = [name, False, j]
-                        try:
-                            opt_prob.add_equality_constraint(
-                                signature_extender(
-                                    weak_method_wrapper(self, "_confunc"), args
-                                )
-                            )
-                        except ValueError:
-                            msg = (
-                                "The selected optimizer, {}, does not support"
-                                + " equality constraints. Select from {}."
-                            )
-                            raise NotImplementedError(
-                                msg.format(opt, _eq_constraint_optimizers)
-                            )
-
-                    else:
-                        # Double-sided constraints are accepted by the algorithm
-                        args = [name, False, j]
-                        opt_prob.add_inequality_constraint(
-                            signature_extender(
-                                weak_method_wrapper(self, "_confunc"), args
-                            )
-                        )
-
-                        if isinstance(upper, np.ndarray):
-                            upper = upper[j]
-
-                        if isinstance(lower, np.ndarray):
-                            lower = lower[j]
-
-                        dblcon = (upper < openmdao.INF_BOUND) and (
-                            lower > -openmdao.INF_BOUND
-                        )
-
-                        # Add extra constraint if double-sided
-                        if dblcon:
-                            args = [name, True, j]
-                            opt_prob.add_inequality_constraint(
-                                signature_extender(
-                                    weak_method_wrapper(self, "_confunc"), args
-                                )
-                            )
-
-            # precalculate gradients of linear constraints
-            if lincons:
-                self._lincongrad_cache = self._compute_totals(
-                    of=lincons, wrt=self._dvlist, return_format="array"
-                )
-            else:
-                self._lincongrad_cache = None
-
-        # compute dynamic simul deriv coloring if option is set
-        if coloring_mod._use_total_sparsity:
-            if (
-                self._coloring_info["coloring"] is None
-                and self._coloring_info["dynamic"]
-            ):
-                coloring_mod.dynamic_total_coloring(
-                    self, run_model=False, fname=self._get_total_coloring_fname()
-                )
-
-                # if the improvement wasn't large enough, turn coloring off
-                info = self._coloring_info
-                if info["coloring"] is not None:
-                    pct = info["coloring"]._solves_info()[-1]
-                    if info["min_improve_pct"] > pct:
-                        info["coloring"] = info["static"] = None
-                        simple_warning(
-                            "%s: Coloring was deactivated.  Improvement of %.1f%% was "
-                            "less than min allowed (%.1f%%)."
-                            % (self.msginfo, pct, info["min_improve_pct"])
-                        )
-
-        # Finalize the optimization problem setup and actually perform optimization
-        try:
-            if opt in _optimizers:
-                opt_prob.set_min_objective(self._objfunc)
-                opt_prob.set_ftol_rel(self.options["tol"])
-                opt_prob.set_maxeval(int(self.options["maxiter"]))
-                opt_prob.set_maxtime(self.options["maxtime"])
-                opt_prob.optimize(x_init)
-                self.result = opt_prob.last_optimize_result()
-
-            else:
-                msg = 'Optimizer "{}" is not implemented yet. Choose from: {}'
-                raise NotImplementedError(msg.format(opt, _optimizers))
-
-        # If an exception was swallowed in one of our callbacks, we want to raise it
-        except Exception as msg:
-            if self._exc_info is not None:
-                self._reraise()
-            else:
-                raise
-
-        if self._exc_info is not None:
-            self._reraise()
-
-    def _objfunc(self, x_new, grad):
-        """
-        Evaluate and return the objective function.
-
-        Model is executed here.
-
-        Parameters
-        ----------
-        x_new : ndarray
-            Array containing parameter values at new design point.
-        grad : ndarray
-            Empty array that is modified in-place with gradient information for
-            the new design point.
-
-        Returns
-        -------
-        float
-            Value of the objective function evaluated at the new design point.
-        """
-        model = self._problem().model
-
-        try:
-
-            # Pass in new parameters
-            i = 0
-            for name, meta in self._designvars.items():
-                size = meta["size"]
-                self.set_design_var(name, x_new[i: i + size])
-                i += size
-
-            with RecordingDebugging(self._get_name(), self.iter_count, self) as rec:
-                self.iter_count += 1
-
-                # This is the actual model evaluation for OpenMDAO
-                model.run_solve_nonlinear()
-
-            # Get the objective function evaluations
-            f_new = list(self.get_objective_values().values())[0]
-
-            self._con_cache = self.get_constraint_values()
-
-        except Exception as msg:
-            self._exc_info = msg
-
-        try:
-            if grad.size > 0:
-                self._grad_cache = self._compute_totals(
-                    of=self._obj_and_nlcons, wrt=self._dvlist, return_format="array"
-                )
-                grad[:] = self._grad_cache[0, :]
-
-        except Exception as msg:
-            self._exc_info = msg
-
-        return float(f_new)
-
-    def _confunc(self, x_new, grad, name, dbl, idx):
-        """
-        Return the value of the constraint function requested in args.
-
-        Note that this function is called for each constraint, so the model is only run when the
-        objective is evaluated.
-
-        Parameters
-        ----------
-        x_new : ndarray
-            Array containing parameter values at new design point.
-        grad : ndarray
-            Empty array that is modified in-place with gradient information for
-            the new design point.
-        name : string
-            Name of the constraint to be evaluated.
-        dbl : bool
-            True if double sided constraint.
-        idx : float
-            Contains index into the constraint array.
-
-        Returns
-        -------
-        float
-            Value of the constraint function.
-        """
-        if self._exc_info is not None:
-            self._reraise()
-
-        cons = self._con_cache
-        meta = self._cons[name]
-
-        if meta["linear"]:
-            grad_cache = self._lincongrad_cache
-        else:
-            grad_cache = self._grad_cache
-
-        grad_idx = self._con_idx[name] + idx
-
-        # Equality constraints
-        equals = meta["equals"]
-        if equals is not None:
-            if isinstance(equals, np.ndarray):
-                equals = equals[idx]
-            if grad.size > 0:
-                grad[:] = grad_cache[grad_idx, :]
-            return cons[name][idx] - equals
-
-        # Note, NLopt defines constraints to be satisfied when negative,
-        # which is the same as OpenMDAO.
-        upper = meta["upper"]
-        if isinstance(upper, np.ndarray):
-            upper = upper[idx]
-
-        lower = meta["lower"]
-        if isinstance(lower, np.ndarray):
-            lower = lower[idx]
-
-        if dbl or (lower <= -openmdao.INF_BOUND):
-            if grad.size > 0:
-                grad[:] = grad_cache[grad_idx, :]
-            return cons[name][idx] - upper
-        else:
-            if grad.size > 0:
-                grad[:] = -grad_cache[grad_idx, :]
-            return lower - cons[name][idx]
-
-    def _reraise(self):
-        """
-        Reraise any exception encountered when NLopt calls back into our method.
-        """
-        exc = self._exc_info
-        raise exc
-
-
-def signature_extender(fcn, extra_args):
-    """
-    Closure function, which appends extra arguments to the original function call.
-
-    The first argument is the design vector and the second is the gradient vector.
-    The possible extra arguments from the callback
-    of :func:`NLopt.optimize` are not passed to the function.
-
-    Parameters
-    ----------
-    fcn : callable
-        Function, which takes the design vector as the first argument.
-    extra_args : tuple or list
-        Extra arguments for the function
-
-    Returns
-    -------
-    callable
-        The function with the signature expected by the driver.
-    """
-    def closure(x, grad, *args):
-        return fcn(x, grad, *extra_args)
-
-    return closure
+"""
+OpenMDAO Wrapper for the NLopt package of optimizers.
+
+More info at https://nlopt.readthedocs.io/
+"""
+
+import gc
+import multiprocessing
+import queue
+import signal
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+import openmdao
+import openmdao.utils.coloring as coloring_mod
+from openmdao.core.driver import Driver, RecordingDebugging
+from openmdao.utils.general_utils import simple_warning
+from openmdao.utils.class_util import weak_method_wrapper
+from openmdao.utils.mpi import MPI
+from openmdao.utils.record_util import create_local_meta
+
+from nrel_openmdao_extensions.driver_utils import (
+    CONVERGED_RESULTS,
+    FEASIBILITY_TOL,
+    can_fork,
+    constraint_violation,
+    is_better,
+    stop_recording,
+)
+from nrel_openmdao_extensions.history import EvaluationHistory
+from nrel_openmdao_extensions.replay import ReplayDatabase
+from nrel_openmdao_extensions.scenarios import ScenarioSet
+from nrel_openmdao_extensions.telemetry import TelemetryWriter
+
+
+# All optimizers in NLopt that we support and their corresponding package name.
+# Other optimizers could be added, but we've focused on those that can
+# handle either inequality or equality constraints.
+if nlopt is not None:
+    optimizer_methods = {
+        "GN_DIRECT": nlopt.GN_DIRECT,
+        "GN_DIRECT_L": nlopt.GN_DIRECT_L,
+        "GN_DIRECT_L_NOSCAL": nlopt.GN_DIRECT_L_NOSCAL,
+        "GN_ORIG_DIRECT": nlopt.GN_ORIG_DIRECT,
+        "GN_ORIG_DIRECT_L": nlopt.GN_ORIG_DIRECT_L,
+        "GN_AGS": nlopt.GN_AGS,
+        "GN_ISRES": nlopt.GN_ISRES,
+        "LN_COBYLA": nlopt.LN_COBYLA,
+        "LD_MMA": nlopt.LD_MMA,
+        "LD_CCSAQ": nlopt.LD_CCSAQ,
+        "LD_SLSQP": nlopt.LD_SLSQP,
+        "LD_LBFGS": nlopt.LD_LBFGS,
+        "AUGLAG": nlopt.AUGLAG,
+        "G_MLSL_LDS": nlopt.G_MLSL_LDS,
+    }
+else:
+    optimizer_methods = {}
+
+_optimizers = set(optimizer_methods)
+
+# Define subsets of optimizers that support different functions
+_gradient_optimizers = {"LD_MMA", "LD_SLSQP", "LD_CCSAQ", "LD_LBFGS"}
+_bounds_optimizers = _optimizers
+_constraint_optimizers = {
+    "LD_SLSQP",
+    "LN_COBYLA",
+    "LD_MMA",
+    "LD_CCSAQ",
+    "GN_ORIG_DIRECT",
+    "GN_ORIG_DIRECT_L",
+    "GN_AGS",
+    "GN_ISRES",
+    "AUGLAG",
+}
+_constraint_grad_optimizers = _gradient_optimizers & _constraint_optimizers
+_eq_constraint_optimizers = {"LD_SLSQP", "LN_COBYLA", "GN_ISRES", "AUGLAG"}
+_global_optimizers = {
+    "GN_DIRECT",
+    "GN_DIRECT_L",
+    "GN_ORIG_DIRECT",
+    "GN_ORIG_DIRECT_L",
+    "GN_DIRECT_L_NOSCAL",
+    "GN_AGS",
+    "GN_ISRES",
+    "G_MLSL_LDS",
+}
+
+# Optimizers that use each of the tuning options, and those that AUGLAG and G_MLSL_LDS can
+# run their subproblems with
+_initial_step_optimizers = {"LN_COBYLA"}
+_population_optimizers = {"GN_ISRES", "G_MLSL_LDS"}
+_vector_storage_optimizers = {"LD_LBFGS"}
+_local_optimizer_optimizers = {"AUGLAG", "G_MLSL_LDS"}
+_local_optimizers = {"LN_COBYLA", "LD_MMA", "LD_CCSAQ", "LD_SLSQP", "LD_LBFGS"}
+
+# Fraction of the range between the bounds used as the default initial step
+_INITIAL_STEP_FRACTION = 0.1
+
+# Number of Ruiz equilibration sweeps used by the `auto_scale` option
+_NUM_SCALING_ITERATIONS = 5
+
+# Seconds that portfolio workers get to report after being told to stop, before they are killed
+_PORTFOLIO_GRACE_TIME = 5.0
+
+class _EvaluationTimeout(BaseException):
+    """
+    Raised in a model evaluation that has run for longer than the `eval_timeout` option.
+
+    It is not an Exception, so that model code catching Exception does not swallow it.
+    """
+
+    pass
+
+
+CITATIONS = """
+@article{johnson_nlopt
+ author = {Johnson, Steven G.},
+ title = "{The NLopt nonlinear-optimization package}",
+ url = {http://github.com/stevengj/nlopt},
+ }
+"""
+
+
+class NLoptDriver(Driver):
+    """
+    Driver wrapper for NLopt.
+
+    NLopt is an open-source nonlinear optimization framework.
+
+    Attributes
+    ----------
+    fail : bool
+        Flag that indicates failure of most recent optimization, which did not end with an
+        NLopt convergence result.
+    iter_count : int
+        Counter for function evaluations.
+    result : OptimizeResult
+        Result returned from NLopt.optimize call.
+    history : EvaluationHistory or None
+        Design point, objective, constraints, max constraint violation, gradient flag and
+        time of every objective evaluation of the last run, in driver units.
+    timeout_count : int
+        Number of model evaluations of the last run aborted by the `eval_timeout` option.
+    speculative_hits : int
+        Number of gradient requests of the last run served by a speculative gradient.
+    stage_history : list of dict
+        One entry per NLopt optimization performed by the last run, with the optimizer
+        name, its result code, and the number of model evaluations and time it took.
+        Every entry also gives its attempt number, 0 unless restarted, and the entries of
+        a portfolio race say whether they won it.
+    _con_cache : dict
+        Cached result of constraint evaluations because NLopt asks for them in a separate function.
+    _con_idx : dict
+        Used for constraint bookkeeping in the presence of 2-sided constraints.
+    _grad_cache : OrderedDict
+        Cached result of nonlinear constraint derivatives because NLopt asks for them in a separate
+        function.
+    _exc_info : 3 item tuple
+        Storage for exception and traceback information.
+    _obj_and_nlcons : list
+        List of objective + nonlinear constraints. Used to compute total derivatives
+        for all except linear constraints.
+    _dvlist : list
+        Copy of _designvars.
+    _lincongrad_cache : np.ndarray
+        Pre-calculated gradients of linear constraints.
+    _last_x : ndarray or None
+        Design point at which the model was last evaluated, or None if the model state
+        does not correspond to a design point given by NLopt.
+    _last_eval : tuple or None
+        Objective value and constraint values of the model at `_last_x`.
+    _root_comm : MPI.Comm or None
+        Communicator of the model when NLopt only runs on its root rank, otherwise None.
+    _telemetry : TelemetryWriter or None
+        Writer for the JSON-lines telemetry stream, active only during `run()`.
+    _start_time : float
+        Value of `time.perf_counter()` at the start of the current run.
+    _eval_cache : OrderedDict
+        Objective value, constraint values and max constraint violation of recent
+        evaluations, keyed by the bytes of the design point.
+    _best : tuple or None
+        Objective value, max constraint violation and design point of the best point
+        evaluated so far, preferring feasible points.
+    _lower : ndarray
+        Lower bounds of the flattened design variables.
+    _upper : ndarray
+        Upper bounds of the flattened design variables.
+    _nlopt_con_args : list of tuple
+        Constraint name, double-sided flag, index and equality flag of every scalar
+        constraint given to NLopt.
+    _x_scale : ndarray
+        Factors that turn the design point seen by NLopt back into driver units.
+    _obj_scale : float
+        Factor applied to the objective seen by NLopt.
+    _con_scale : dict
+        Factors applied to the constraints seen by NLopt, keyed by constraint name.
+    _response_systems : dict or None
+        Names of the top-level subsystems that each response depends on, keyed by response
+        name, or None if partial evaluation is not active.
+    _fresh_systems : set or None
+        Names of the top-level subsystems that have been run at `_last_x`, or None if the
+        whole model has been run there.
+    _layout_key : tuple or None
+        Problem metadata and signature of the layout computed by the last run, used to
+        detect that the next run can reuse it.
+    _nlopt_problems : dict
+        NLopt problems built for the current layout, keyed by algorithm name.
+    _jac_blocks : list or None
+        Names, first row and end row of each block of responses whose total derivatives
+        are computed together when `jac_memory_limit` is set, or None otherwise.
+    _grad_block : tuple or None
+        First row, end row and total derivatives of the block computed last at `_last_x`.
+    _grad_executor : ThreadPoolExecutor or None
+        Background thread computing speculative gradients during a stage, if enabled.
+    _speculative_grad : tuple or None
+        Bytes of the design point and future of the speculative gradient in progress.
+    _totals_plan : _TotalJacInfo or None
+        Total derivative plan of the objective and nonlinear constraints built for the
+        current layout, reused by every gradient evaluation of the following runs.
+    _portfolio_shared : tuple or None
+        Stop event, shared best point and worker index of a portfolio race, only set in
+        the worker processes.
+    _proxy : ReplayDatabase or ScenarioSet or None
+        Object that answers the function and gradient requests of the current run instead
+        of the model of the problem, if any.
+    _penalized : bool
+        True if the evaluation at `_last_x` was aborted by the `eval_timeout` option and
+        its responses replaced by the penalty.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Initialize the NLoptDriver.
+
+        Parameters
+        ----------
+        **kwargs : dict of keyword arguments
+            Keyword arguments that will be mapped into the Driver options.
+        """
+        if nlopt is None:
+            raise RuntimeError('NLoptDriver is not available, NLopt is not installed.')
+
+        super(NLoptDriver, self).__init__(**kwargs)
+
+        # What we support
+        self.supports["inequality_constraints"] = True
+        self.supports["equality_constraints"] = True
+        self.supports["two_sided_constraints"] = True
+        self.supports["linear_constraints"] = True
+        self.supports["simultaneous_derivatives"] = True
+        self.supports["distributed_design_vars"] = True
+
+        # What we don't support
+        self.supports["multiple_objectives"] = False
+        self.supports["active_set"] = False
+        self.supports["integer_design_vars"] = False
+        self.supports._read_only = True
+
+        self.fail = False
+        self.result = None
+        self.history = None
+        self._grad_cache = None
+        self._con_cache = None
+        self._con_idx = {}
+        self._obj_and_nlcons = None
+        self._dvlist = None
+        self._lincongrad_cache = None
+        self.iter_count = 0
+        self._exc_info = None
+        self._last_x = None
+        self._last_eval = None
+        self._root_comm = None
+        self._telemetry = None
+        self._start_time = 0.0
+        self._eval_cache = OrderedDict()
+        self._best = None
+        self._lower = None
+        self._upper = None
+        self._nlopt_con_args = []
+        self._x_scale = None
+        self._obj_scale = 1.0
+        self._con_scale = {}
+        self._response_systems = None
+        self._fresh_systems = None
+        self._layout_key = None
+        self._nlopt_problems = {}
+        self._totals_plan = None
+        self._jac_blocks = None
+        self._grad_block = None
+        self._grad_executor = None
+        self._speculative_grad = None
+        self._portfolio_shared = None
+        self._proxy = None
+        self._penalized = False
+        self.timeout_count = 0
+        self.speculative_hits = 0
+        self.stage_history = []
+
+        self.cite = CITATIONS
+
+    def _declare_options(self):
+        """
+        Declare options before kwargs are processed in the init method.
+        """
+        self.options.declare(
+            "optimizer", "LD_SLSQP", values=_optimizers, desc="Name of optimizer to use"
+        )
+        self.options.declare(
+            "tol",
+            1.0e-6,
+            lower=0.0,
+            desc="Tolerance for termination. Based on "
+            + "relative function value change. Uses the "
+            + "method `set_ftol_rel()` from NLOpt.",
+        )
+        self.options.declare(
+            "maxiter", 200, lower=0, desc="Maximum number of iterations."
+        )
+        self.options.declare(
+            "maxtime",
+            0.0,
+            lower=0.0,
+            desc="Maximum time in seconds to perform optimization.",
+        )
+        self.options.declare(
+            "global_optimizer",
+            None,
+            values=sorted(_global_optimizers),
+            allow_none=True,
+            desc="Name of a global optimizer to run before `optimizer`. The local "
+            + "optimizer then starts from the best point found by the global one.",
+        )
+        self.options.declare(
+            "global_maxiter",
+            1000,
+            lower=0,
+            desc="Maximum number of iterations of the global stage.",
+        )
+        self.options.declare(
+            "global_maxtime",
+            0.0,
+            lower=0.0,
+            desc="Maximum time in seconds of the global stage.",
+        )
+        self.options.declare(
+            "portfolio",
+            None,
+            types=list,
+            allow_none=True,
+            desc="Names of optimizers to race against each other instead of running "
+            + "`optimizer`. Each one runs in its own forked process with its own copy of "
+            + "the model, and the design of the first one to converge to a feasible point "
+            + "is loaded into the problem.",
+        )
+        self.options.declare(
+            "portfolio_maxtime",
+            0.0,
+            lower=0.0,
+            desc="Maximum time in seconds of the portfolio race. When it runs out, the "
+            + "best point found by any of the optimizers is loaded into the problem. "
+            + "Use 0 for no limit.",
+        )
+        self.options.declare(
+            "initial_step",
+            None,
+            types=(int, float, np.ndarray),
+            allow_none=True,
+            desc="Initial step of derivative-free local optimizers, in driver-scaled units, "
+            + "as one value or one value per design variable entry. Defaults to a tenth "
+            + "of the range between the bounds of each entry, or to NLopt's choice for "
+            + "entries without both bounds.",
+        )
+        self.options.declare(
+            "population",
+            0,
+            types=int,
+            lower=0,
+            desc="Population size of stochastic global optimizers. Use 0 for NLopt's "
+            + "default.",
+        )
+        self.options.declare(
+            "vector_storage",
+            0,
+            types=int,
+            lower=0,
+            desc="Number of gradients stored by limited-memory quasi-Newton optimizers. "
+            + "Use 0 for NLopt's default.",
+        )
+        self.options.declare(
+            "local_optimizer",
+            None,
+            values=sorted(_local_optimizers),
+            allow_none=True,
+            desc="Name of the optimizer that AUGLAG and G_MLSL_LDS solve their "
+            + "subproblems with. Required by those optimizers.",
+        )
+        self.options.declare(
+            "seed",
+            None,
+            types=int,
+            allow_none=True,
+            desc="Seed of the random number generator of NLopt, set before each "
+            + "optimization, so that stochastic optimizers give reproducible results.",
+        )
+        self.options.declare(
+            "restarts",
+            0,
+            types=int,
+            lower=0,
+            desc="Maximum number of times an optimization that ends with an NLopt failure "
+            + "or a roundoff-limited result is restarted from the best point found so "
+            + "far. Restarts reuse the NLopt problem and the cached evaluations, and "
+            + "share the evaluations and time left of the optimization.",
+        )
+        self.options.declare(
+            "restart_perturbation",
+            0.0,
+            lower=0.0,
+            desc="Size of the random perturbation of each restart point, as a fraction "
+            + "of the range between the bounds of each design variable entry, or of its "
+            + "magnitude for entries without both bounds. Uses `seed` if set.",
+        )
+        self.options.declare(
+            "restart_rescale",
+            False,
+            types=bool,
+            desc="If True, recompute the `auto_scale` factors at each restart point. Not "
+            + "available with `gather_to_root` on more than one process.",
+        )
+        self.options.declare(
+            "auto_scale",
+            False,
+            types=bool,
+            desc="If True, scale the design variables, objective and constraints seen "
+            + "by NLopt by equilibrating the total Jacobian at the initial design. "
+            + "This is applied on top of any ref/ref0 scaling.",
+        )
+        self.options.declare(
+            "eval_cache_size",
+            0,
+            lower=0,
+            desc="Number of recent evaluations kept in memory, so that points "
+            + "NLopt asks for again do not rerun the model. Cached points are not "
+            + "counted in iter_count nor recorded again. The default of 0 runs the "
+            + "model at every point NLopt asks for.",
+        )
+        self.options.declare(
+            "partial_evaluation",
+            False,
+            types=bool,
+            desc="If True, only run the top-level subsystems that the responses NLopt "
+            + "asks for depend on, and run the others when one of their responses is "
+            + "asked for at the same point. Requires a NonlinearRunOnce solver on the "
+            + "model, a serial run and no driver recorders. Gradient evaluations always "
+            + "run the whole model.",
+        )
+        self.options.declare(
+            "replay",
+            None,
+            types=ReplayDatabase,
+            allow_none=True,
+            desc="Recorded evaluations to answer the function and gradient requests "
+            + "from instead of running the model, to tune the optimizer settings "
+            + "cheaply. Points that were not recorded are approximated and added to "
+            + "the `misses` of the database. The model is never run, so only the design "
+            + "variables of the problem are updated.",
+        )
+        self.options.declare(
+            "scenarios",
+            None,
+            types=ScenarioSet,
+            allow_none=True,
+            desc="Scenarios, such as load cases, evaluated concurrently at every design "
+            + "point and aggregated into the objective and constraints given to NLopt. "
+            + "The model of the problem only provides the layout, and is run at the "
+            + "initial design and at the optimum.",
+        )
+        self.options.declare(
+            "jac_memory_limit",
+            None,
+            lower=0.0,
+            allow_none=True,
+            desc="Maximum size in megabytes of the total derivatives held in memory at "
+            + "a time. If set, the derivatives of the responses are computed in blocks "
+            + "of this size when NLopt asks for their rows, and those needed for "
+            + "auto_scale and linear constraints are kept in temporary files. A "
+            + "response whose derivatives alone exceed the limit forms its own block.",
+        )
+        self.options.declare(
+            "speculative_gradients",
+            False,
+            types=bool,
+            desc="If True, start computing the total derivatives in a background thread "
+            + "as soon as the model has been run without them at a point that improves "
+            + "on the best one so far, so that a gradient request at the same point "
+            + "finds them ready. Only used by serial runs without partial evaluation "
+            + "or replay. The model is not used elsewhere until the speculative "
+            + "computation has finished.",
+        )
+        self.options.declare(
+            "gather_to_root",
+            False,
+            types=bool,
+            desc="If True and the model runs on more than one process, only the root "
+            + "rank runs NLopt. Response values are gathered to that rank only and the "
+            + "other ranks just follow its model evaluations and derivative computations. "
+            + "Total derivatives are still assembled on every rank by OpenMDAO, so this "
+            + "does not reduce their communication or memory.",
+        )
+        self.options.declare(
+            "history_file",
+            None,
+            types=str,
+            allow_none=True,
+            desc="Path of a .npy file in which the evaluation history is memory-mapped "
+            + "instead of being kept in memory, for very long runs.",
+        )
+        self.options.declare(
+            "telemetry_file",
+            None,
+            types=str,
+            allow_none=True,
+            desc="Path of a file, or of an existing local UNIX socket, to which one "
+            + "JSON line is appended after each evaluation.",
+        )
+        self.options.declare(
+            "telemetry_flush_interval",
+            1.0,
+            lower=0.0,
+            desc="Minimum number of seconds between two writes of the buffered "
+            + "telemetry records.",
+        )
+        self.options.declare(
+            "eval_timeout",
+            None,
+            lower=0.0,
+            allow_none=True,
+            desc="Maximum wall-clock time in seconds of a model evaluation requested by "
+            + "NLopt. An evaluation that runs longer is interrupted by a SIGALRM signal, "
+            + "counted, recorded as a failed case, and NLopt gets 'timeout_penalty' as "
+            + "its objective and constraints violated by as much. Only available on "
+            + "serial runs, from the main thread, on platforms with signal.setitimer.",
+        )
+        self.options.declare(
+            "timeout_penalty",
+            1.0e6,
+            desc="Objective value, and violation of every constraint, in driver-scaled "
+            + "units, returned for an evaluation aborted by 'eval_timeout'.",
+        )
+
+    def _get_name(self):
+        """
+        Get name of current optimizer.
+
+        Returns
+        -------
+        str
+            The name of the current optimizer.
+        """
+        return "NLopt" + self.options["optimizer"]
+
+    def _setup_driver(self, problem):
+        """
+        Prepare the driver for execution.
+
+        This is the final thing to run during setup.
+
+        Parameters
+        ----------
+        problem : <Problem>
+            Pointer
+        """
+        super(NLoptDriver, self)._setup_driver(problem)
+        opt = self.options["optimizer"]
+
+        local = self.options["local_optimizer"]
+        algorithms = {opt, self.options["global_optimizer"]}
+        algorithms.update(self.options["portfolio"] or [])
+        algorithms.discard(None)
+
+        # The tuning options must be used by at least one of the optimizers of the run
+        needs_local = sorted(algorithms & _local_optimizer_optimizers)
+        if needs_local and local is None:
+            msg = "{}: Optimizer {} needs a 'local_optimizer'."
+            raise RuntimeError(msg.format(self.msginfo, needs_local[0]))
+        if local is not None and not needs_local:
+            msg = "{}: Option 'local_optimizer' is only used by {}."
+            raise RuntimeError(msg.format(self.msginfo, sorted(_local_optimizer_optimizers)))
+
+        algorithms.add(local)
+        for name, users in (
+            ("initial_step", _initial_step_optimizers),
+            ("population", _population_optimizers),
+            ("vector_storage", _vector_storage_optimizers),
+        ):
+            value = self.options[name]
+            if value is not None and np.any(value) and not algorithms & users:
+                msg = "{}: Option '{}' is only used by {}."
+                raise RuntimeError(msg.format(self.msginfo, name, sorted(users)))
+
+        if self.options["scenarios"] is not None:
+            for name in ("replay", "portfolio", "jac_memory_limit", "eval_timeout"):
+                if self.options[name]:
+                    msg = "{}: Option '{}' cannot be used with scenarios."
+                    raise RuntimeError(msg.format(self.msginfo, name))
+
+        if self.options["eval_timeout"] is not None:
+            if not hasattr(signal, "setitimer"):
+                msg = "{}: Option 'eval_timeout' needs signal.setitimer, which is not available."
+                raise RuntimeError(msg.format(self.msginfo))
+            if problem.comm.size > 1:
+                msg = "{}: Option 'eval_timeout' is not supported when running under MPI."
+                raise RuntimeError(msg.format(self.msginfo))
+
+        if self.options["restart_rescale"] and not self.options["auto_scale"]:
+            msg = "{}: Option 'restart_rescale' requires 'auto_scale'."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        # Only the root rank restarts, so the other ranks would miss the derivatives that
+        # the new scaling factors come from
+        if self.options["restart_rescale"] and self.options["gather_to_root"]:
+            if problem.comm.size > 1:
+                msg = "{}: Option 'restart_rescale' cannot be used with 'gather_to_root'."
+                raise RuntimeError(msg.format(self.msginfo))
+
+        self.supports._read_only = False
+        # Any stage, such as a member of the portfolio, may ask for gradients
+        self.supports["gradients"] = any(
+            algorithm in _gradient_optimizers
+            or (algorithm in _local_optimizer_optimizers and local in _gradient_optimizers)
+            for algorithm in algorithms
+        )
+        self.supports["inequality_constraints"] = opt in _constraint_optimizers
+        self.supports["two_sided_constraints"] = opt in _constraint_optimizers
+        self.supports["equality_constraints"] = opt in _eq_constraint_optimizers
+        self.supports._read_only = True
+
+        # Raises error if multiple objectives are not supported, but more objectives were defined.
+        if not self.supports["multiple_objectives"] and len(self._objs) > 1:
+            msg = "{} currently does not support multiple objectives."
+            raise RuntimeError(msg.format(self.msginfo))
+
+    def run(self):
+        """
+        Optimize the problem using selected NLopt optimizer.
+
+        Returns
+        -------
+        bool
+            Failure flag; True if NLopt did not report convergence.
+        """
+        problem = self._problem()
+        opt = self.options["optimizer"]
+        model = problem.model
+        self.iter_count = 0
+        self.result = None
+        self._last_x = None
+        self._last_eval = None
+        self._fresh_systems = None
+        self._eval_cache = OrderedDict()
+        self._best = None
+        self._penalized = False
+        self.timeout_count = 0
+        self.speculative_hits = 0
+        self.stage_history = []
+        self._start_time = time.perf_counter()
+
+        self._check_for_missing_objective()
+
+        if (
+            self.options["eval_timeout"] is not None
+            and threading.current_thread() is not threading.main_thread()
+        ):
+            msg = "{}: Option 'eval_timeout' can only be used from the main thread."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        replay = self.options["replay"]
+        scenarios = self.options["scenarios"]
+        self._proxy = replay if replay is not None else scenarios
+        if replay is not None:
+            # Every rank answers from its own copy of the recorded evaluations
+            self._root_comm = None
+            replay._bind(self)
+            f_init, self._con_cache = self._proxy_point(self._current_design())
+        else:
+            # Initial Run
+            with RecordingDebugging(self._get_name(), self.iter_count, self) as rec:
+                model.run_solve_nonlinear()
+                self.iter_count += 1
+
+            # Every rank takes part in the evaluation of the scenarios
+            if self.options["gather_to_root"] and model.comm.size > 1 and scenarios is None:
+                self._root_comm = model.comm
+            else:
+                self._root_comm = None
+
+            f_init, self._con_cache = self._get_response_values()
+
+        # Repeated runs of the same problem, such as continuation solves, only differ by the
+        # starting point and by model parameters, which leave the layout, the linear
+        # constraint Jacobian, the coloring and the NLopt problems unchanged.
+        layout_key = (problem._metadata, self._layout_signature())
+        if (
+            self._layout_key is not None
+            and self._layout_key[0] is layout_key[0]
+            and self._layout_key[1] == layout_key[1]
+        ):
+            x_init = self._current_design()
+            self._total_jac = self._totals_plan
+        else:
+            self._layout_key = None
+            self._nlopt_problems = {}
+            self._total_jac = None
+            self._totals_plan = None
+            x_init = self._setup_layout()
+            if replay is None:
+                self._compute_dynamic_coloring()
+
+        # The scenario workers are forked once the coloring is known, so that they use it
+        if scenarios is not None:
+            scenarios._start(self)
+
+        try:
+            if self._layout_key is None:
+                self._setup_scaling()
+                self._setup_partial_evaluation()
+                self._layout_key = layout_key
+
+            if scenarios is not None:
+                f_init, self._con_cache = self._proxy_point(x_init, gradient=True)
+        except Exception:
+            if scenarios is not None:
+                scenarios._stop()
+            raise
+
+        if self._root_comm is not None and self._root_comm.rank != 0:
+            self._follow_root()
+            self.fail = self.result not in CONVERGED_RESULTS
+            return self.fail
+
+        # The model was left at the initial design by the initial run
+        self._last_x = x_init.copy()
+        self._last_eval = (f_init, self._con_cache)
+        self._store_evaluation(x_init, f_init)
+
+        num_con = sum(con_scale.size for con_scale in self._con_scale.values())
+        self.history = EvaluationHistory(
+            x_init.size, num_con, filename=self.options["history_file"]
+        )
+
+        # Actually perform optimization, starting with the global stage if requested
+        try:
+            if self.options["telemetry_file"] is not None:
+                self._telemetry = TelemetryWriter(
+                    self.options["telemetry_file"], self.options["telemetry_flush_interval"]
+                )
+
+            x_opt = x_init
+            global_opt = self.options["global_optimizer"]
+            if global_opt is not None:
+                x_opt = self._optimize_stage(
+                    global_opt,
+                    x_opt,
+                    self.options["global_maxiter"],
+                    self.options["global_maxtime"],
+                )
+
+                # Polish the best point of the global stage, which is not necessarily the
+                # last point NLopt returned if that one is infeasible.
+                x_opt = self._best[2].copy()
+
+            if self.options["portfolio"]:
+                x_opt = self._race_portfolio(self.options["portfolio"], x_opt)
+            else:
+                x_opt = self._optimize_stage(
+                    opt, x_opt, self.options["maxiter"], self.options["maxtime"]
+                )
+
+            # Cached or partial evaluations may have left the model at another point than
+            # the optimum, or with some of its subsystems not run there.
+            if self._exc_info is None and (
+                not np.array_equal(x_opt, self._last_x) or self._fresh_systems is not None
+            ):
+                self._evaluate_point(x_opt)
+
+            # The design variables of the problem were set with each scenario evaluation,
+            # but its own model is only run at the optimum.
+            if scenarios is not None and self._exc_info is None:
+                model.run_solve_nonlinear()
+
+        # If an exception was swallowed in one of our callbacks, we want to raise it
+        except Exception as msg:
+            if self._exc_info is not None:
+                self._reraise()
+            else:
+                raise
+
+        finally:
+            if self._telemetry is not None:
+                self._telemetry.close()
+                self._telemetry = None
+            self.history.close()
+
+            if scenarios is not None:
+                scenarios._stop()
+
+            # Release the ranks that follow the root
+            if self._root_comm is not None:
+                self._root_comm.bcast(("stop", self.result), root=0)
+
+        if self._exc_info is not None:
+            self._reraise()
+
+        self.fail = self.result not in CONVERGED_RESULTS
+        return self.fail
+
+    def run_continuation(self, settings, predictor=False):
+        """
+        Solve the optimization for a sequence of model parameter settings.
+
+        Each solve starts from the optimum of the previous one. Since the settings do not
+        change the layout, later solves reuse the layout, linear constraint Jacobian,
+        coloring and NLopt problems of the first one.
+
+        Parameters
+        ----------
+        settings : list of dict
+            Values of model variables, keyed by any name accepted by `Problem.set_val`, to
+            apply before each solve. Every setting must have the same keys.
+        predictor : bool
+            If True, the starting point of the third and later solves is extrapolated
+            linearly from the two previous optima along the change of the settings.
+
+        Returns
+        -------
+        list of dict
+            One entry per setting with the setting, the flattened driver-scaled optimum
+            "x", the "objective" value, the NLopt "result" code and the number of model
+            "evaluations" of the solve.
+        """
+        if self._problem is None:
+            msg = "{}: Call final_setup on the problem before running a continuation."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        problem = self._problem()
+        solutions = []
+        params = []
+
+        for setting in settings:
+            for name, value in setting.items():
+                problem.set_val(name, value)
+            param = np.concatenate([np.ravel(value) for value in setting.values()])
+
+            if solutions:
+                x0 = solutions[-1]["x"]
+
+                # Secant predictor along the projection of the new parameter step onto
+                # the previous one
+                if predictor and len(solutions) > 1:
+                    ds_prev = params[-1] - params[-2]
+                    ds = param - params[-1]
+                    denom = ds_prev.dot(ds_prev)
+                    if denom > 0.0:
+                        dx_prev = solutions[-1]["x"] - solutions[-2]["x"]
+                        x0 = x0 + dx_prev * (ds.dot(ds_prev) / denom)
+                        x0 = np.clip(x0, self._lower, self._upper)
+
+                self._set_design_point(x0)
+
+            self.run()
+
+            params.append(param)
+            solutions.append(
+                {
+                    "setting": setting,
+                    "x": self._current_design(),
+                    "objective": float(list(self.get_objective_values().values())[0]),
+                    "result": self.result,
+                    "evaluations": self.iter_count,
+                }
+            )
+
+        return solutions
+
+    def get_best_feasible_point(self):
+        """
+        Return the feasible point with the lowest objective evaluated by the last run.
+
+        NLopt does not always return that point, for instance when it stops with an error.
+
+        Returns
+        -------
+        tuple or None
+            Objective value and driver-scaled design variable values keyed by name, or
+            None if no evaluated point satisfies the constraints.
+        """
+        if self._best is None or self._best[1] > FEASIBILITY_TOL:
+            return None
+
+        f, _, x = self._best
+        desvars = {}
+        i = 0
+        for name, meta in self._designvars.items():
+            size = meta["global_size"] if meta["distributed"] else meta["size"]
+            desvars[name] = x[i: i + size].copy()
+            i += size
+
+        return f, desvars
+
+    def _layout_signature(self):
+        """
+        Return a signature of everything the layout of a run is computed from.
+
+        Returns
+        -------
+        tuple
+            Layout-related options, and the metadata of the objectives, design variables
+            and constraints.
+        """
+        def meta_key(meta, fields):
+            return tuple(
+                None if meta[field] is None else np.asarray(meta[field]).tobytes()
+                for field in fields
+            )
+
+        dv_fields = (
+            "size",
+            "global_size",
+            "distributed",
+            "lower",
+            "upper",
+            "total_scaler",
+            "total_adder",
+        )
+        con_fields = dv_fields + ("equals", "linear")
+
+        return (
+            tuple(
+                self.options[name]
+                for name in (
+                    "optimizer",
+                    "auto_scale",
+                    "partial_evaluation",
+                    "gather_to_root",
+                    "jac_memory_limit",
+                    "population",
+                    "vector_storage",
+                    "local_optimizer",
+                    "global_optimizer",
+                )
+            ),
+            tuple(self.options["portfolio"] or ()),
+            self.options["replay"] is not None,
+            self.options["scenarios"] is not None,
+            bool(self._rec_mgr._recorders),
+            self._problem().model.comm.size,
+            tuple(self._objs),
+            tuple((name, meta_key(meta, dv_fields)) for name, meta in self._designvars.items()),
+            tuple((name, meta_key(meta, con_fields)) for name, meta in self._cons.items()),
+        )
+
+    def _setup_layout(self):
+        """
+        Collect the design variable and constraint layout shared by every NLopt problem of a run.
+
+        Returns
+        -------
+        ndarray
+            Initial values of the design variables.
+        """
+        opt = self.options["optimizer"]
+        self._dvlist = list(self._designvars)
+        x_init = self._current_design()
+        nparam = x_init.size
+        self._lower = np.empty(nparam)
+        self._upper = np.empty(nparam)
+
+        # Loop through all OpenMDAO design variables and process their bounds
+        i = 0
+        for name, meta in self._designvars.items():
+            size = meta["global_size"] if meta["distributed"] else meta["size"]
+            self._lower[i: i + size] = -np.inf if meta["lower"] is None else meta["lower"]
+            self._upper[i: i + size] = np.inf if meta["upper"] is None else meta["upper"]
+            i += size
+
+        # Constraints
+        i = 1  # start at 1 since row 0 is the objective.  Constraints start at row 1.
+        lin_i = 0  # counter for linear constraint jacobian
+        lincons = []  # list of linear constraints
+        self._obj_and_nlcons = list(self._objs)
+        self._nlopt_con_args = []
+        self._lincongrad_cache = None
+
+        # The constraints are laid out if any stage can handle them, and each stage only
+        # adds them to its NLopt problem if its own optimizer does.
+        algorithms = {opt, self.options["global_optimizer"]}
+        algorithms.update(self.options["portfolio"] or [])
+        if algorithms & _constraint_optimizers:
+            for name, meta in self._cons.items():
+                size = meta["global_size"] if meta["distributed"] else meta["size"]
+                upper = np.broadcast_to(meta["upper"], (size,))
+                lower = np.broadcast_to(meta["lower"], (size,))
+                equals = meta["equals"]
+
+                # Linear constraints get their gradients once, if any stage uses gradients
+                if self.supports["gradients"] and meta["linear"]:
+                    lincons.append(name)
+                    self._con_idx[name] = lin_i
+                    lin_i += size
+                else:
+                    self._obj_and_nlcons.append(name)
+                    self._con_idx[name] = i
+                    i += size
+
+                # Every index is a separate NLopt constraint. Equality constraints are
+                # flagged so that they can be added as such, and double-sided constraints
+                # get a second inequality for their lower bound.
+                for j in range(size):
+                    if equals is not None:
+                        self._nlopt_con_args.append((name, False, j, True))
+                    else:
+                        self._nlopt_con_args.append((name, False, j, False))
+
+                        dblcon = (upper[j] < openmdao.INF_BOUND) and (
+                            lower[j] > -openmdao.INF_BOUND
+                        )
+                        if dblcon:
+                            self._nlopt_con_args.append((name, True, j, False))
+
+        self._jac_blocks = None
+        if self.options["jac_memory_limit"] is not None:
+            self._jac_blocks = self._partition_rows(self._obj_and_nlcons)
+
+        # precalculate gradients of linear constraints
+        if lincons and self._jac_blocks is not None:
+            blocks = self._partition_rows(lincons)
+            self._lincongrad_cache = _scratch_array((blocks[-1][2], nparam))
+            for names, start, stop in blocks:
+                self._lincongrad_cache[start:stop] = self._compute_totals_block(names)
+        elif lincons and self.options["replay"] is not None:
+            self._lincongrad_cache = self.options["replay"].totals(x_init, lincons)
+        elif lincons:
+            self._lincongrad_cache = self._compute_totals(
+                of=lincons, wrt=self._dvlist, return_format="array"
+            )
+
+        return x_init
+
+    def _partition_rows(self, names):
+        """
+        Split responses into consecutive blocks whose total derivatives fit in the memory limit.
+
+        Parameters
+        ----------
+        names : list of str
+            Names of the responses, in the order of their rows.
+
+        Returns
+        -------
+        list of tuple
+            Names, first row and end row of each block.
+        """
+        row_bytes = 8 * max(self._lower.size, 1)
+        max_rows = max(int(self.options["jac_memory_limit"] * 2 ** 20 // row_bytes), 1)
+
+        blocks = []
+        block = []
+        start = stop = 0
+        for name in names:
+            meta = self._responses[name]
+            size = meta["global_size"] if meta["distributed"] else meta["size"]
+            if block and stop + size - start > max_rows:
+                blocks.append((block, start, stop))
+                block = []
+                start = stop
+            block.append(name)
+            stop += size
+        if block:
+            blocks.append((block, start, stop))
+
+        return blocks
+
+    def _compute_totals_block(self, names):
+        """
+        Compute the total derivatives of a block of responses at the current design.
+
+        Parameters
+        ----------
+        names : list of str
+            Names of the responses.
+
+        Returns
+        -------
+        ndarray
+            Total derivatives, one row per response entry.
+        """
+        if self._proxy is not None:
+            return self._proxy.totals(self._current_design(), names)
+
+        # The driver keeps a single plan whatever the responses are, so each block gets a
+        # new one. A plan refers to itself, so it is only freed with its Jacobian by the
+        # garbage collector.
+        self._total_jac = None
+        jac = self._compute_totals(of=names, wrt=self._dvlist, return_format="array")
+        self._total_jac = None
+        gc.collect()
+        return jac
+
+    def _nl_gradient_row(self, row):
+        """
+        Return a row of the total derivatives of the objective and nonlinear constraints.
+
+        The block holding the row is computed at `_last_x` unless it was computed last.
+
+        Parameters
+        ----------
+        row : int
+            Row of the Jacobian, with the objective in row 0.
+
+        Returns
+        -------
+        ndarray
+            Derivatives of one response entry with respect to the design vector.
+        """
+        block = self._grad_block
+        if block is None or not block[0] <= row < block[1]:
+            for names, start, stop in self._jac_blocks:
+                if start <= row < stop:
+                    break
+
+            if self._root_comm is not None and self._root_comm.rank == 0:
+                self._root_comm.bcast(("block", names), root=0)
+
+            self._grad_block = block = (start, stop, self._compute_totals_block(names))
+
+        return block[2][row - block[0]]
+
+    def _current_design(self):
+        """
+        Return the current values of the design variables as one flat array.
+
+        Returns
+        -------
+        ndarray
+            Driver-scaled design point.
+        """
+        desvar_vals = self.get_design_var_values()
+        return np.concatenate([np.ravel(desvar_vals[name]) for name in self._designvars])
+
+    def _compute_dynamic_coloring(self):
+        """
+        Compute dynamic simul deriv coloring if option is set.
+        """
+        if coloring_mod._use_total_sparsity:
+            if (
+                self._coloring_info["coloring"] is None
+                and self._coloring_info["dynamic"]
+            ):
+                coloring_mod.dynamic_total_coloring(
+                    self, run_model=False, fname=self._get_total_coloring_fname()
+                )
+
+                # if the improvement wasn't large enough, turn coloring off
+                info = self._coloring_info
+                if info["coloring"] is not None:
+                    pct = info["coloring"]._solves_info()[-1]
+                    if info["min_improve_pct"] > pct:
+                        info["coloring"] = info["static"] = None
+                        simple_warning(
+                            "%s: Coloring was deactivated.  Improvement of %.1f%% was "
+                            "less than min allowed (%.1f%%)."
+                            % (self.msginfo, pct, info["min_improve_pct"])
+                        )
+
+    def _setup_scaling(self):
+        """
+        Compute the scale factors between the driver and NLopt.
+
+        Without `auto_scale` all factors are one. Otherwise the rows and columns of the
+        total Jacobian at the initial design are equilibrated with a few Ruiz iterations,
+        so that every row and column ends up with a largest entry of about one.
+        """
+        nparam = self._lower.size
+        self._x_scale = np.ones(nparam)
+        self._obj_scale = 1.0
+        self._con_scale = {}
+        for name, meta in self._cons.items():
+            size = meta["global_size"] if meta["distributed"] else meta["size"]
+            self._con_scale[name] = np.ones(size)
+
+        if not self.options["auto_scale"]:
+            return
+
+        if self._jac_blocks is not None:
+            # The Jacobian is assembled block by block in a temporary file
+            num_nl = self._jac_blocks[-1][2]
+            num_lin = 0 if self._lincongrad_cache is None else self._lincongrad_cache.shape[0]
+            jac = _scratch_array((num_nl + num_lin, nparam))
+            for names, start, stop in self._jac_blocks:
+                jac[start:stop] = self._compute_totals_block(names)
+            chunk = self._jac_blocks[0][2]
+            for start in range(0, num_lin, chunk):
+                jac[num_nl + start: num_nl + start + chunk] = (
+                    self._lincongrad_cache[start: start + chunk]
+                )
+        else:
+            if self._proxy is not None:
+                jac = self._proxy.totals(self._current_design(), self._obj_and_nlcons)
+            else:
+                jac = self._compute_totals(
+                    of=self._obj_and_nlcons, wrt=self._dvlist, return_format="array"
+                )
+            num_nl = jac.shape[0]
+            if self._lincongrad_cache is not None:
+                jac = np.vstack((jac, self._lincongrad_cache))
+            chunk = jac.shape[0]
+
+        row_scale, col_scale = _equilibrate(jac, chunk)
+
+        # NLopt sees x / x_scale, so the columns scale with x_scale
+        self._x_scale = col_scale
+        self._obj_scale = row_scale[0]
+        for name, start in self._con_idx.items():
+            # Rows of the linear constraints follow the nonlinear ones
+            if name not in self._obj_and_nlcons:
+                start += num_nl
+            self._con_scale[name] = row_scale[start: start + self._con_scale[name].size]
+
+    def _setup_partial_evaluation(self):
+        """
+        Find the top-level subsystems that each response depends on.
+
+        A top-level subsystem depends on the ones it takes inputs from, directly or through
+        other subsystems. Partial evaluation is only set up when the model runs its
+        subsystems once each in order, so that skipping some of them is safe.
+        """
+        self._response_systems = None
+        if not self.options["partial_evaluation"]:
+            return
+
+        # The solvers pull in networkx, which is not needed to import the driver
+        from openmdao.solvers.nonlinear.nonlinear_runonce import NonlinearRunOnce
+
+        model = self._problem().model
+        if self.options["replay"] is not None:
+            reason = "the driver replays recorded evaluations"
+        elif self.options["scenarios"] is not None:
+            reason = "the driver evaluates scenarios"
+        elif model.comm.size > 1:
+            reason = "the model runs on more than one process"
+        elif not isinstance(model.nonlinear_solver, NonlinearRunOnce):
+            reason = "the model has a nonlinear solver other than NonlinearRunOnce"
+        elif self._rec_mgr._recorders:
+            reason = "the driver has case recorders"
+        else:
+            reason = None
+
+        if reason is not None:
+            simple_warning(
+                "%s: Partial evaluation was deactivated because %s."
+                % (self.msginfo, reason)
+            )
+            return
+
+        # Top-level subsystems that each top-level subsystem takes inputs from
+        sources = {name: set() for name in model._subsystems_allprocs}
+        for tgt, src in model._conn_global_abs_in2out.items():
+            tgt_sys = tgt.split(".", 1)[0]
+            src_sys = src.split(".", 1)[0]
+            if tgt_sys != src_sys:
+                sources[tgt_sys].add(src_sys)
+
+        self._response_systems = {}
+        for name, meta in list(self._objs.items()) + list(self._cons.items()):
+            src_name = meta["ivc_source"] if meta.get("ivc_source") is not None else name
+            stack = [src_name.split(".", 1)[0]]
+            needed = set()
+            while stack:
+                sys_name = stack.pop()
+                if sys_name not in needed:
+                    needed.add(sys_name)
+                    stack.extend(sources[sys_name])
+            self._response_systems[name] = needed
+
+    def _get_nlopt_problem(self, algorithm, x0, maxiter, maxtime):
+        """
+        Return the NLopt problem of the given algorithm for the layout of the current run.
+
+        The problem is built once per layout, and only its starting step and stopping
+        criteria are updated when it is reused.
+
+        Parameters
+        ----------
+        algorithm : str
+            Name of the NLopt algorithm.
+        x0 : ndarray
+            Starting point, in driver units.
+        maxiter : int
+            Maximum number of evaluations for this problem.
+        maxtime : float
+            Maximum time in seconds for this problem.
+
+        Returns
+        -------
+        nlopt.opt
+            The NLopt problem, ready to be optimized.
+        """
+        opt_prob = self._nlopt_problems.get(algorithm)
+        if opt_prob is None:
+            opt_prob = self._build_nlopt_problem(algorithm)
+            self._nlopt_problems[algorithm] = opt_prob
+
+        if algorithm in _initial_step_optimizers:
+            opt_prob.set_initial_step(self._initial_step(opt_prob, x0))
+        opt_prob.set_ftol_rel(self.options["tol"])
+        opt_prob.set_maxeval(int(maxiter))
+        opt_prob.set_maxtime(maxtime)
+
+        if self.options["seed"] is not None:
+            nlopt.srand(self.options["seed"])
+
+        return opt_prob
+
+    def _initial_step(self, opt_prob, x0):
+        """
+        Return the initial step of a derivative-free optimizer, as seen by NLopt.
+
+        Parameters
+        ----------
+        opt_prob : nlopt.opt
+            NLopt problem, with its bounds set.
+        x0 : ndarray
+            Starting point, in driver units.
+
+        Returns
+        -------
+        ndarray
+            Initial step of each design variable entry.
+        """
+        step = self.options["initial_step"]
+        if step is not None:
+            return np.broadcast_to(step, x0.shape) / self._x_scale
+
+        # Without both bounds, NLopt derives the step from the starting point
+        lower = self._lower / self._x_scale
+        upper = self._upper / self._x_scale
+        step = opt_prob.get_initial_step(x0 / self._x_scale)
+        bounded = np.isfinite(lower) & np.isfinite(upper) & (upper > lower)
+        step[bounded] = _INITIAL_STEP_FRACTION * (upper[bounded] - lower[bounded])
+        return step
+
+    def _build_nlopt_problem(self, algorithm):
+        """
+        Build an NLopt problem for the given algorithm from the layout of the current run.
+
+        Parameters
+        ----------
+        algorithm : str
+            Name of the NLopt algorithm.
+
+        Returns
+        -------
+        nlopt.opt
+            The NLopt problem, with bounds, constraints and objective.
+        """
+        if algorithm not in _optimizers:
+            msg = 'Optimizer "{}" is not implemented yet. Choose from: {}'
+            raise NotImplementedError(msg.format(algorithm, _optimizers))
+
+        # Initialize the NLopt problem with the method and number of design vars
+        nparam = int(self._lower.size)
+        opt_prob = nlopt.opt(optimizer_methods[algorithm], nparam)
+        self._set_tuning_options(opt_prob, algorithm)
+
+        if algorithm in _local_optimizer_optimizers:
+            local = self.options["local_optimizer"]
+            local_prob = nlopt.opt(optimizer_methods[local], nparam)
+            local_prob.set_ftol_rel(self.options["tol"])
+            self._set_tuning_options(local_prob, local)
+            if local in _initial_step_optimizers:
+                local_prob.set_lower_bounds(self._lower / self._x_scale)
+                local_prob.set_upper_bounds(self._upper / self._x_scale)
+                local_prob.set_initial_step(
+                    self._initial_step(local_prob, self._current_design())
+                )
+            opt_prob.set_local_optimizer(local_prob)
+
+        # Bounds if our optimizer supports them
+        if algorithm in _bounds_optimizers:
+            opt_prob.set_lower_bounds(self._lower / self._x_scale)
+            opt_prob.set_upper_bounds(self._upper / self._x_scale)
+
+        if algorithm in _constraint_optimizers:
+            for name, dbl, idx, equality in self._nlopt_con_args:
+                fcn = signature_extender(
+                    weak_method_wrapper(self, "_confunc"), [name, dbl, idx]
+                )
+                if equality:
+                    try:
+                        opt_prob.add_equality_constraint(fcn)
+                    except ValueError:
+                        msg = (
+                            "The selected optimizer, {}, does not support"
+                            + " equality constraints. Select from {}."
+                        )
+                        raise NotImplementedError(
+                            msg.format(algorithm, _eq_constraint_optimizers)
+                        )
+                else:
+                    opt_prob.add_inequality_constraint(fcn)
+
+        opt_prob.set_min_objective(weak_method_wrapper(self, "_objfunc"))
+
+        return opt_prob
+
+    def _set_tuning_options(self, opt_prob, algorithm):
+        """
+        Pass the population and vector storage options to an NLopt problem that uses them.
+
+        Parameters
+        ----------
+        opt_prob : nlopt.opt
+            NLopt problem.
+        algorithm : str
+            Name of the NLopt algorithm of the problem.
+        """
+        if algorithm in _population_optimizers and self.options["population"] > 0:
+            opt_prob.set_population(self.options["population"])
+        if algorithm in _vector_storage_optimizers and self.options["vector_storage"] > 0:
+            opt_prob.set_vector_storage(self.options["vector_storage"])
+
+    def _optimize_stage(self, algorithm, x0, maxiter, maxtime):
+        """
+        Run one NLopt optimization of the current layout and record it in `stage_history`.
+
+        An optimization that ends with an NLopt failure or a roundoff-limited result is
+        restarted from the best point found so far, up to `restarts` times, and each
+        attempt gets its own entry in `stage_history`.
+
+        Parameters
+        ----------
+        algorithm : str
+            Name of the NLopt algorithm.
+        x0 : ndarray
+            Starting point, in driver units.
+        maxiter : int
+            Maximum number of evaluations for this stage.
+        maxtime : float
+            Maximum time in seconds for this stage.
+
+        Returns
+        -------
+        ndarray
+            Optimal point returned by NLopt, in driver units.
+        """
+        stage_count = self.iter_count
+        stage_time = time.perf_counter()
+        iter_left = maxiter
+        time_left = maxtime
+        rng = None
+        attempt = 0
+
+        while True:
+            start_count = self.iter_count
+            start_time = time.perf_counter()
+            opt_prob = self._get_nlopt_problem(algorithm, x0, iter_left, time_left)
+
+            if (
+                self.options["speculative_gradients"]
+                and algorithm in _gradient_optimizers
+                and self._problem().model.comm.size == 1
+                and self._response_systems is None
+                and self._jac_blocks is None
+                and self._proxy is None
+            ):
+                self._grad_executor = ThreadPoolExecutor(max_workers=1)
+
+            x0_nlopt = x0 / self._x_scale
+            error = None
+            try:
+                x_nlopt = opt_prob.optimize(x0_nlopt)
+            except (nlopt.RoundoffLimited, RuntimeError) as err:
+                error = err
+            finally:
+                if self._grad_executor is not None:
+                    self._claim_speculative_gradient(None)
+                    self._grad_executor.shutdown()
+                    self._grad_executor = None
+            self.result = opt_prob.last_optimize_result()
+
+            self.stage_history.append(
+                {
+                    "optimizer": algorithm,
+                    "attempt": attempt,
+                    "result": self.result,
+                    "evaluations": self.iter_count - start_count,
+                    "time": time.perf_counter() - start_time,
+                }
+            )
+
+            if error is None:
+                break
+
+            # Restarts get what is left of the budget of the stage, where zero means no limit
+            if maxiter > 0:
+                iter_left = maxiter - (self.iter_count - stage_count)
+            if maxtime > 0.0:
+                time_left = maxtime - (time.perf_counter() - stage_time)
+
+            # Errors raised in our callbacks and exhausted budgets end the stage
+            if (
+                self._exc_info is not None
+                or attempt == self.options["restarts"]
+                or (maxiter > 0 and iter_left <= 0)
+                or (maxtime > 0.0 and time_left <= 0.0)
+            ):
+                raise error
+
+            if rng is None:
+                rng = np.random.RandomState(self.options["seed"])
+            x0 = self._restart_point(rng)
+            attempt += 1
+
+        return x_nlopt * self._x_scale
+
+    def _restart_point(self, rng):
+        """
+        Return the starting point of a restart, and rescale the problem there if requested.
+
+        Parameters
+        ----------
+        rng : RandomState
+            Random number generator of the perturbation.
+
+        Returns
+        -------
+        ndarray
+            Best point found so far, perturbed if requested, in driver units.
+        """
+        x = self._best[2].copy()
+
+        fraction = self.options["restart_perturbation"]
+        if fraction > 0.0:
+            bounded = np.isfinite(self._lower) & np.isfinite(self._upper)
+            width = np.maximum(np.abs(x), 1.0)
+            width[bounded] = self._upper[bounded] - self._lower[bounded]
+            x += fraction * width * rng.uniform(-1.0, 1.0, x.size)
+            x = np.clip(x, self._lower, self._upper)
+
+            # Every rank that runs NLopt must restart from the same point
+            comm = self._problem().model.comm
+            if self._root_comm is None and comm.size > 1:
+                x = comm.bcast(x, root=0)
+
+        if self.options["restart_rescale"]:
+            # The factors come from the derivatives at the restart point, and the NLopt
+            # problems are rebuilt with the new bounds.
+            if not np.array_equal(x, self._last_x) or self._fresh_systems is not None:
+                self._evaluate_point(x)
+            self._setup_scaling()
+            self._nlopt_problems = {}
+
+        return x
+
+    def _race_portfolio(self, algorithms, x0):
+        """
+        Race several NLopt algorithms from the same point in forked worker processes.
+
+        The workers share the best point found so far. As soon as one of them converges
+        to a feasible point, the others are told to stop. If none converges within
+        `portfolio_maxtime`, the best point found by any of them wins instead.
+
+        Parameters
+        ----------
+        algorithms : list of str
+            Names of the NLopt algorithms to race.
+        x0 : ndarray
+            Starting point, in driver units.
+
+        Returns
+        -------
+        ndarray
+            Design point of the winner, in driver units.
+        """
+        for algorithm in algorithms:
+            if algorithm not in _optimizers:
+                msg = 'Optimizer "{}" is not implemented yet. Choose from: {}'
+                raise NotImplementedError(msg.format(algorithm, _optimizers))
+
+        if self._problem().model.comm.size > 1:
+            msg = "{}: The portfolio option is not supported when running under MPI."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        if not can_fork():
+            msg = "{}: The portfolio option needs to fork processes, which this platform cannot do."
+            raise RuntimeError(msg.format(self.msginfo))
+
+        ctx = multiprocessing.get_context("fork")
+        nparam = x0.size
+
+        # Shared best point laid out as objective, max violation, worker index and design
+        shared_best = ctx.Array("d", nparam + 3)
+        shared_best[0] = self._best[0]
+        shared_best[1] = self._best[1]
+        shared_best[2] = -1
+        shared_best[3:] = self._best[2]
+
+        stop = ctx.Event()
+        reports = ctx.Queue()
+        workers = []
+        for i, algorithm in enumerate(algorithms):
+            worker = ctx.Process(
+                target=self._portfolio_worker,
+                args=(i, algorithm, x0, stop, shared_best, reports),
+            )
+            worker.start()
+            workers.append(worker)
+
+        maxtime = self.options["portfolio_maxtime"]
+        start_time = time.perf_counter()
+        kill_time = None
+        results = [None] * len(algorithms)
+        winner = None
+        while any(result is None for result in results):
+            try:
+                report = reports.get(timeout=0.05)
+            except queue.Empty:
+                now = time.perf_counter()
+                if not stop.is_set() and maxtime > 0.0 and now - start_time > maxtime:
+                    stop.set()
+                if stop.is_set() and kill_time is None:
+                    kill_time = now + _PORTFOLIO_GRACE_TIME
+
+                # Workers that died or hang in a model evaluation are given up on
+                if kill_time is not None and now > kill_time:
+                    break
+                if not any(worker.is_alive() for worker in workers) and reports.empty():
+                    break
+                continue
+
+            results[report["index"]] = report
+            if winner is None and report["converged"]:
+                winner = report["index"]
+                stop.set()
+
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+        errors = [result["error"] for result in results if result and result["error"]]
+        if len(errors) == len(algorithms):
+            msg = "{}: Every optimizer of the portfolio failed:\n{}"
+            raise RuntimeError(msg.format(self.msginfo, "\n".join(errors)))
+
+        if winner is not None:
+            x_opt = results[winner]["x"]
+        else:
+            x_opt = np.array(shared_best[3:])
+            winner = int(shared_best[2])
+
+        if winner >= 0 and results[winner] is not None:
+            self.result = results[winner]["result"]
+        else:
+            self.result = nlopt.FORCED_STOP
+
+        for i, algorithm in enumerate(algorithms):
+            result = results[i]
+            self.stage_history.append(
+                {
+                    "optimizer": algorithm,
+                    "attempt": 0,
+                    "result": None if result is None else result["result"],
+                    "evaluations": None if result is None else result["evaluations"],
+                    "time": None if result is None else result["time"],
+                    "winner": i == winner,
+                }
+            )
+            if result is not None:
+                self.iter_count += result["evaluations"]
+
+        return x_opt
+
+    def _portfolio_worker(self, index, algorithm, x0, stop, shared_best, reports):
+        """
+        Run one optimizer of the portfolio race in a forked process and report back.
+
+        Parameters
+        ----------
+        index : int
+            Position of the optimizer in the portfolio.
+        algorithm : str
+            Name of the NLopt algorithm.
+        x0 : ndarray
+            Starting point, in driver units.
+        stop : multiprocessing.Event
+            Event set when the race is over.
+        shared_best : multiprocessing.Array
+            Objective, max violation, worker index and design of the best point of the race.
+        reports : multiprocessing.Queue
+            Queue on which the outcome is reported to the parent process.
+        """
+        self._portfolio_shared = (stop, shared_best, index)
+
+        # Only the parent process records, keeps the history and streams telemetry
+        self._telemetry = None
+        self.history = None
+        stop_recording(self._problem())
+
+        report = {
+            "index": index,
+            "result": None,
+            "converged": False,
+            "x": None,
+            "evaluations": 0,
+            "time": 0.0,
+            "error": "",
+        }
+        start_count = self.iter_count
+        start_time = time.perf_counter()
+        try:
+            opt_prob = self._get_nlopt_problem(
+                algorithm, x0, self.options["maxiter"], self.options["maxtime"]
+            )
+            x_opt = opt_prob.optimize(x0 / self._x_scale) * self._x_scale
+            report["result"] = opt_prob.last_optimize_result()
+
+            if self._exc_info is None and not np.array_equal(x_opt, self._last_x):
+                self._evaluate_point(x_opt)
+            if self._exc_info is not None:
+                self._reraise()
+
+            max_cv = self._maxconstraint_violation(self._con_cache)
+            report["converged"] = (
+                report["result"] in CONVERGED_RESULTS and max_cv <= FEASIBILITY_TOL
+            )
+            report["x"] = x_opt
+
+        except nlopt.ForcedStop:
+            report["result"] = nlopt.FORCED_STOP
+
+        except Exception as err:
+            report["error"] = "{}: {!r}".format(algorithm, err)
+
+        report["evaluations"] = self.iter_count - start_count
+        report["time"] = time.perf_counter() - start_time
+        reports.put(report)
+
+    def _evaluate_point(self, x_new, responses=None):
+        """
+        Run the model at a new design point and cache the results.
+
+        Parameters
+        ----------
+        x_new : ndarray
+            Array containing parameter values at new design point.
+        responses : list of str or None
+            Names of the responses needed at the new design point. When partial
+            evaluation is active, only the subsystems they depend on are run. If None,
+            the whole model is run.
+
+        Returns
+        -------
+        float or None
+            Value of the objective function evaluated at the new design point, or None if
+            it has not been evaluated.
+        """
+        model = self._problem().model
+        self._claim_speculative_gradient(None)
+        self._last_x = None
+        self._grad_block = None
+        self._penalized = False
+
+        if self._root_comm is not None and self._root_comm.rank == 0:
+            self._root_comm.bcast(("eval", x_new), root=0)
+
+        self._set_design_point(x_new)
+
+        if self._proxy is not None:
+            self.iter_count += 1
+            self._last_x = x_new.copy()
+            self._fresh_systems = None
+            f_new, self._con_cache = self._proxy_point(x_new, gradient=responses is None)
+            self._last_eval = (f_new, self._con_cache)
+            self._store_evaluation(x_new, f_new)
+            return f_new
+
+        if responses is not None and self._response_systems is not None:
+            self.iter_count += 1
+            self._last_x = x_new.copy()
+            self._fresh_systems = set()
+            self._con_cache = {}
+            self._last_eval = (None, self._con_cache)
+            return self._evaluate_responses(responses)
+
+        with RecordingDebugging(self._get_name(), self.iter_count, self) as rec:
+            self.iter_count += 1
+
+            # This is the actual model evaluation for OpenMDAO
+            self._penalized = self._run_with_timeout(model.run_solve_nonlinear)
+
+        self._last_x = x_new.copy()
+        self._fresh_systems = None
+
+        if self._penalized:
+            return self._penalize_point()
+
+        # Get the objective function evaluations
+        f_new, self._con_cache = self._get_response_values()
+        self._last_eval = (f_new, self._con_cache)
+        if f_new is not None:
+            self._store_evaluation(x_new, f_new)
+
+        return f_new
+
+    def _evaluate_responses(self, responses):
+        """
+        Evaluate responses at `_last_x` that a partial evaluation has not evaluated yet.
+
+        Only the top-level subsystems that the responses depend on and that have not been
+        run at this point are run, in execution order.
+
+        Parameters
+        ----------
+        responses : list of str
+            Names of the responses to evaluate.
+
+        Returns
+        -------
+        float or None
+            Value of the objective function at `_last_x`, or None if it has not been
+            evaluated.
+        """
+        f_new, cons = self._last_eval
+        missing = [
+            name
+            for name in responses
+            if (name in self._objs and f_new is None) or (name in self._cons and name not in cons)
+        ]
+        if not missing:
+            return f_new
+
+        needed = set()
+        for name in missing:
+            needed.update(self._response_systems[name])
+
+        model = self._problem().model
+
+        def run_subsystems():
+            with model._scaled_context_all():
+                for sys_name, sinfo in model._subsystems_allprocs.items():
+                    if sys_name in needed and sys_name not in self._fresh_systems:
+                        model._transfer("nonlinear", "fwd", sys_name)
+                        sinfo.system._solve_nonlinear()
+                        self._fresh_systems.add(sys_name)
+
+        if self._run_with_timeout(run_subsystems):
+            self._penalized = True
+            return self._penalize_point()
+
+        for name in missing:
+            if name in self._objs:
+                f_new = self._get_voi_val(name, self._objs[name], self._remote_objs)
+            else:
+                cons[name] = self._get_voi_val(name, self._cons[name], self._remote_cons)
+        self._last_eval = (f_new, cons)
+
+        # The point can be cached once every response has been evaluated
+        if f_new is not None and len(cons) == len(self._cons):
+            self._store_evaluation(self._last_x, f_new)
+
+        return f_new
+
+    def _run_with_timeout(self, run):
+        """
+        Run part of a model evaluation, interrupting it after `eval_timeout` seconds.
+
+        Parameters
+        ----------
+        run : callable
+            Function that runs the model.
+
+        Returns
+        -------
+        bool
+            True if the run was interrupted.
+        """
+        timeout = self.options["eval_timeout"]
+        if timeout is None:
+            run()
+            return False
+
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        try:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            run()
+        except _EvaluationTimeout:
+            self._problem().model._clear_iprint()
+            return True
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0.0)
+            signal.signal(signal.SIGALRM, previous)
+
+        return False
+
+    def _penalize_point(self):
+        """
+        Replace the responses at `_last_x` with the penalty of an aborted evaluation.
+
+        Returns
+        -------
+        float
+            The penalty objective value.
+        """
+        penalty = self.options["timeout_penalty"]
+        self.timeout_count += 1
+        self._fresh_systems = None
+
+        # Every constraint misses its bound by the penalty
+        self._con_cache = {}
+        for name, meta in self._cons.items():
+            if meta["equals"] is not None:
+                val = meta["equals"] + penalty
+            else:
+                upper = meta["upper"]
+                val = np.where(upper < openmdao.INF_BOUND, upper + penalty, meta["lower"] - penalty)
+            self._con_cache[name] = np.broadcast_to(val, (meta["size"],)).copy()
+
+        self._last_eval = (penalty, self._con_cache)
+        self._store_evaluation(self._last_x, penalty)
+
+        msg = "{}: A model evaluation exceeded 'eval_timeout' and was aborted."
+        simple_warning(msg.format(self.msginfo))
+        return penalty
+
+    def _get_recorder_metadata(self, case_name):
+        """
+        Return metadata from the latest iteration for use in the recorder.
+
+        Parameters
+        ----------
+        case_name : str
+            Name of current case.
+
+        Returns
+        -------
+        dict
+            Metadata dictionary for the recorder, marking aborted evaluations as failed.
+        """
+        metadata = create_local_meta(case_name)
+        if self._penalized:
+            metadata["success"] = 0
+            metadata["msg"] = "Evaluation exceeded 'eval_timeout' and was aborted."
+        return metadata
+
+    def _proxy_point(self, x, gradient=False):
+        """
+        Return the objective and constraint values that `_proxy` gives at a design point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        gradient : bool
+            If True and NLopt uses gradients, scenarios compute the derivatives it is about
+            to ask for at this point in the same pass as the values.
+
+        Returns
+        -------
+        float
+            Value of the objective.
+        dict
+            Constraint values keyed by constraint name.
+        """
+        if gradient and self.options["scenarios"] is not None and self.supports["gradients"]:
+            self._proxy.totals(x, self._obj_and_nlcons)
+
+        values = self._proxy.evaluate(x)
+        f_new = values[list(self._objs)[0]][0]
+        return f_new, {name: values[name] for name in self._cons}
+
+    def _set_design_point(self, x_new):
+        """
+        Pass a flattened design point to the design variables of the model.
+
+        Parameters
+        ----------
+        x_new : ndarray
+            Driver-scaled design point. Distributed design variables take their local slice.
+        """
+        i = 0
+        for name, meta in self._designvars.items():
+            size = meta["global_size"] if meta["distributed"] else meta["size"]
+            self.set_design_var(name, x_new[i: i + size])
+            i += size
+
+    def _get_response_values(self):
+        """
+        Return the objective and constraint values of the current model state.
+
+        When NLopt only runs on the root rank, distributed responses are gathered to that
+        rank alone and the other ranks get None.
+
+        Returns
+        -------
+        float or None
+            Value of the objective.
+        dict or None
+            Constraint values keyed by constraint name.
+        """
+        if self._root_comm is None:
+            f_new = list(self.get_objective_values().values())[0]
+            return f_new, self.get_constraint_values()
+
+        f_new = None
+        cons = {}
+        for name, meta in self._objs.items():
+            f_new = self._gather_voi_val(name, meta, self._remote_objs)
+        for name, meta in self._cons.items():
+            cons[name] = self._gather_voi_val(name, meta, self._remote_cons)
+
+        if self._root_comm.rank != 0:
+            return None, None
+
+        return f_new, cons
+
+    def _gather_voi_val(self, name, meta, remote_vois):
+        """
+        Get the value of a variable of interest on the root rank only.
+
+        Distributed variables are gathered to the root rank instead of to every rank.
+        Other variables are small and are retrieved as usual.
+
+        Parameters
+        ----------
+        name : str
+            Name of the variable of interest.
+        meta : dict
+            Metadata for the variable of interest.
+        remote_vois : dict
+            Dict containing (owning_rank, size) for all remote vois of a particular
+            type (design var, constraint, or objective).
+
+        Returns
+        -------
+        float or ndarray or None
+            The driver-scaled value on the root rank, None on the other ranks.
+        """
+        src_name = meta["ivc_source"] if meta.get("ivc_source") is not None else name
+        if src_name not in self._dist_driver_vars:
+            return self._get_voi_val(name, meta, remote_vois)
+
+        comm = self._root_comm
+        local_val = self._problem().model.get_val(src_name, flat=True)
+        local_indices, sizes, _ = self._dist_driver_vars[src_name]
+        if local_indices is not None:
+            local_val = local_val[local_indices]
+        local_val = np.ascontiguousarray(local_val, dtype=float)
+
+        if comm.rank != 0:
+            comm.Gatherv(local_val, None, root=0)
+            return None
+
+        offsets = np.zeros(sizes.size, dtype=int)
+        offsets[1:] = np.cumsum(sizes[:-1])
+        val = np.zeros(np.sum(sizes))
+        comm.Gatherv(local_val, [val, sizes, offsets, MPI.DOUBLE], root=0)
+
+        if self._has_scaling:
+            adder = meta["total_adder"]
+            if adder is not None:
+                val += adder
+
+            scaler = meta["total_scaler"]
+            if scaler is not None:
+                val *= scaler
+
+        return val
+
+    def _compute_nl_totals(self, copy=False):
+        """
+        Compute the total derivatives of the objective and nonlinear constraints.
+
+        Parameters
+        ----------
+        copy : bool
+            If True, return a copy of the Jacobian instead of the array that the next
+            computation overwrites.
+
+        Returns
+        -------
+        ndarray
+            Total Jacobian with the objective in row 0.
+        """
+        if self._root_comm is not None and self._root_comm.rank == 0:
+            self._root_comm.bcast(("totals", None), root=0)
+
+        if self._proxy is not None:
+            return self._proxy.totals(self._last_x, self._obj_and_nlcons)
+
+        # The plan built by the first call is kept by the driver and reused by all later
+        # calls, including those of the following runs with the same layout.
+        jac = self._compute_totals(
+            of=self._obj_and_nlcons, wrt=self._dvlist, return_format="array"
+        )
+        self._totals_plan = self._total_jac
+        return jac.copy() if copy else jac
+
+    def _claim_speculative_gradient(self, x):
+        """
+        Wait for the speculative gradient in progress, if any, and return it if it is at x.
+
+        The model is shared with the background computation, so it must have finished
+        before the model is used again. A computation that has not started yet is cancelled.
+
+        Parameters
+        ----------
+        x : ndarray or None
+            Driver-scaled design point at which the gradient is needed, or None if it is
+            not needed.
+
+        Returns
+        -------
+        ndarray or None
+            Total Jacobian at x, or None if no speculative gradient was computed there.
+        """
+        if self._speculative_grad is None:
+            return None
+
+        x_bytes, future = self._speculative_grad
+        self._speculative_grad = None
+        if x is not None and x.tobytes() == x_bytes:
+            jac = future.result()
+            self.speculative_hits += 1
+            return jac
+
+        if not future.cancel():
+            # The result is not needed, so neither is its error
+            future.exception()
+        return None
+
+    def _follow_root(self):
+        """
+        Mirror the model evaluations and derivative computations of the root rank.
+
+        This runs on every rank but the root one when only the root rank runs NLopt. The
+        followers take part in the collective model runs and derivative computations. They
+        get none of the gathered response values, but OpenMDAO assembles the full total
+        Jacobian on them as well.
+        """
+        comm = self._root_comm
+        while True:
+            cmd, data = comm.bcast(None, root=0)
+            if cmd == "eval":
+                self._evaluate_point(data)
+            elif cmd == "totals":
+                self._compute_nl_totals()
+            elif cmd == "block":
+                self._compute_totals_block(data)
+            else:
+                self.result = data
+                break
+
+    def _store_evaluation(self, x, f):
+        """
+        Add the current evaluation to the evaluation cache and update the best point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Design point of the evaluation.
+        f : float
+            Objective value at the design point.
+        """
+        f = float(f)
+        max_cv = self._maxconstraint_violation(self._con_cache)
+
+        cache_size = self.options["eval_cache_size"]
+        if cache_size > 0:
+            self._eval_cache[x.tobytes()] = (f, self._con_cache, max_cv)
+            if len(self._eval_cache) > cache_size:
+                self._eval_cache.popitem(last=False)
+
+        best = self._best
+        if best is None or is_better(f, max_cv, best[0], best[1]):
+            self._best = (f, max_cv, x.copy())
+
+        # Share the point with the other optimizers of a portfolio race
+        if self._portfolio_shared is not None:
+            shared_best = self._portfolio_shared[1]
+            with shared_best.get_lock():
+                if is_better(f, max_cv, shared_best[0], shared_best[1]):
+                    shared_best[0] = f
+                    shared_best[1] = max_cv
+                    shared_best[2] = self._portfolio_shared[2]
+                    shared_best[3:] = x
+
+    def _objfunc(self, x_new, grad):
+        """
+        Evaluate and return the objective function.
+
+        Model is executed here, unless the point is found in the evaluation cache.
+
+        Parameters
+        ----------
+        x_new : ndarray
+            Array containing parameter values at new design point, as seen by NLopt.
+        grad : ndarray
+            Empty array that is modified in-place with gradient information for
+            the new design point.
+
+        Returns
+        -------
+        float
+            Value of the objective function evaluated at the new design point, as seen
+            by NLopt.
+        """
+        # Another optimizer of a portfolio race has won
+        if self._portfolio_shared is not None and self._portfolio_shared[0].is_set():
+            raise nlopt.ForcedStop()
+
+        x_new = x_new * self._x_scale
+        at_last_x = self._last_x is not None and np.array_equal(x_new, self._last_x)
+        cached = self._eval_cache.get(x_new.tobytes())
+        cache_hit = True
+
+        try:
+
+            # NLopt often asks for the gradient at the point it just evaluated, in which
+            # case the model already holds the right state and does not need to be run.
+            # Points evaluated earlier can only be served from the cache if no gradient
+            # is needed, since the model state is needed to compute the derivatives.
+            if at_last_x:
+                f_new, self._con_cache = self._last_eval
+            elif cached is not None and grad.size == 0:
+                f_new, self._con_cache = cached[:2]
+            else:
+                cache_hit = False
+                best = self._best
+                f_new = self._evaluate_point(x_new, None if grad.size > 0 else list(self._objs))
+
+                # NLopt may come back for the gradient at this point, which line searches
+                # mostly do when it has become the best point so far. Its computation then
+                # starts in the background while NLopt checks the new point.
+                if (
+                    grad.size == 0
+                    and self._grad_executor is not None
+                    and self._exc_info is None
+                    and not self._penalized
+                    and self._best is not best
+                ):
+                    self._speculative_grad = (
+                        x_new.tobytes(),
+                        self._grad_executor.submit(self._compute_nl_totals, True),
+                    )
+
+            # After a partial evaluation, the objective may still be missing, and the
+            # derivatives need every response to be up to date.
+            if self._fresh_systems is not None and (at_last_x or not cache_hit):
+                responses = list(self._objs)
+                if grad.size > 0:
+                    responses += list(self._cons)
+                f_new = self._evaluate_responses(responses)
+
+        except Exception as msg:
+            self._exc_info = msg
+
+        try:
+            if grad.size > 0:
+                # The model state of an aborted evaluation has no meaningful derivatives
+                if self._penalized:
+                    grad[:] = 0.0
+                elif self._jac_blocks is not None:
+                    grad[:] = self._obj_scale * self._nl_gradient_row(0) * self._x_scale
+                else:
+                    self._grad_cache = self._claim_speculative_gradient(x_new)
+                    if self._grad_cache is None:
+                        self._grad_cache = self._compute_nl_totals()
+                    grad[:] = self._obj_scale * self._grad_cache[0, :] * self._x_scale
+
+        except Exception as msg:
+            self._exc_info = msg
+
+        if self._exc_info is None:
+            self._log_evaluation(x_new, float(f_new), grad.size > 0, cache_hit)
+
+        return self._obj_scale * float(f_new)
+
+    def _log_evaluation(self, x, f, grad, cache_hit):
+        """
+        Add an objective evaluation to the history and the telemetry stream.
+
+        Parameters
+        ----------
+        x : ndarray
+            Design point, in driver units.
+        f : float
+            Objective value.
+        grad : bool
+            True if derivatives were computed at this point.
+        cache_hit : bool
+            True if the model did not have to be run.
+        """
+        elapsed = time.perf_counter() - self._start_time
+        max_cv = self._maxconstraint_violation(self._con_cache)
+
+        if self.history is not None:
+            con = [
+                np.ravel(self._con_cache[name]) if name in self._con_cache
+                else np.full(con_scale.size, np.nan)
+                for name, con_scale in self._con_scale.items()
+            ]
+            con = np.concatenate(con) if con else np.empty(0)
+            self.history.append(x, f, con, max_cv, grad, elapsed)
+
+        if self._telemetry is not None:
+            self._telemetry.write(
+                {
+                    "iter": self.iter_count,
+                    "time": elapsed,
+                    "obj": f,
+                    "max_cv": max_cv,
+                    "grad": grad,
+                    "cache_hit": cache_hit,
+                    "timeout": self._penalized and np.array_equal(x, self._last_x),
+                }
+            )
+
+    def _confunc(self, x_new, grad, name, dbl, idx):
+        """
+        Return the value of the constraint function requested in args.
+
+        Note that this function is called for each constraint, so the model is only run when the
+        objective is evaluated.
+
+        Parameters
+        ----------
+        x_new : ndarray
+            Array containing parameter values at new design point.
+        grad : ndarray
+            Empty array that is modified in-place with gradient information for
+            the new design point.
+        name : string
+            Name of the constraint to be evaluated.
+        dbl : bool
+            True if double sided constraint.
+        idx : float
+            Contains index into the constraint array.
+
+        Returns
+        -------
+        float
+            Value of the constraint function.
+        """
+        if self._exc_info is not None:
+            self._reraise()
+
+        # Some algorithms ask for the constraints at a point before the objective, or
+        # without it, so partial evaluations evaluate them on demand.
+        if self._response_systems is not None:
+            x_new = x_new * self._x_scale
+            cached = self._eval_cache.get(x_new.tobytes())
+            if self._last_x is not None and np.array_equal(x_new, self._last_x):
+                if self._fresh_systems is not None:
+                    self._evaluate_responses([name])
+                self._con_cache = self._last_eval[1]
+            elif cached is not None and grad.size == 0:
+                self._con_cache = cached[1]
+            else:
+                self._evaluate_point(x_new, None if grad.size > 0 else [name])
+                if grad.size > 0 and self._jac_blocks is None:
+                    self._grad_cache = self._compute_nl_totals()
+
+        cons = self._con_cache
+        meta = self._cons[name]
+
+        grad_idx = self._con_idx[name] + idx
+        scale = self._con_scale[name][idx]
+
+        # Same test as the layout, which only caches linear gradients if gradients are used
+        linear = self.supports["gradients"] and meta["linear"]
+        if grad.size == 0:
+            grad_row = None
+        elif self._penalized and not linear:
+            grad_row = np.zeros(grad.size)
+        elif linear:
+            grad_row = self._lincongrad_cache[grad_idx]
+        elif self._jac_blocks is not None:
+            grad_row = self._nl_gradient_row(grad_idx)
+        else:
+            grad_row = self._grad_cache[grad_idx]
+
+        # Equality constraints
+        equals = meta["equals"]
+        if equals is not None:
+            if isinstance(equals, np.ndarray):
+                equals = equals[idx]
+            if grad.size > 0:
+                grad[:] = scale * grad_row * self._x_scale
+            return scale * (cons[name][idx] - equals)
+
+        # Note, NLopt defines constraints to be satisfied when negative,
+        # which is the same as OpenMDAO.
+        upper = meta["upper"]
+        if isinstance(upper, np.ndarray):
+            upper = upper[idx]
+
+        lower = meta["lower"]
+        if isinstance(lower, np.ndarray):
+            lower = lower[idx]
+
+        if dbl or (lower <= -openmdao.INF_BOUND):
+            if grad.size > 0:
+                grad[:] = scale * grad_row * self._x_scale
+            return scale * (cons[name][idx] - upper)
+        else:
+            if grad.size > 0:
+                grad[:] = -scale * grad_row * self._x_scale
+            return scale * (lower - cons[name][idx])
+
+    def _maxconstraint_violation(self, cons):
+        """
+        Return the largest violation of any constraint bound.
+
+        Parameters
+        ----------
+        cons : dict
+            Driver-scaled constraint values keyed by constraint name.
+
+        Returns
+        -------
+        float
+            Largest amount by which an evaluated constraint misses its bound, or 0 if all
+            are satisfied.
+        """
+        return constraint_violation(cons, self._cons)
+
+    def _reraise(self):
+        """
+        Reraise any exception encountered when NLopt calls back into our method.
+        """
+        exc = self._exc_info
+        raise exc
+
+
+def _raise_timeout(signum, frame):
+    """
+    Abort the model evaluation in progress when the `eval_timeout` alarm goes off.
+
+    Parameters
+    ----------
+    signum : int
+        Number of the signal.
+    frame : frame
+        Frame that was executing when the signal arrived.
+    """
+    raise _EvaluationTimeout()
+
+
+def _equilibrate(jac, chunk):
+    """
+    Return Ruiz scale factors that bring every row and column of a Jacobian to about one.
+
+    The Jacobian is read in chunks of rows and left unchanged, so that it can live in a
+    memory-mapped file.
+
+    Parameters
+    ----------
+    jac : ndarray or numpy.memmap
+        Jacobian, one row per response entry and one column per design variable entry.
+    chunk : int
+        Number of rows read at a time.
+
+    Returns
+    -------
+    ndarray
+        Row scale factors.
+    ndarray
+        Column scale factors.
+    """
+    num_rows, num_cols = jac.shape
+    row_scale = np.ones(num_rows)
+    col_scale = np.ones(num_cols)
+    chunk = max(chunk, 1)
+    for i in range(_NUM_SCALING_ITERATIONS):
+        row_max = np.zeros(num_rows)
+        col_max = np.zeros(num_cols)
+        for start in range(0, num_rows, chunk):
+            block = np.abs(jac[start: start + chunk])
+            block *= row_scale[start: start + chunk, np.newaxis] * col_scale
+            if num_cols > 0:
+                row_max[start: start + chunk] = np.max(block, axis=1)
+                col_max = np.maximum(col_max, np.max(block, axis=0))
+
+        # Rows and columns without derivatives are left alone
+        row_scale *= 1.0 / np.sqrt(np.where(row_max > 0.0, row_max, 1.0))
+        col_scale *= 1.0 / np.sqrt(np.where(col_max > 0.0, col_max, 1.0))
+
+    return row_scale, col_scale
+
+
+def _scratch_array(shape):
+    """
+    Return a zeroed array backed by an anonymous temporary file.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the array.
+
+    Returns
+    -------
+    numpy.memmap or ndarray
+        Array whose pages the operating system can write out instead of holding them in
+        memory, or an empty array if the shape has no entries.
+    """
+    if np.prod(shape) == 0:
+        return np.zeros(shape)
+
+    with tempfile.TemporaryFile() as scratch:
+        return np.memmap(scratch, dtype=float, mode="w+", shape=shape)
+
+
+def signature_extender(fcn, extra_args):
+    """
+    Closure function, which appends extra arguments to the original function call.
+
+    The first argument is the design vector and the second is the gradient vector.
+    The possible extra arguments from the callback
+    of :func:`NLopt.optimize` are not passed to the function.
+
+    Parameters
+    ----------
+    fcn : callable
+        Function, which takes the design vector as the first argument.
+    extra_args : tuple or list
+        Extra arguments for the function
+
+    Returns
+    -------
+    callable
+        The function with the signature expected by the driver.
+    """
+    def closure(x, grad, *args):
+        return fcn(x, grad, *extra_args)
+
+    return closure
@@ -0,0 +1,315 @@
+"""
+Replay of recorded evaluations, for tuning NLoptDriver without running the model.
+
+A `ReplayDatabase` answers the function and gradient requests of NLoptDriver from the cases
+recorded by an earlier run, or from its evaluation history. Points that were recorded are
+answered exactly. Other points are answered from a first-order expansion about the nearest
+recorded gradient, or from a linear fit of the nearest recorded points, and are flagged as
+misses so that they can be evaluated for real later.
+"""
+
+import sqlite3
+
+import numpy as np
+
+from nrel_openmdao_extensions.history import EvaluationHistory
+
+
+class ReplayDatabase(object):
+    """
+    Recorded evaluations that NLoptDriver answers its requests from instead of the model.
+
+    The recording must come from a problem with the same design variables, objective and
+    constraints, with the same ref/ref0 scaling, since values are replayed as the driver
+    sees them.
+
+    Attributes
+    ----------
+    source : str or EvaluationHistory
+        Where the evaluations are read from.
+    misses : list of ndarray
+        Driver-scaled design points that could not be answered exactly from the recorded
+        evaluations since the database was last bound to a driver.
+    _x : ndarray
+        Recorded design points, one row per evaluation.
+    _values : dict
+        Recorded response values, one row per evaluation and NaN where unknown, keyed by
+        response name.
+    _totals : dict
+        Recorded derivatives of each response with respect to the whole design vector, one
+        block per evaluation and NaN where unknown, keyed by response name.
+    _index : dict
+        Row of the last evaluation of each design point, keyed by its bytes.
+    """
+
+    def __init__(self, source):
+        """
+        Store the source of the evaluations.
+
+        Parameters
+        ----------
+        source : str or EvaluationHistory
+            Evaluation history of an NLoptDriver run, path of a `.npy` file to which one
+            was saved, or path of a case recorder database written by an NLoptDriver. Only
+            the database holds derivatives, and only if `record_derivatives` was set.
+        """
+        self.source = source
+        self.misses = []
+        self._x = None
+        self._values = {}
+        self._totals = {}
+        self._index = {}
+
+    def _bind(self, driver):
+        """
+        Read the evaluations in the layout of the design variables and responses of a driver.
+
+        Parameters
+        ----------
+        driver : NLoptDriver
+            Driver whose requests are answered.
+        """
+        sizes = {}
+        for name, meta in list(driver._designvars.items()) + list(driver._responses.items()):
+            sizes[name] = meta["global_size"] if meta["distributed"] else meta["size"]
+        responses = list(driver._objs) + list(driver._cons)
+
+        source = self.source
+        if isinstance(source, EvaluationHistory):
+            self._read_history(source.data, driver, responses, sizes)
+        elif source.endswith(".npy"):
+            self._read_history(np.load(source, mmap_mode="r"), driver, responses, sizes)
+        else:
+            self._read_cases(source, driver, responses, sizes)
+
+        self._index = {}
+        for i, x in enumerate(self._x):
+            self._index[x.tobytes()] = i
+        self.misses = []
+
+    def _read_history(self, data, driver, responses, sizes):
+        """
+        Read the evaluations of an evaluation history.
+
+        Parameters
+        ----------
+        data : ndarray
+            Structured rows of the history.
+        driver : NLoptDriver
+            Driver whose requests are answered.
+        responses : list of str
+            Names of the objective and constraints, in this order.
+        sizes : dict
+            Sizes of the design variables and responses, keyed by name.
+        """
+        self._x = np.array(data["x"], dtype=float)
+        num_x = self._x.shape[1]
+
+        # The constraint columns follow the order of the constraints of the driver
+        con = np.asarray(data["con"], dtype=float)
+        self._values = {}
+        self._totals = {}
+        start = 0
+        for name in responses:
+            size = sizes[name]
+            if name in driver._objs:
+                self._values[name] = np.array(data["obj"], dtype=float).reshape(-1, 1)
+            else:
+                self._values[name] = con[:, start: start + size].copy()
+                start += size
+            self._totals[name] = np.full((len(data), size, num_x), np.nan)
+
+    def _read_cases(self, filename, driver, responses, sizes):
+        """
+        Read the driver cases of a case recorder database.
+
+        Parameters
+        ----------
+        filename : str
+            Path of the database.
+        driver : NLoptDriver
+            Driver whose requests are answered.
+        responses : list of str
+            Names of the objective and constraints.
+        sizes : dict
+            Sizes of the design variables and responses, keyed by name.
+        """
+        from openmdao.api import CaseReader
+        from openmdao.recorders.sqlite_recorder import blob_to_array
+
+        reader = CaseReader(filename)
+        cases = [
+            reader.get_case(case_id)
+            for case_id in reader.list_cases("driver", recurse=False, out_stream=None)
+        ]
+
+        num_x = sum(sizes[name] for name in driver._designvars)
+        self._x = np.empty((len(cases), num_x))
+        self._values = {name: np.full((len(cases), sizes[name]), np.nan) for name in responses}
+        self._totals = {
+            name: np.full((len(cases), sizes[name], num_x), np.nan) for name in responses
+        }
+
+        rows = {}
+        for i, case in enumerate(cases):
+            rows[case.name] = i
+            desvars = case.get_design_vars(scaled=True)
+            self._x[i] = np.concatenate([np.ravel(desvars[name]) for name in driver._designvars])
+
+            objs = case.get_objectives(scaled=True)
+            cons = case.get_constraints(scaled=True)
+            for name in responses:
+                values = objs if name in driver._objs else cons
+                self._values[name][i] = np.ravel(values[name])
+
+        # NLoptDriver counts an evaluation before it is recorded, so the derivatives recorded
+        # with iteration k were computed at the point of iteration k - 1. The last ones have
+        # no case of their own, so they are read from the derivatives table directly.
+        with sqlite3.connect(filename) as con:
+            deriv_rows = con.execute(
+                "SELECT iteration_coordinate, derivatives FROM driver_derivatives"
+            ).fetchall()
+        con.close()
+
+        for coord, blob in deriv_rows:
+            prefix, _, counter = coord.rpartition("|")
+            i = rows.get("{}|{}".format(prefix, int(counter) - 1))
+            jac = blob_to_array(blob)
+            if i is None or not jac.shape:
+                continue
+
+            for name in responses:
+                start = 0
+                for dv_name in driver._designvars:
+                    key = "{}!{}".format(name, dv_name)
+                    if key in jac.dtype.names:
+                        self._totals[name][i, :, start: start + sizes[dv_name]] = jac[key][0]
+                    start += sizes[dv_name]
+
+    def evaluate(self, x):
+        """
+        Return the values of every response at a design point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+
+        Returns
+        -------
+        dict
+            Driver-scaled response values, keyed by response name.
+        """
+        exact = True
+        values = {}
+        row = self._index.get(x.tobytes())
+        for name, recorded in self._values.items():
+            if row is not None and not np.any(np.isnan(recorded[row])):
+                values[name] = recorded[row].copy()
+            else:
+                values[name] = self._approximate(x, name)[0]
+                exact = False
+
+        if not exact:
+            self._add_miss(x)
+
+        return values
+
+    def totals(self, x, of):
+        """
+        Return the derivatives of some responses at a design point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        of : list of str
+            Names of the responses.
+
+        Returns
+        -------
+        ndarray
+            Driver-scaled derivatives, one row per response entry in the order of `of`,
+            one column per design variable entry.
+        """
+        exact = True
+        blocks = []
+        row = self._index.get(x.tobytes())
+        for name in of:
+            recorded = self._totals[name]
+            if row is not None and not np.any(np.isnan(recorded[row])):
+                blocks.append(recorded[row])
+            else:
+                blocks.append(self._approximate(x, name)[1])
+                exact = False
+
+        if not exact:
+            self._add_miss(x)
+
+        return np.vstack(blocks)
+
+    def _approximate(self, x, name):
+        """
+        Approximate the value and derivatives of a response at a point that was not recorded.
+
+        The expansion about the nearest point with recorded derivatives is used if there is
+        one. Otherwise a linear function is fitted to the nearest recorded values, weighted
+        by inverse distance, or the nearest value is used as a constant when there are too
+        few of them to fit.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        name : str
+            Name of the response.
+
+        Returns
+        -------
+        ndarray
+            Approximate value.
+        ndarray
+            Approximate derivatives, one row per response entry.
+        """
+        values = self._values[name]
+        totals = self._totals[name]
+        num_x = x.size
+        dist = np.linalg.norm(self._x - x, axis=1)
+
+        with_totals = np.flatnonzero(
+            ~np.isnan(values).any(axis=1) & ~np.isnan(totals).any(axis=(1, 2))
+        )
+        if with_totals.size > 0:
+            i = with_totals[np.argmin(dist[with_totals])]
+            return values[i] + totals[i].dot(x - self._x[i]), totals[i].copy()
+
+        known = np.flatnonzero(~np.isnan(values).any(axis=1))
+        if known.size == 0:
+            raise RuntimeError("No recorded value of '{}' to replay.".format(name))
+
+        # Duplicate points carry no information for the fit
+        _, first = np.unique(self._x[known], axis=0, return_index=True)
+        known = known[np.sort(first)]
+        nearest = known[np.argsort(dist[known])]
+        if nearest.size < num_x + 1:
+            return values[nearest[0]].copy(), np.zeros((values.shape[1], num_x))
+
+        nearest = nearest[: 2 * (num_x + 1)]
+        weights = 1.0 / (dist[nearest] + 1e-12 * (1.0 + np.linalg.norm(x)))
+        lhs = np.hstack((np.ones((nearest.size, 1)), self._x[nearest] - x))
+        coef = np.linalg.lstsq(
+            lhs * weights[:, np.newaxis], values[nearest] * weights[:, np.newaxis], rcond=None
+        )[0]
+        return coef[0], coef[1:].T
+
+    def _add_miss(self, x):
+        """
+        Flag a design point that needs a real evaluation.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        """
+        if not self.misses or not np.array_equal(self.misses[-1], x):
+            self.misses.append(x.copy())
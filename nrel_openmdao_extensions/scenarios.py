@@ -0,0 +1,503 @@
+"""
+Concurrent evaluation of scenarios, such as load cases, aggregated for NLoptDriver.
+
+A `ScenarioSet` evaluates the same design in several scenarios at once, either on forked
+worker processes or on MPI sub-communicators, and aggregates the objective and constraint
+values and derivatives of all scenarios into those NLoptDriver optimizes. An evaluation
+then takes about as long as the slowest scenario instead of the sum of all of them.
+"""
+
+import multiprocessing
+import os
+import traceback
+
+import numpy as np
+
+from nrel_openmdao_extensions.driver_utils import can_fork, stop_recording
+
+# Rules that combine the values of a response over the scenarios
+_aggregation_rules = {"sum", "max", "ks"}
+
+
+class ScenarioSet(object):
+    """
+    Scenarios that NLoptDriver evaluates concurrently and aggregates into its responses.
+
+    The problem of the driver defines the design variables, objective and constraints.
+    Every scenario must have the same ones, with the same scaling. Linear constraints only
+    depend on the design variables, so they are taken from the first scenario.
+
+    Attributes
+    ----------
+    settings : list
+        Setting of each scenario.
+    aggregation : dict
+        Aggregation rule of the responses, keyed by response name.
+    weights : ndarray
+        Weight of each scenario in the weighted sums.
+    ks_rho : float
+        Aggregation parameter of the Kreisselmeier-Steinhauser function.
+    build_problem : callable or None
+        Function that returns the problem of a scenario, or None to use copies of the
+        problem of the driver.
+    num_procs : int or None
+        Number of worker processes.
+    _driver : NLoptDriver or None
+        Driver the scenarios are evaluated for, while started.
+    _workers : list of tuple
+        Process and parent end of the pipe of each worker process.
+    _comm : MPI.Comm or None
+        Communicator of the model of the driver when the scenarios run on sub-communicators.
+    _sub_comm : MPI.Comm or None
+        Sub-communicator of this rank.
+    _problems : dict
+        Problems of the scenarios of the sub-communicator of this rank, keyed by scenario
+        index.
+    _states : dict
+        Scenario index and design point bytes of the state each problem of `_problems`
+        holds, keyed by the id of the problem.
+    _cache : tuple or None
+        Bytes of the design point, names of the responses whose derivatives were computed,
+        and results of every scenario at the last point evaluated.
+    """
+
+    def __init__(
+        self,
+        settings,
+        aggregation=None,
+        weights=None,
+        ks_rho=50.0,
+        build_problem=None,
+        num_procs=None,
+    ):
+        """
+        Store the scenarios and how their responses are aggregated.
+
+        Parameters
+        ----------
+        settings : list
+            Setting of each scenario. Without `build_problem`, a setting is a dict of model
+            variable values, keyed by any name accepted by `Problem.set_val`, applied to a
+            copy of the problem of the driver.
+        aggregation : dict or None
+            Rule that aggregates the values of a response over the scenarios, keyed by
+            response name as given by `get_objective_values` and `get_constraint_values`:
+            "sum" for the weighted sum, "max" for the largest value, or "ks" for the
+            Kreisselmeier-Steinhauser function, a smooth upper bound of the largest value.
+            Responses not listed are summed.
+        weights : list of float or None
+            Weight of each scenario in the weighted sums. Defaults to equal weights that
+            add up to one.
+        ks_rho : float
+            Aggregation parameter of the Kreisselmeier-Steinhauser function. Larger values
+            bring it closer to the largest value.
+        build_problem : callable or None
+            Function called as `build_problem(setting)`, or `build_problem(setting, comm)`
+            when the model of the driver runs under MPI, that returns a Problem set up for a
+            scenario. Required under MPI, where the scenarios are split over
+            sub-communicators of the model communicator.
+        num_procs : int or None
+            Number of worker processes when the model of the driver runs on a single
+            process. Defaults to one per scenario, up to the number of CPUs.
+        """
+        num = len(settings)
+        if num == 0:
+            raise ValueError("ScenarioSet needs at least one scenario.")
+
+        self.settings = list(settings)
+        self.aggregation = dict(aggregation or {})
+        for name, rule in self.aggregation.items():
+            if rule not in _aggregation_rules:
+                msg = "Aggregation rule '{}' of '{}' is not one of {}."
+                raise ValueError(msg.format(rule, name, sorted(_aggregation_rules)))
+
+        if weights is None:
+            self.weights = np.full(num, 1.0 / num)
+        else:
+            self.weights = np.array(weights, dtype=float)
+            if self.weights.shape != (num,):
+                msg = "ScenarioSet got {} weights for {} scenarios."
+                raise ValueError(msg.format(self.weights.size, num))
+
+        self.ks_rho = ks_rho
+        self.build_problem = build_problem
+        self.num_procs = num_procs
+        self._driver = None
+        self._workers = []
+        self._comm = None
+        self._sub_comm = None
+        self._problems = {}
+        self._states = {}
+        self._cache = None
+
+    def _start(self, driver):
+        """
+        Start the worker processes or build the problems of the sub-communicators.
+
+        Parameters
+        ----------
+        driver : NLoptDriver
+            Driver the scenarios are evaluated for.
+        """
+        self._driver = driver
+        self._cache = None
+
+        unknown = sorted(set(self.aggregation) - set(driver._responses))
+        if unknown:
+            msg = "{}: Aggregation rules given for unknown responses {}."
+            raise RuntimeError(msg.format(driver.msginfo, unknown))
+
+        num = len(self.settings)
+        comm = driver._problem().model.comm
+        if comm.size > 1:
+            if self.build_problem is None:
+                msg = "{}: Scenarios need a 'build_problem' function when running under MPI."
+                raise RuntimeError(msg.format(driver.msginfo))
+
+            # Each sub-communicator builds the problems of every num_groups-th scenario
+            num_groups = min(comm.size, num)
+            color = comm.rank % num_groups
+            self._comm = comm
+            self._sub_comm = comm.Split(color)
+            for i in range(color, num, num_groups):
+                prob = self.build_problem(self.settings[i], self._sub_comm)
+                prob.final_setup()
+                self._problems[i] = prob
+            return
+
+        num_procs = self.num_procs
+        if num_procs is None:
+            num_procs = min(num, os.cpu_count())
+        num_procs = max(min(int(num_procs), num), 1)
+
+        if not can_fork():
+            msg = (
+                "{}: Option 'scenarios' needs to fork processes, which this platform cannot "
+                "do. Run the scenarios under MPI instead."
+            )
+            raise RuntimeError(msg.format(driver.msginfo))
+
+        # Workers are forked, so that they get a copy of the problem of the driver
+        ctx = multiprocessing.get_context("fork")
+        for w in range(num_procs):
+            conn, child_conn = ctx.Pipe()
+            worker = ctx.Process(
+                target=_scenario_worker,
+                args=(self, driver._problem(), list(range(w, num, num_procs)), child_conn),
+                daemon=True,
+            )
+            worker.start()
+            child_conn.close()
+            self._workers.append((worker, conn))
+
+    def _stop(self):
+        """
+        Stop the worker processes and free the sub-communicators.
+        """
+        for worker, conn in self._workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for worker, conn in self._workers:
+            worker.join()
+
+        if self._sub_comm is not None:
+            for prob in self._problems.values():
+                prob.cleanup()
+            self._sub_comm.Free()
+
+        self._driver = None
+        self._workers = []
+        self._comm = None
+        self._sub_comm = None
+        self._problems = {}
+        self._states = {}
+        self._cache = None
+
+    def evaluate(self, x):
+        """
+        Return the aggregated values of every response at a design point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+
+        Returns
+        -------
+        dict
+            Driver-scaled aggregated response values, keyed by response name.
+        """
+        results = self._run(x, [])
+        driver = self._driver
+
+        values = {}
+        for name in driver._responses:
+            if name in driver._cons and driver._cons[name].get("linear"):
+                values[name] = results[0][0][name]
+            else:
+                stacked = np.array([result[0][name] for result in results])
+                values[name] = self._aggregate(name, stacked)[0]
+
+        return values
+
+    def totals(self, x, of):
+        """
+        Return the aggregated derivatives of some responses at a design point.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        of : list of str
+            Names of the responses, none of them linear constraints.
+
+        Returns
+        -------
+        ndarray
+            Driver-scaled derivatives, one row per response entry in the order of `of`,
+            one column per design variable entry.
+        """
+        results = self._run(x, of)
+
+        blocks = []
+        start = 0
+        for name in of:
+            size = results[0][0][name].size
+            values = np.array([result[0][name] for result in results])
+            jacs = np.array([result[1][start: start + size] for result in results])
+            blocks.append(self._aggregate(name, values, jacs)[1])
+            start += size
+
+        return np.vstack(blocks)
+
+    def _run(self, x, of):
+        """
+        Evaluate every scenario at a design point, or reuse the last evaluation there.
+
+        Parameters
+        ----------
+        x : ndarray
+            Driver-scaled design point.
+        of : list of str
+            Names of the responses whose derivatives are needed.
+
+        Returns
+        -------
+        list of tuple
+            Driver-scaled response values, keyed by response name, and derivatives of the
+            responses of `of` of each scenario.
+        """
+        key = x.tobytes()
+        if self._cache is not None and self._cache[0] == key and of in ([], self._cache[1]):
+            return self._cache[2]
+
+        results = [None] * len(self.settings)
+        if self._comm is not None:
+            local = _evaluate_group(self._problems, None, self._states, x, of)
+
+            # Only the root rank of each sub-communicator shares its results
+            shared = self._comm.allgather(local if self._sub_comm.rank == 0 else {})
+            for group in shared:
+                for i, result in group.items():
+                    results[i] = result
+        else:
+            for worker, conn in self._workers:
+                conn.send((x, of))
+            errors = []
+            for worker, conn in self._workers:
+                group, error = conn.recv()
+                if error:
+                    errors.append(error)
+                else:
+                    for i, result in group.items():
+                        results[i] = result
+            if errors:
+                raise RuntimeError("Scenario evaluation failed:\n" + "\n".join(errors))
+
+        self._cache = (key, list(of), results)
+        return results
+
+    def _aggregate(self, name, values, jacs=None):
+        """
+        Aggregate the values and derivatives of a response over the scenarios.
+
+        Parameters
+        ----------
+        name : str
+            Name of the response.
+        values : ndarray
+            Values, one row per scenario.
+        jacs : ndarray or None
+            Derivatives, one block of rows per scenario.
+
+        Returns
+        -------
+        ndarray
+            Aggregated values.
+        ndarray or None
+            Aggregated derivatives, if `jacs` is given.
+        """
+        rule = self.aggregation.get(name, "sum")
+        if rule == "sum":
+            coefs = np.broadcast_to(self.weights[:, np.newaxis], values.shape)
+        elif rule == "max":
+            # The derivatives are those of the largest value, entry by entry
+            coefs = np.zeros(values.shape)
+            coefs[np.argmax(values, axis=0), np.arange(values.shape[1])] = 1.0
+        else:
+            # KS = max + log(sum(exp(rho * (g - max)))) / rho, whose derivatives weigh
+            # those of each scenario by its share of the exponential sum
+            rho = self.ks_rho
+            peak = np.max(values, axis=0)
+            exps = np.exp(rho * (values - peak))
+            total = np.sum(exps, axis=0)
+            coefs = exps / total
+
+        if rule == "ks":
+            value = peak + np.log(total) / rho
+        else:
+            value = np.sum(coefs * values, axis=0)
+
+        if jacs is None:
+            return value, None
+        return value, np.einsum("ij,ijk->jk", coefs, jacs)
+
+
+def _scenario_worker(scenarios, problem, indices, conn):
+    """
+    Evaluate some of the scenarios in a forked process until told to stop.
+
+    Parameters
+    ----------
+    scenarios : ScenarioSet
+        Scenarios being evaluated.
+    problem : Problem
+        Copy of the problem of the driver.
+    indices : list of int
+        Indices of the scenarios of this worker.
+    conn : multiprocessing.Connection
+        End of the pipe that design points come from and results are sent to.
+    """
+    try:
+        if scenarios.build_problem is None:
+            problems = {i: problem for i in indices}
+        else:
+            problems = {}
+            for i in indices:
+                problems[i] = scenarios.build_problem(scenarios.settings[i])
+                problems[i].final_setup()
+
+        for prob in set(problems.values()):
+            stop_recording(prob)
+    except Exception:
+        problems = None
+        setup_error = traceback.format_exc()
+
+    states = {}
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        if problems is None:
+            conn.send((None, setup_error))
+            continue
+
+        x, of = msg
+        settings = scenarios.settings if scenarios.build_problem is None else None
+        try:
+            conn.send((_evaluate_group(problems, settings, states, x, of), None))
+        except Exception:
+            states.clear()
+            conn.send((None, traceback.format_exc()))
+
+    conn.close()
+
+
+def _evaluate_group(problems, settings, states, x, of):
+    """
+    Evaluate the scenarios of a worker process or sub-communicator one after the other.
+
+    Parameters
+    ----------
+    problems : dict
+        Problem of each scenario, keyed by scenario index. Scenarios may share a problem.
+    settings : list or None
+        Model variable values of every scenario, applied before running the model of a
+        shared problem, or None if each scenario has its own problem.
+    states : dict
+        Scenario index and design point bytes of the state of each problem, keyed by the id
+        of the problem. Updated in place.
+    x : ndarray
+        Driver-scaled design point.
+    of : list of str
+        Names of the responses whose derivatives are needed.
+
+    Returns
+    -------
+    dict
+        Response values and derivatives of each scenario, keyed by scenario index.
+    """
+    group = {}
+    for i, prob in problems.items():
+        # Derivatives at the point a model was just run at do not need another run
+        key = (i, x.tobytes())
+        current = states.get(id(prob)) == key
+        states.pop(id(prob), None)
+        setting = None if settings is None else settings[i]
+        group[i] = _evaluate_scenario(prob, setting, x, of, current)
+        states[id(prob)] = key
+
+    return group
+
+
+def _evaluate_scenario(problem, setting, x, of, current=False):
+    """
+    Run the model of a scenario at a design point and return its responses.
+
+    Parameters
+    ----------
+    problem : Problem
+        Problem of the scenario.
+    setting : dict or None
+        Model variable values to apply before running the model, if any.
+    x : ndarray
+        Driver-scaled design point.
+    of : list of str
+        Names of the responses whose derivatives are needed.
+    current : bool
+        If True, the model already holds the state of this scenario at `x`.
+
+    Returns
+    -------
+    dict
+        Driver-scaled response values, keyed by response name.
+    ndarray or None
+        Driver-scaled derivatives of the responses of `of`, or None if there are none.
+    """
+    driver = problem.driver
+    if not current:
+        if setting is not None:
+            for name, value in setting.items():
+                problem.set_val(name, value)
+
+        i = 0
+        for name, meta in driver._designvars.items():
+            size = meta["global_size"] if meta["distributed"] else meta["size"]
+            driver.set_design_var(name, x[i: i + size])
+            i += size
+
+        problem.model.run_solve_nonlinear()
+
+    values = driver.get_objective_values(driver_scaling=True)
+    values.update(driver.get_constraint_values(driver_scaling=True))
+
+    jac = None
+    if of:
+        jac = driver._compute_totals(
+            of=of, wrt=list(driver._designvars), return_format="array"
+        ).copy()
+
+    return values, jac
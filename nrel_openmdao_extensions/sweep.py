@@ -0,0 +1,336 @@
+"""
+Parallel epsilon-constraint and weighted-sum sweeps for trade-off studies.
+
+NLoptDriver optimizes a single objective, so a Pareto front is traced by solving a series of
+single-objective problems that differ by an epsilon bound or an objective weight. The sweep
+runner solves them concurrently and warm-starts each one from the closest finished one.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+from openmdao.utils.general_utils import simple_warning
+
+from nrel_openmdao_extensions.driver_utils import can_fork
+from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+
+def pareto_sweep(
+    build_problem, settings, objectives, num_procs=None, comm=None, warm_start=True
+):
+    """
+    Solve one optimization per setting and collect the resulting trade-off.
+
+    Parameters
+    ----------
+    build_problem : callable
+        Function called as `build_problem(setting)`, or `build_problem(setting, comm)` when
+        `comm` is given, that returns a Problem set up for the given epsilon bound or
+        weight. It must be picklable when sub-optimizations run in separate processes.
+    settings : list
+        Epsilon bounds or weights, as floats or arrays of equal size.
+    objectives : list of str
+        Names of the responses that form the trade-off, all of them minimized.
+    num_procs : int or None
+        Number of processes running sub-optimizations at the same time. Defaults to the
+        number of CPUs. Ignored when `comm` is given, and on platforms that cannot fork
+        processes, where the sub-optimizations run one after the other.
+    comm : MPI.Comm or None
+        If given, the sub-optimizations are split over sub-communicators of this
+        communicator, one per rank, and the results are gathered on every rank.
+    warm_start : bool
+        If True, each sub-optimization starts from the design of the finished one with the
+        closest setting.
+
+    Returns
+    -------
+    dict
+        With keys "settings", "objectives" (one row per setting, one column per objective),
+        "x" (flattened design variables), "failed", "status" (the NLopt result code of each
+        setting, None for other drivers), "evaluations", and "pareto", a mask of the
+        settings whose objectives are not dominated by those of another successful one.
+    """
+    values = [np.atleast_1d(np.asarray(setting, dtype=float)) for setting in settings]
+
+    if comm is not None:
+        results = _sweep_mpi(build_problem, settings, values, objectives, comm, warm_start)
+    else:
+        if num_procs is None:
+            num_procs = os.cpu_count()
+        results = _sweep_processes(
+            build_problem, settings, values, objectives, num_procs, warm_start
+        )
+
+    objs = np.array([result["objectives"] for result in results])
+    failed = np.array([result["failed"] for result in results], dtype=bool)
+
+    return {
+        "settings": np.array(values),
+        "objectives": objs,
+        "x": np.array([result["x"] for result in results]),
+        "failed": failed,
+        "status": [result["status"] for result in results],
+        "evaluations": np.array([result["evaluations"] for result in results], dtype=int),
+        "pareto": _non_dominated(objs, failed),
+    }
+
+
+def _sweep_processes(build_problem, settings, values, objectives, num_procs, warm_start):
+    """
+    Run the sub-optimizations on a pool of worker processes.
+
+    Parameters
+    ----------
+    build_problem : callable
+        Function that returns the Problem of a setting.
+    settings : list
+        Settings as given by the user.
+    values : list of ndarray
+        Settings as flat arrays, used to find the closest finished setting.
+    objectives : list of str
+        Names of the responses that form the trade-off.
+    num_procs : int
+        Number of worker processes.
+    warm_start : bool
+        If True, start each sub-optimization from the closest finished one.
+
+    Returns
+    -------
+    list of dict
+        Result of each sub-optimization, in the order of `settings`.
+    """
+    results = [None] * len(settings)
+
+    # Without fork, as on Windows, the sub-optimizations run one after the other here
+    if not can_fork():
+        for i in range(len(settings)):
+            x0 = _closest_design(values, results, i) if warm_start else None
+            results[i] = _solve_setting(build_problem, settings[i], objectives, x0)
+        return results
+
+    pending = list(range(len(settings)))
+    running = {}
+
+    ctx = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=max(int(num_procs), 1), mp_context=ctx) as pool:
+        while pending or running:
+            # Jobs are submitted one at a time as workers free up, so that each one can
+            # start from the closest setting finished so far.
+            while pending and len(running) < num_procs:
+                i = pending.pop(0)
+                x0 = _closest_design(values, results, i) if warm_start else None
+                future = pool.submit(
+                    _solve_setting, build_problem, settings[i], objectives, x0
+                )
+                running[future] = i
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    return results
+
+
+def _sweep_mpi(build_problem, settings, values, objectives, comm, warm_start):
+    """
+    Run the sub-optimizations on sub-communicators of an MPI communicator.
+
+    Each rank gets its own sub-communicator and solves every `comm.size`-th setting in
+    turn, warm-starting from the closest setting it has finished itself.
+
+    Parameters
+    ----------
+    build_problem : callable
+        Function that returns the Problem of a setting on a given communicator.
+    settings : list
+        Settings as given by the user.
+    values : list of ndarray
+        Settings as flat arrays, used to find the closest finished setting.
+    objectives : list of str
+        Names of the responses that form the trade-off.
+    comm : MPI.Comm
+        Communicator whose ranks share the sub-optimizations.
+    warm_start : bool
+        If True, start each sub-optimization from the closest finished one.
+
+    Returns
+    -------
+    list of dict
+        Result of each sub-optimization, in the order of `settings`.
+    """
+    sub_comm = comm.Split(comm.rank)
+
+    results = [None] * len(settings)
+    for i in range(comm.rank, len(settings), comm.size):
+        x0 = _closest_design(values, results, i) if warm_start else None
+        results[i] = _solve_setting(build_problem, settings[i], objectives, x0, sub_comm)
+
+    sub_comm.Free()
+
+    # Every setting was solved on exactly one rank
+    for rank_results in comm.allgather(results):
+        for i, result in enumerate(rank_results):
+            if result is not None:
+                results[i] = result
+
+    return results
+
+
+def _solve_setting(build_problem, setting, objectives, x0=None, comm=None):
+    """
+    Build and solve the optimization of one setting.
+
+    Parameters
+    ----------
+    build_problem : callable
+        Function that returns the Problem of a setting.
+    setting : object
+        Setting given to `build_problem`.
+    objectives : list of str
+        Names of the responses that form the trade-off.
+    x0 : dict or None
+        Driver-scaled design variable values to start from, keyed by design variable name.
+    comm : MPI.Comm or None
+        Communicator given to `build_problem`, if any.
+
+    Returns
+    -------
+    dict
+        Flattened optimal design, objective values, failure flag, NLopt result code and
+        number of evaluations of the sub-optimization.
+    """
+    prob = build_problem(setting) if comm is None else build_problem(setting, comm)
+    prob.final_setup()
+
+    driver = prob.driver
+    if x0 is not None:
+        for name, value in x0.items():
+            driver.set_design_var(name, value)
+
+    # A sub-optimization that stops with an error does not end the whole sweep
+    best = None
+    try:
+        failed = prob.run_driver()
+    except Exception as err:
+        # NLopt stops with a roundoff error when it cannot improve a point any further to
+        # machine precision, as SLSQP does at an active constraint it has already reached,
+        # so the best feasible point it evaluated is taken as the solution.
+        if nlopt is not None and isinstance(err, nlopt.RoundoffLimited):
+            best = driver.get_best_feasible_point()
+        if best is None:
+            simple_warning("Optimization of setting {} failed: {!r}".format(setting, err))
+            failed = True
+        else:
+            msg = "Optimization of setting {} was roundoff-limited, so its best feasible "
+            msg += "point is used: {!r}"
+            simple_warning(msg.format(setting, err))
+            failed = False
+    else:
+        # SLSQP can return its starting point even though it evaluated a better one, which
+        # happens when it is warm-started at the optimum of another setting.
+        if (
+            x0 is not None
+            and isinstance(driver, NLoptDriver)
+            and _same_design(driver.get_design_var_values(), x0)
+        ):
+            best = driver.get_best_feasible_point()
+
+    if best is not None:
+        for name, value in best[1].items():
+            driver.set_design_var(name, value)
+        prob.run_model(reset_iter_counts=False)
+
+    desvars = driver.get_design_var_values()
+    return {
+        "x": np.concatenate([np.ravel(desvars[name]) for name in driver._designvars]),
+        "desvars": desvars,
+        "objectives": np.concatenate([np.ravel(prob.get_val(name)) for name in objectives]),
+        "failed": bool(failed),
+        "status": driver.result if isinstance(driver, NLoptDriver) else None,
+        "evaluations": driver.iter_count,
+    }
+
+
+def _same_design(desvars, x0):
+    """
+    Return True if design variable values match a starting point up to rounding.
+
+    Parameters
+    ----------
+    desvars : dict
+        Driver-scaled design variable values keyed by name.
+    x0 : dict
+        Driver-scaled starting values keyed by name.
+
+    Returns
+    -------
+    bool
+        True if every starting value matches.
+    """
+    # The driver scales the starting point back and forth, which can change its last bit
+    return all(
+        np.allclose(desvars[name], value, rtol=1.0e-12, atol=0.0) for name, value in x0.items()
+    )
+
+
+def _closest_design(values, results, i):
+    """
+    Return the design of the successful finished setting closest to a given one.
+
+    Parameters
+    ----------
+    values : list of ndarray
+        Settings as flat arrays.
+    results : list of dict or None
+        Results of the finished settings, None for the others.
+    i : int
+        Index of the setting to start.
+
+    Returns
+    -------
+    dict or None
+        Driver-scaled design variable values, or None if no setting has finished.
+    """
+    best = None
+    best_dist = np.inf
+    for j, result in enumerate(results):
+        if result is None or result["failed"]:
+            continue
+        dist = np.linalg.norm(values[j] - values[i])
+        if dist < best_dist:
+            best = result["desvars"]
+            best_dist = dist
+
+    return best
+
+
+def _non_dominated(objs, failed):
+    """
+    Return a mask of the points not dominated by another successful point.
+
+    Parameters
+    ----------
+    objs : ndarray
+        Objective values, one row per point, all of them minimized.
+    failed : ndarray of bool
+        Failure flag of each point. Failed points are never part of the front.
+
+    Returns
+    -------
+    ndarray of bool
+        True for the points on the Pareto front.
+    """
+    mask = ~failed
+    for i in np.flatnonzero(mask):
+        others = objs[~failed]
+        dominated = np.all(others <= objs[i], axis=1) & np.any(others < objs[i], axis=1)
+        mask[i] = not np.any(dominated)
+
+    return mask
@@ -0,0 +1,132 @@
+"""
+Lightweight JSON-lines telemetry for monitoring running optimizations.
+
+Each record is serialized to a single compact JSON line so that the stream can be
+followed with `tail -f` or read incrementally by a local dashboard.
+"""
+
+import json
+import os
+import socket
+import stat
+import time
+
+from openmdao.utils.general_utils import simple_warning
+
+_SEND_FLAGS = getattr(socket, "MSG_NOSIGNAL", 0)
+
+
+class TelemetryWriter(object):
+    """
+    Buffered writer of JSON-lines telemetry records.
+
+    Records are held in memory and written out at most every `flush_interval` seconds,
+    so that the cost per evaluation is a single `json.dumps` call and a list append.
+
+    Telemetry never stops the optimization it monitors. If a write to the target fails,
+    for instance because a dashboard closed its socket, a warning is issued once and the
+    remaining records are dropped.
+
+    Attributes
+    ----------
+    flush_interval : float
+        Minimum number of seconds between two writes to the target.
+    _buffer : list
+        Serialized records that have not been written yet.
+    _last_flush : float
+        Value of `time.perf_counter()` at the last flush.
+    _file : file or None
+        Open file handle when writing to a regular file.
+    _sock : socket.socket or None
+        Connected socket when writing to a local UNIX socket.
+    _disabled : bool
+        True once a write to the target has failed.
+    """
+
+    def __init__(self, target, flush_interval=1.0):
+        """
+        Open the telemetry target.
+
+        Parameters
+        ----------
+        target : str
+            Path of the file to append to. If the path is an existing UNIX domain socket,
+            the records are sent to that socket instead.
+        flush_interval : float
+            Minimum number of seconds between two writes to the target. Use 0 to write
+            every record as soon as it is produced.
+        """
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.perf_counter()
+        self._file = None
+        self._sock = None
+        self._disabled = False
+
+        if os.path.exists(target) and stat.S_ISSOCK(os.stat(target).st_mode):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(target)
+        else:
+            self._file = open(target, "a")
+
+    def write(self, record):
+        """
+        Add one record to the stream.
+
+        Parameters
+        ----------
+        record : dict
+            JSON-serializable record.
+        """
+        if self._disabled:
+            return
+
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+
+        if time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered records to the target.
+        """
+        self._last_flush = time.perf_counter()
+        if not self._buffer:
+            return
+
+        data = "\n".join(self._buffer) + "\n"
+        self._buffer = []
+
+        try:
+            if self._sock is not None:
+                # Without MSG_NOSIGNAL, a closed peer raises SIGPIPE, which kills the
+                # process when a library such as PETSc handles that signal
+                self._sock.sendall(data.encode("utf-8"), _SEND_FLAGS)
+            else:
+                self._file.write(data)
+                self._file.flush()
+        except OSError as err:
+            simple_warning("Telemetry stream disabled after a failed write: {!r}".format(err))
+            self._disabled = True
+            self._release()
+
+    def close(self):
+        """
+        Flush any remaining records and release the target.
+        """
+        self.flush()
+        self._release()
+
+    def _release(self):
+        """
+        Close the target, ignoring errors of a target that already failed.
+        """
+        try:
+            if self._sock is not None:
+                self._sock.close()
+            if self._file is not None:
+                self._file.close()
+        except OSError:
+            pass
+        self._sock = None
+        self._file = None
@@ -0,0 +1,155 @@
+""" Unit tests for the Bayesian optimization driver."""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import openmdao.api as om
+from openmdao.test_suite.components.paraboloid import Paraboloid
+from openmdao.utils.assert_utils import assert_near_equal
+from openmdao.utils.mpi import MPI
+from scipy.linalg import LinAlgError, cho_factor
+
+from nrel_openmdao_extensions import bayesian_optimization_driver
+from nrel_openmdao_extensions.bayesian_optimization_driver import (
+    BayesianOptimizationDriver,
+    _GaussianProcess,
+)
+
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+
+def build_paraboloid_problem(comm=None, **options):
+    prob = om.Problem(comm=comm)
+    model = prob.model
+
+    model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+    model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+    model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+    model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+    prob.set_solver_print(level=0)
+
+    prob.driver = BayesianOptimizationDriver(seed=1, **options)
+
+    model.add_design_var("x", lower=-50.0, upper=50.0)
+    model.add_design_var("y", lower=-50.0, upper=50.0)
+    model.add_objective("f_xy")
+    model.add_constraint("c", upper=-15.0)
+
+    prob.setup()
+    return prob
+
+
+@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+class TestBayesianOptimizationDriver(unittest.TestCase):
+
+    def test_constrained_paraboloid(self):
+        prob = build_paraboloid_problem(max_iter=15)
+        failed = prob.run_driver()
+
+        self.assertFalse(failed)
+        assert_near_equal(prob["x"], 7.16667, 1e-2)
+        assert_near_equal(prob["y"], -7.83333, 1e-2)
+        assert_near_equal(prob["f_xy"], -27.083333, 1e-3)
+
+        # The initial design has 8 points, and the run stops before its last batch
+        history = prob.driver.batch_history
+        self.assertEqual(history[0]["evaluations"], 8)
+        self.assertLess(len(history), 16)
+        self.assertEqual(prob.driver.iter_count, 8 + 4 * (len(history) - 1) + 1)
+
+    def test_worker_processes(self):
+        # Forked workers evaluate the same batches as the serial run
+        results = []
+        for num_procs in (1, 2):
+            prob = build_paraboloid_problem(max_iter=2, num_procs=num_procs)
+            prob.run_driver()
+            results.append(prob.driver.batch_history)
+
+        serial, parallel = results
+        self.assertEqual(
+            [entry["objective"] for entry in serial], [entry["objective"] for entry in parallel]
+        )
+
+    def test_gaussian_process(self):
+        rng = np.random.RandomState(0)
+        X = rng.uniform(size=(12, 2))
+        y = np.sin(4.0 * X[:, 0]) + X[:, 1] ** 2
+        gp = _GaussianProcess(X, y)
+
+        # The Gaussian process interpolates its training data
+        mean, std = gp.predict(X)
+        assert_near_equal(mean, y, 1e-5)
+        self.assertTrue(np.all(std < 1e-3))
+
+        # Believing a prediction removes the uncertainty there and nowhere else changes
+        # the mean
+        u = np.array([[0.5, 0.5], [0.9, 0.1]])
+        mean, std = gp.predict(u)
+        believer = gp.condition(u[0], mean[0])
+        new_mean, new_std = believer.predict(u)
+        assert_near_equal(new_mean, mean, 1e-6)
+        self.assertLess(new_std[0], 1e-3)
+        self.assertLessEqual(new_std[1], std[1])
+
+    def test_singular_correlation(self):
+        rng = np.random.RandomState(0)
+        X = rng.uniform(size=(12, 2))
+        y = np.sin(4.0 * X[:, 0]) + X[:, 1] ** 2
+        gp = _GaussianProcess(X, y)
+
+        # When the factorization with the default nugget fails, as it can for a point that
+        # repeats a training point, a larger nugget is used instead
+        calls = []
+
+        def singular_once(a, lower):
+            calls.append(a[0, 0])
+            if len(calls) == 1:
+                raise LinAlgError("not positive definite")
+            return cho_factor(a, lower=lower)
+
+        with mock.patch.object(bayesian_optimization_driver, "cho_factor", singular_once):
+            believer = gp.condition(X[0], y[0])
+
+        assert_near_equal(calls, [1.0 + 1e-8, 1.0 + 1e-7], 1e-12)
+        mean, std = believer.predict(X[:1])
+        assert_near_equal(mean, y[:1], 1e-4)
+
+    def test_equality_constraints(self):
+        prob = om.Problem()
+        model = prob.model
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("x", equals=1.0)
+        prob.driver = BayesianOptimizationDriver()
+
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.setup()
+            prob.final_setup()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "BayesianOptimizationDriver: Equality constraints are not supported.",
+        )
+
+
+@unittest.skipUnless(MPI and nlopt, "MPI and NLopt are required.")
+class TestBayesianOptimizationDriverMPI(unittest.TestCase):
+
+    N_PROCS = 2
+
+    def test_run_parallel(self):
+        prob = build_paraboloid_problem(max_iter=15, run_parallel=True)
+        self.assertEqual(prob.model.comm.size, 1)
+        prob.run_driver()
+
+        assert_near_equal(prob["f_xy"], -27.083333, 1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+""" Unit tests for the differential evolution driver."""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import openmdao.api as om
+from openmdao.test_suite.components.paraboloid import Paraboloid
+from openmdao.utils.assert_utils import assert_near_equal
+from openmdao.utils.mpi import MPI
+
+from nrel_openmdao_extensions.differential_evolution_driver import DifferentialEvolutionDriver
+
+
+def build_paraboloid_problem(comm=None, **options):
+    prob = om.Problem(comm=comm)
+    model = prob.model
+
+    model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+    model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+    model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+    model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+    prob.set_solver_print(level=0)
+
+    options.setdefault("pop_size", 20)
+    options.setdefault("max_gen", 300)
+    prob.driver = DifferentialEvolutionDriver(seed=11, **options)
+
+    model.add_design_var("x", lower=-50.0, upper=50.0)
+    model.add_design_var("y", lower=-50.0, upper=50.0)
+    model.add_objective("f_xy")
+    model.add_constraint("c", upper=-15.0)
+
+    prob.setup()
+    return prob
+
+
+class FailingParaboloid(Paraboloid):
+    def compute(self, inputs, outputs):
+        if inputs["x"] > 10.0:
+            raise om.AnalysisError("x is too large")
+        super(FailingParaboloid, self).compute(inputs, outputs)
+
+
+class TestDifferentialEvolutionDriver(unittest.TestCase):
+
+    def test_constrained_paraboloid(self):
+        prob = build_paraboloid_problem(tol=1e-10)
+        failed = prob.run_driver()
+
+        self.assertFalse(failed)
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.83333, 1e-4)
+        assert_near_equal(prob["f_xy"], -27.083333, 1e-6)
+
+        # Every generation keeps its best candidate
+        history = prob.driver.generation_history
+        self.assertLess(len(history), 301)
+        self.assertEqual(prob.driver.iter_count, 20 * len(history) + 1)
+        feasible = [entry["objective"] for entry in history if entry["max_violation"] == 0.0]
+        self.assertTrue(np.all(np.diff(feasible) <= 0.0))
+
+    def test_worker_processes(self):
+        # Forked workers evaluate the same candidates as the serial run
+        results = []
+        for num_procs in (1, 3):
+            prob = build_paraboloid_problem(max_gen=20, num_procs=num_procs)
+            prob.run_driver()
+            results.append(prob.driver.generation_history)
+
+        serial, parallel = results
+        self.assertEqual(
+            [entry["objective"] for entry in serial], [entry["objective"] for entry in parallel]
+        )
+
+    def test_infeasible(self):
+        prob = build_paraboloid_problem(max_gen=200, strategy="best/1/bin")
+        prob.model.add_constraint("x", upper=-60.0)
+        prob.setup()
+        failed = prob.run_driver()
+
+        # The least infeasible point violates both constraints by as much, at the lower
+        # bound of y
+        self.assertTrue(failed)
+        assert_near_equal(prob["x"], -47.5, 1e-6)
+        assert_near_equal(prob["y"], -50.0, 1e-6)
+        assert_near_equal(prob.driver.generation_history[-1]["max_violation"], 12.5, 1e-6)
+
+    def test_analysis_error(self):
+        prob = om.Problem()
+        model = prob.model
+        model.add_subsystem("comp", FailingParaboloid(), promotes=["*"])
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        prob.driver = DifferentialEvolutionDriver(max_gen=200, seed=3)
+        prob.setup()
+        prob.set_val("x", 0.0)
+        prob.set_val("y", 0.0)
+        prob.run_driver()
+
+        # The candidates the model fails on lose against every other one
+        assert_near_equal(prob["x"], 6.666667, 1e-3)
+        assert_near_equal(prob["y"], -7.333333, 1e-3)
+
+    def test_errors(self):
+        prob = om.Problem()
+        model = prob.model
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_design_var("x", lower=-50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        prob.driver = DifferentialEvolutionDriver()
+        prob.setup()
+
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.run_driver()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "DifferentialEvolutionDriver: Design variable 'x' needs finite lower and upper "
+            "bounds.",
+        )
+
+        prob = build_paraboloid_problem(pop_size=3)
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.run_driver()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "DifferentialEvolutionDriver: Strategy 'rand/1/bin' needs a population of at "
+            "least 4 candidates.",
+        )
+
+        prob = build_paraboloid_problem(num_procs=2)
+        with mock.patch("multiprocessing.get_all_start_methods", return_value=["spawn"]):
+            with self.assertRaises(RuntimeError) as raises_cm:
+                prob.run_driver()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "DifferentialEvolutionDriver: Option 'num_procs' needs to fork processes, which "
+            "this platform cannot do.",
+        )
+
+
+@unittest.skipUnless(MPI, "MPI is required.")
+class TestDifferentialEvolutionDriverMPI(unittest.TestCase):
+
+    N_PROCS = 2
+
+    def test_run_parallel(self):
+        prob = build_paraboloid_problem(tol=1e-10, run_parallel=True)
+        self.assertEqual(prob.model.comm.size, 1)
+        prob.run_driver()
+
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.83333, 1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+""" Unit tests for the lazy imports of the package."""
+
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+import nrel_openmdao_extensions
+
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_python(*args):
+    # A fresh interpreter, so that nothing is imported already
+    proc = subprocess.run(
+        [sys.executable] + list(args),
+        cwd=ROOT_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return proc.stdout, proc.stderr
+
+
+def import_times(module):
+    # Cumulative import time in seconds of every module imported along with `module`
+    _, stderr = run_python("-X", "importtime", "-c", "import " + module)
+    times = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)", line)
+        if match:
+            times[match.group(2)] = int(match.group(1)) * 1e-6
+    return times
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_package_import(self):
+        # Neither the heavy dependencies nor the modules of the public classes are imported
+        heavy = ["numpy", "scipy", "openmdao", "nlopt"]
+        heavy += sorted(set(nrel_openmdao_extensions._registry.values()))
+        stdout, _ = run_python(
+            "-c",
+            "import json, sys, nrel_openmdao_extensions; "
+            "print(json.dumps([name for name in {!r} if name in sys.modules]))".format(heavy),
+        )
+        self.assertEqual(json.loads(stdout), [])
+
+    @unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+    def test_driver_import(self):
+        # The solvers and the networkx package they use are only needed by some options
+        times = import_times("nrel_openmdao_extensions.nlopt_driver")
+        self.assertIn("openmdao.core.driver", times)
+        self.assertNotIn("networkx", times)
+        self.assertNotIn("openmdao.api", times)
+
+    @unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+    def test_registry(self):
+        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+        from nrel_openmdao_extensions.intermittent_component import IntermittentComponent
+
+        self.assertIs(nrel_openmdao_extensions.NLoptDriver, NLoptDriver)
+        self.assertIs(nrel_openmdao_extensions.IntermittentComponent, IntermittentComponent)
+        self.assertIn("DakotaOptimizer", dir(nrel_openmdao_extensions))
+
+        with self.assertRaises(AttributeError):
+            nrel_openmdao_extensions.NotADriver
+
+    @unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+    def test_entry_points(self):
+        filename = os.path.join(ROOT_DIR, "setup.py")
+        if not os.path.isfile(filename):
+            raise unittest.SkipTest("setup.py is not available.")
+
+        with open(filename) as f:
+            targets = re.findall(r"(nrel_openmdao_extensions[\w.]*):(\w+)", f.read())
+
+        self.assertEqual(len(targets), 4)
+        for module_name, attr in targets:
+            module = importlib.import_module(module_name)
+            self.assertTrue(hasattr(module, attr), "{}:{}".format(module_name, attr))
+
+
+if __name__ == "__main__":
+    unittest.main()
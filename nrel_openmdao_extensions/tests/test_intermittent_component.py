@@ -0,0 +1,195 @@
+""" Unit tests for the IntermittentComponent."""
+
+import unittest
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_near_equal
+
+from nrel_openmdao_extensions.intermittent_component import IntermittentComponent
+
+
+class Quadratic(IntermittentComponent):
+    def setup(self):
+        self.add_input("x", np.zeros(2))
+        self.add_output("f", 0.0)
+
+    def internal_compute(self, inputs, outputs):
+        outputs["f"] = np.sum(inputs["x"] ** 2)
+
+    def internal_compute_partials(self, inputs, partials):
+        partials["f", "x"] = 2.0 * inputs["x"]
+
+
+class Moments(IntermittentComponent):
+    def setup(self):
+        self.add_input("x", np.zeros(2))
+        self.add_output("total", 0.0)
+        self.add_output("outer", np.zeros((2, 2)))
+
+    def internal_compute(self, inputs, outputs):
+        outputs["total"] = np.sum(inputs["x"])
+        outputs["outer"] = np.outer(inputs["x"], inputs["x"])
+
+
+def build_problem(**options):
+    prob = om.Problem()
+    prob.model.add_subsystem("indeps", om.IndepVarComp("x", np.ones(2)), promotes=["*"])
+    prob.model.add_subsystem("comp", Quadratic(**options), promotes=["*"])
+    prob.setup()
+    return prob
+
+
+def run_at(prob, points):
+    values = []
+    for x in points:
+        prob.set_val("x", x)
+        prob.run_model(reset_iter_counts=False)
+        values.append(prob.get_val("f")[0])
+    return values
+
+
+class TestIntermittentComponent(unittest.TestCase):
+
+    def test_interval(self):
+        prob = build_problem(num_iterations_between_calls=3)
+        run_at(prob, [[1.0, 1.0 + 0.1 * i] for i in range(6)])
+
+        self.assertEqual(prob.model.comp.actual_compute_calls, 2)
+
+    def test_refresh_distance(self):
+        prob = build_problem(refresh_policy="adaptive", refresh_distance=0.1)
+        values = run_at(prob, [[1.0, 1.0], [1.0, 1.05], [1.0, 1.1], [1.0, 1.2], [1.0, 1.25]])
+
+        # Relative to the norm of x at the last actual call, only the fourth point is far
+        self.assertEqual(prob.model.comp.actual_compute_calls, 2)
+        assert_near_equal(values, [2.0, 2.0, 2.0, 2.44, 2.44], 1e-12)
+
+    def test_max_staleness(self):
+        prob = build_problem(refresh_policy="adaptive", max_staleness=2)
+        run_at(prob, [[1.0, 1.0]] * 7)
+
+        self.assertEqual(prob.model.comp.actual_compute_calls, 3)
+
+    def test_error_tol(self):
+        prob = build_problem(refresh_policy="adaptive", refresh_distance=0.5, error_tol=0.05)
+
+        # The two actual calls give how fast f changes relative to its value as x moves
+        # relative to its own, so moves of more than 0.024 relative to x are refreshed.
+        run_at(prob, [[1.0, 1.0], [1.0, 2.0]])
+        comp = prob.model.comp
+        self.assertEqual(comp.actual_compute_calls, 2)
+        assert_near_equal(comp._error_rate, 1.5 * np.sqrt(2.0), 1e-12)
+
+        run_at(prob, [[1.0, 2.02], [1.0, 2.1]])
+        self.assertEqual(comp.actual_compute_calls, 3)
+
+    def test_adaptive_options(self):
+        # Without a distance or staleness limit, nothing would ever refresh the first
+        # outputs, as the error estimate needs two actual calls
+        for options in ({}, {"error_tol": 0.05}):
+            prob = build_problem(refresh_policy="adaptive", **options)
+            with self.assertRaises(RuntimeError) as raises_cm:
+                prob.run_model()
+            self.assertEqual(
+                str(raises_cm.exception),
+                "'comp' <class Quadratic>: Option refresh_policy='adaptive' requires "
+                "'refresh_distance' or 'max_staleness'.",
+            )
+
+    def test_finite_differences(self):
+        # Derivatives right after an actual call come from the actual analysis, and the
+        # frozen point stays where it was computed
+        prob = build_problem(refresh_policy="adaptive", refresh_distance=0.1)
+        prob.model.approx_totals(method="fd")
+        prob.model.add_design_var("x")
+        prob.model.add_objective("f")
+        prob.setup()
+        prob.set_val("x", [1.0, 2.0])
+        prob.run_model()
+
+        totals = prob.compute_totals(of=["f"], wrt=["x"])
+        assert_near_equal(totals["f", "x"], [[2.0, 4.0]], 1e-5)
+        assert_near_equal(prob.model.comp.frozen_outputs["f"], 5.0, 1e-12)
+
+        prob.set_val("x", [1.0, 2.01])
+        prob.run_model()
+        assert_near_equal(prob.get_val("f"), 5.0, 1e-12)
+
+    def test_frozen_snapshot(self):
+        # The frozen outputs are views by name of one snapshot of the output vector, which
+        # later actual calls overwrite in place
+        prob = om.Problem()
+        prob.model.add_subsystem("comp", Moments(num_iterations_between_calls=2), promotes=["*"])
+        prob.setup()
+        comp = prob.model.comp
+
+        values = []
+        for x in ([1.0, 2.0], [3.0, 4.0], [5.0, 6.0]):
+            prob.set_val("x", x)
+            prob.run_model(reset_iter_counts=False)
+            values.append((prob.get_val("total")[0], prob.get_val("outer").copy()))
+            if len(values) == 1:
+                snapshot = comp._frozen_vector
+
+        self.assertEqual(values[1][0], 3.0)
+        assert_near_equal(values[1][1], [[1.0, 2.0], [2.0, 4.0]], 1e-12)
+        self.assertIs(comp._frozen_vector, snapshot)
+        assert_near_equal(comp.frozen_outputs["total"], 11.0, 1e-12)
+        assert_near_equal(comp.frozen_outputs["outer"], [[25.0, 30.0], [30.0, 36.0]], 1e-12)
+
+    def test_extrapolation(self):
+        # Between actual calls the outputs follow the tangent at the last one, whose slope
+        # comes from finite differences of `internal_compute` or from its partials
+        for method, calls, partials_calls in (("fd", 3, 0), ("analytic", 1, 1)):
+            prob = build_problem(num_iterations_between_calls=3, extrapolate=True,
+                                 extrapolation_partials=method)
+            values = run_at(prob, [[1.0, 1.0], [1.1, 1.0], [1.0, 0.8]])
+
+            self.assertEqual(prob.model.comp.actual_compute_calls, calls)
+            self.assertEqual(prob.model.comp.actual_compute_partials_calls, partials_calls)
+            assert_near_equal(values, [2.0, 2.2, 1.6], 1e-5)
+
+    def test_extrapolation_finite_differences(self):
+        # Finite differences around an actual call are taken on its extrapolation, which
+        # needs no more actual calls
+        prob = build_problem(num_iterations_between_calls=1, extrapolate=True,
+                             extrapolation_partials="analytic")
+        prob.model.approx_totals(method="fd")
+        prob.model.add_design_var("x")
+        prob.model.add_objective("f")
+        prob.setup()
+        prob.set_val("x", [1.0, 2.0])
+        prob.run_model()
+
+        totals = prob.compute_totals(of=["f"], wrt=["x"])
+        assert_near_equal(totals["f", "x"], [[2.0, 4.0]], 1e-6)
+        self.assertEqual(prob.model.comp.actual_compute_calls, 1)
+
+    def test_memo_cache(self):
+        # Repeated inputs get their exact outputs back, even where the interval policy
+        # would otherwise serve the frozen ones
+        prob = build_problem(num_iterations_between_calls=2, memo_cache_bytes=1000)
+        points = [[1.0, 1.0], [1.0, 2.0], [1.0, 3.0], [1.0, 1.0], [1.0, 3.0], [1.0, 2.0]]
+        values = run_at(prob, points)
+
+        comp = prob.model.comp
+        self.assertEqual(comp.actual_compute_calls, 2)
+        self.assertEqual(comp.cache_hits, 2)
+        assert_near_equal(values, [2.0, 2.0, 10.0, 2.0, 10.0, 10.0], 1e-12)
+
+    def test_memo_cache_eviction(self):
+        # Each entry holds 16 bytes of inputs and 8 of outputs, so only two fit. The first
+        # point was used again more recently than the second, which is evicted instead.
+        prob = build_problem(refresh_policy="adaptive", max_staleness=0, memo_cache_bytes=50)
+        run_at(prob, [[1.0, 1.0], [1.0, 2.0], [1.0, 1.0], [1.0, 3.0], [1.0, 1.0], [1.0, 2.0]])
+
+        comp = prob.model.comp
+        self.assertEqual(comp.actual_compute_calls, 4)
+        self.assertEqual(comp.cache_hits, 2)
+        self.assertEqual(len(comp._memo), 2)
+        self.assertLessEqual(comp._memo_bytes, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
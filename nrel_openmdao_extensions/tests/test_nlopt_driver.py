@@ -1,1942 +1,3029 @@
-""" Unit tests for the NLOpt Driver."""
-
-import copy
-import sys
-import unittest
-
-import numpy as np
-
-import openmdao.api as om
-from openmdao.test_suite.components.expl_comp_array import TestExplCompArrayDense
-from openmdao.test_suite.components.paraboloid import Paraboloid
-from openmdao.test_suite.components.sellar import (
-    SellarDerivativesGrouped,
-    SellarDerivatives,
-)
-from openmdao.test_suite.components.simple_comps import NonSquareArrayComp
-from openmdao.test_suite.groups.sin_fitter import SineFitter
-from openmdao.utils.assert_utils import assert_near_equal
-from openmdao.utils.general_utils import run_driver
-from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
-
-try:
-    import nlopt
-except ImportError:
-    nlopt = None
-
-
-def rastrigin(x):
-    a = 10  # constant
-    return np.sum(np.square(x) - a * np.cos(2 * np.pi * x)) + a * np.size(x)
-
-
-@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
-class TestNLoptDriver(unittest.TestCase):
-    def test_driver_supports(self):
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
-
-        with self.assertRaises(KeyError) as raises_msg:
-            prob.driver.supports["equality_constraints"] = False
-
-        exception = raises_msg.exception
-
-        msg = "NLoptDriver: Tried to set read-only option 'equality_constraints'."
-
-        self.assertEqual(exception.args[0], msg)
-
-    def test_compute_totals_basic_return_array(self):
-        # Make sure 'array' return_format works.
-
-        prob = om.Problem()
-        model = prob.model
-        model.add_subsystem("p1", om.IndepVarComp("x", 0.0), promotes=["x"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 0.0), promotes=["y"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["x", "y", "f_xy"])
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup(check=False, mode="fwd")
-        prob.set_solver_print(level=0)
-
-        failed = prob.run_driver()
-
-        of = ["f_xy"]
-        wrt = ["x", "y"]
-        derivs = prob.compute_totals(of=of, wrt=wrt, return_format="array")
-
-        assert_near_equal(derivs[0, 0], -6.0, 1e-6)
-        assert_near_equal(derivs[0, 1], 8.0, 1e-6)
-
-        prob.setup(check=False, mode="rev")
-
-        prob.run_model()
-
-        of = ["f_xy"]
-        wrt = ["x", "y"]
-        derivs = prob.compute_totals(of=of, wrt=wrt, return_format="array")
-
-        assert_near_equal(derivs[0, 0], -6.0, 1e-6)
-        assert_near_equal(derivs[0, 1], 8.0, 1e-6)
-
-    def test_compute_totals_return_array_non_square(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("px", om.IndepVarComp(name="x", val=np.ones((2,))))
-        comp = model.add_subsystem("comp", NonSquareArrayComp())
-        model.connect("px.x", "comp.x1")
-
-        model.add_design_var("px.x")
-        model.add_objective("px.x")
-        model.add_constraint("comp.y1")
-        model.add_constraint("comp.y2")
-
-        prob.setup(check=False, mode="auto")
-
-        failed = prob.run_driver()
-
-        derivs = prob.compute_totals(
-            of=["comp.y1"], wrt=["px.x"], return_format="array"
-        )
-
-        J = comp.JJ[0:3, 0:2]
-        assert_near_equal(J, derivs, 1.0e-3)
-
-        # Support for a name to be in 'of' and 'wrt'
-
-        derivs = prob.compute_totals(
-            of=["comp.y2", "px.x", "comp.y1"], wrt=["px.x"], return_format="array"
-        )
-
-        assert_near_equal(J, derivs[3:, :], 1.0e-3)
-        assert_near_equal(comp.JJ[3:4, 0:2], derivs[0:1, :], 1.0e-3)
-        assert_near_equal(np.eye(2), derivs[1:3, :], 1.0e-3)
-
-    def test_deriv_wrt_self(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("px", om.IndepVarComp(name="x", val=np.ones((2,))))
-
-        model.add_design_var("px.x")
-        model.add_objective("px.x")
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Support for a name to be in 'of' and 'wrt'
-
-        J = prob.driver._compute_totals(
-            of=["px.x"], wrt=["px.x"], return_format="array"
-        )
-
-        assert_near_equal(J, np.eye(2), 1.0e-3)
-
-    def test_optimizer_simple_paraboloid_unconstrained(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-
-    def test_simple_paraboloid_unconstrained(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-
-    def test_simple_paraboloid_unconstrained_LN_COBYLA(self):
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LN_COBYLA"
-        prob.driver.options["tol"] = 1e-12
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-
-    def test_simple_paraboloid_upper(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-6)
-        assert_near_equal(prob["y"], -7.833334, 1e-6)
-
-    def test_simple_paraboloid_lower(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-6)
-        assert_near_equal(prob["y"], -7.833334, 1e-6)
-
-    def test_simple_paraboloid_equality(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-4)
-        assert_near_equal(prob["y"], -7.833334, 1e-4)
-
-    def test_missing_objective(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("x", om.IndepVarComp("x", 2.0), promotes=["*"])
-        model.add_subsystem("f_x", Paraboloid(), promotes=["*"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-
-        prob.model.add_design_var("x", lower=0)
-
-        prob.setup()
-
-        with self.assertRaises(Exception) as raises_msg:
-            prob.run_driver()
-
-        exception = raises_msg.exception
-
-        msg = "Driver requires objective to be declared"
-
-        self.assertEqual(exception.args[0], msg)
-
-    def test_simple_paraboloid_double_sided_low(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=-11.0, upper=-10.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["y"] - prob["x"], -11.0, 1e-6)
-
-    def test_simple_paraboloid_double_sided_high(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=10.0, upper=11.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
-
-    def test_simple_array_comp2D(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
-        )
-        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
-        model.add_subsystem(
-            "con",
-            om.ExecComp("c = areas - 20.0", c=np.zeros((2, 2)), areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-        model.add_subsystem(
-            "obj",
-            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("widths", lower=-50.0, upper=50.0)
-        model.add_objective("o")
-        model.add_constraint("c", equals=0.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        obj = prob["o"]
-        assert_near_equal(obj, 20.0, 1e-6)
-
-    def test_simple_array_comp2D_eq_con(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
-        )
-        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
-        model.add_subsystem(
-            "obj",
-            om.ExecComp("o = areas[0, 0] + areas[1, 1]", areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("widths", lower=-50.0, upper=50.0)
-        model.add_objective("o")
-        model.add_constraint("areas", equals=np.array([24.0, 21.0, 3.5, 17.5]))
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        obj = prob["o"]
-        assert_near_equal(obj, 41.5, 1e-6)
-
-    def test_simple_array_comp2D_dbl_sided_con(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
-        )
-        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
-        model.add_subsystem(
-            "obj",
-            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("widths", lower=-50.0, upper=50.0)
-        model.add_objective("o")
-        model.add_constraint(
-            "areas",
-            lower=np.array([24.0, 21.0, 3.5, 17.5]),
-            upper=np.array([24.0, 21.0, 3.5, 17.5]),
-        )
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        con = prob["areas"]
-        assert_near_equal(con, np.array([[24.0, 21.0], [3.5, 17.5]]), 1e-6)
-
-    def test_simple_array_comp2D_dbl_sided_con_array(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
-        )
-        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
-        model.add_subsystem(
-            "obj",
-            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("widths", lower=-50.0, upper=50.0)
-        model.add_objective("o")
-        model.add_constraint("areas", lower=20.0, upper=20.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        obj = prob["o"]
-        assert_near_equal(obj, 20.0, 1e-6)
-
-    def test_simple_array_comp2D_array_lo_hi(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
-        )
-        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
-        model.add_subsystem(
-            "con",
-            om.ExecComp("c = areas - 20.0", c=np.zeros((2, 2)), areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-        model.add_subsystem(
-            "obj",
-            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
-            promotes=["*"],
-        )
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var(
-            "widths", lower=-50.0 * np.ones((2, 2)), upper=50.0 * np.ones((2, 2))
-        )
-        model.add_objective("o")
-        model.add_constraint("c", equals=0.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        obj = prob["o"]
-        assert_near_equal(obj, 20.0, 1e-6)
-
-    def test_simple_paraboloid_scaled_desvars_fwd(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0, ref=0.02)
-        model.add_design_var("y", lower=-50.0, upper=50.0, ref=0.02)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=10.0, upper=11.0)
-
-        prob.setup(check=False, mode="fwd")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
-
-    def test_simple_paraboloid_scaled_desvars_rev(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0, ref=0.02)
-        model.add_design_var("y", lower=-50.0, upper=50.0, ref=0.02)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=10.0, upper=11.0)
-
-        prob.setup(check=False, mode="rev")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
-
-    def test_simple_paraboloid_scaled_constraint_fwd(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-8
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=10.0, upper=11.0, ref=10.0)
-
-        prob.setup(check=False, mode="fwd")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
-
-    def test_simple_paraboloid_scaled_objective_fwd(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        prob.set_solver_print(level=0)
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy", ref=10.0)
-        model.add_constraint("c", lower=10.0, upper=11.0)
-
-        prob.setup(check=False, mode="fwd")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
-
-    def test_simple_paraboloid_scaled_objective_rev(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        prob.set_solver_print(level=0)
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy", ref=10.0)
-        model.add_constraint("c", lower=10.0, upper=11.0)
-
-        prob.setup(check=False, mode="rev")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
-
-    def test_sellar_mdf(self):
-
-        prob = om.Problem()
-        model = prob.model = SellarDerivativesGrouped()
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var(
-            "z", lower=np.array([-10.0, 0.0]), upper=np.array([10.0, 10.0])
-        )
-        model.add_design_var("x", lower=0.0, upper=10.0)
-        model.add_objective("obj")
-        model.add_constraint("con1", upper=0.0)
-        model.add_constraint("con2", upper=0.0)
-
-        prob.setup(check=False, mode="rev")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["z"][0], 1.9776, 1e-3)
-        assert_near_equal(prob["z"][1], 0.0, 1e-3)
-        assert_near_equal(prob["x"], 0.0, 1e-3)
-
-    def test_bug_in_eq_constraints(self):
-        # We were getting extra constraints created because lower and upper are maxfloat instead of
-        # None when unused.
-        p = om.Problem(model=SineFitter())
-        p.driver = NLoptDriver()
-
-        p.setup()
-        p.run_driver()
-
-        max_defect = np.max(np.abs(p["defect.defect"]))
-        assert_near_equal(max_defect, 0.0, 1e-10)
-
-    def test_reraise_exception_from_callbacks(self):
-        class ReducedActuatorDisc(om.ExplicitComponent):
-            def setup(self):
-
-                # Inputs
-                self.add_input("a", 0.5, desc="Induced Velocity Factor")
-                self.add_input(
-                    "Vu",
-                    10.0,
-                    units="m/s",
-                    desc="Freestream air velocity, upstream of rotor",
-                )
-
-                # Outputs
-                self.add_output(
-                    "Vd",
-                    0.0,
-                    units="m/s",
-                    desc="Slipstream air velocity, downstream of rotor",
-                )
-
-            def compute(self, inputs, outputs):
-                a = inputs["a"]
-                Vu = inputs["Vu"]
-
-                outputs["Vd"] = Vu * (1 - 2 * a)
-
-            def compute_partials(self, inputs, J):
-                Vu = inputs["Vu"]
-
-                J["Vd", "a"] = -2.0 * Vu
-
-        prob = om.Problem()
-        indeps = prob.model.add_subsystem("indeps", om.IndepVarComp(), promotes=["*"])
-        indeps.add_output("a", 0.5)
-        indeps.add_output("Vu", 10.0, units="m/s")
-
-        prob.model.add_subsystem(
-            "a_disk", ReducedActuatorDisc(), promotes_inputs=["a", "Vu"]
-        )
-
-        # setup the optimization
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-
-        prob.model.add_design_var("a", lower=0.0, upper=1.0)
-        # negative one so we maximize the objective
-        prob.model.add_objective("a_disk.Vd", scaler=-1)
-
-        prob.setup()
-
-        with self.assertRaises(KeyError) as context:
-            prob.run_driver()
-
-        msg = 'Variable name pair ("Vd", "a") must first be declared.'
-        self.assertTrue(msg in str(context.exception))
-
-    def test_simple_paraboloid_upper_LN_COBYLA(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LN_COBYLA"
-        prob.driver.options["tol"] = 1e-12
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-6)
-        assert_near_equal(prob["y"], -7.833334, 1e-6)
-
-    def test_sellar_mdf_LN_COBYLA(self):
-
-        prob = om.Problem()
-        model = prob.model = SellarDerivativesGrouped()
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LN_COBYLA"
-        prob.driver.options["tol"] = 1e-12
-
-        prob.set_solver_print(level=0)
-
-        model.add_design_var(
-            "z", lower=np.array([-10.0, 0.0]), upper=np.array([10.0, 10.0])
-        )
-        model.add_design_var("x", lower=0.0, upper=10.0)
-        model.add_objective("obj")
-        model.add_constraint("con1", upper=0.0)
-        model.add_constraint("con2", upper=0.0)
-
-        prob.setup(check=False, mode="rev")
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["z"][0], 1.9776, 1e-3)
-        assert_near_equal(prob["z"][1], 0.0, 1e-3)
-        assert_near_equal(prob["x"], 0.0, 1e-3)
-
-    def test_simple_paraboloid_lower_linear(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=15.0, linear=True)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-6)
-        assert_near_equal(prob["y"], -7.833334, 1e-6)
-
-        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy"])
-
-    def test_simple_paraboloid_equality_linear(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0, linear=True)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-6)
-        assert_near_equal(prob["y"], -7.833334, 1e-6)
-
-    def test_debug_print_option_totals(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        prob.driver.options["debug_print"] = ["totals"]
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup(check=False, mode="rev")
-
-        failed, output = run_driver(prob)
-
-        self.assertTrue(
-            "In mode: rev, Solving variable(s) using simul coloring:" in output
-        )
-        self.assertTrue("('comp.f_xy', [0])" in output)
-        self.assertTrue("Elapsed Time:" in output)
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        prob.driver.options["debug_print"] = ["totals"]
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup(check=False, mode="fwd")
-
-        failed, output = run_driver(prob)
-
-        self.assertTrue(
-            "In mode: fwd, Solving variable(s) using simul coloring:" in output
-        )
-        self.assertTrue("('p1.x', [0])" in output)
-        self.assertTrue("Elapsed Time:" in output)
-
-    def test_debug_print_option(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        prob.driver.options["debug_print"] = ["desvars", "ln_cons", "nl_cons", "objs"]
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed, output = run_driver(prob)
-
-        output = output.split("\n")
-
-        self.assertTrue(
-            output.count("Design Vars") > 1,
-            "Should be more than one design vars header printed",
-        )
-        self.assertTrue(
-            output.count("Nonlinear constraints") > 1,
-            "Should be more than one nonlinear constraint header printed",
-        )
-        self.assertTrue(
-            output.count("Linear constraints") > 1,
-            "Should be more than one linear constraint header printed",
-        )
-        self.assertTrue(
-            output.count("Objectives") > 1,
-            "Should be more than one objective header printed",
-        )
-        self.assertTrue(
-            len([s for s in output if s.startswith("{'p1.x")]) > 1,
-            "Should be more than one p1.x printed",
-        )
-        self.assertTrue(
-            len([s for s in output if "'p2.y'" in s]) > 1,
-            "Should be more than one p2.y printed",
-        )
-        self.assertTrue(
-            len([s for s in output if s.startswith("{'con.c")]) > 1,
-            "Should be more than one con.c printed",
-        )
-        self.assertTrue(
-            len([s for s in output if s.startswith("{'comp.f_xy")]) > 1,
-            "Should be more than one comp.f_xy printed",
-        )
-
-    def test_sellar_mdf_linear_con_directsolver(self):
-        # This test makes sure that we call solve_nonlinear first if we have any linear constraints
-        # to cache.
-        prob = om.Problem()
-        model = prob.model = SellarDerivatives()
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-3
-
-        model.add_design_var(
-            "z", lower=np.array([-10.0, 0.0]), upper=np.array([10.0, 10.0])
-        )
-        model.add_design_var("x", lower=0.0, upper=10.0)
-        model.add_objective("obj")
-        model.add_constraint("con1", upper=0.0)
-        model.add_constraint("con2", upper=0.0)
-        model.add_constraint("x", upper=11.0, linear=True)
-
-        prob.setup(check=False, mode="rev")
-        prob.set_solver_print(level=0)
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["z"][0], 1.9776, 1e-3)
-        assert_near_equal(prob["z"][1], 0.0, 1e-3)
-        assert_near_equal(prob["x"], 0.0, 4e-3)
-
-        self.assertEqual(len(prob.driver._lincongrad_cache), 1)
-        # Piggyback test: make sure we can run the driver again as a subdriver without a keyerror.
-        prob.driver.run()
-        self.assertEqual(len(prob.driver._lincongrad_cache), 1)
-
-    def test_call_final_setup(self):
-        # Make sure we call final setup if our model hasn't been setup.
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        with self.assertRaises(RuntimeError) as cm:
-            totals = prob.check_totals(method="fd", out_stream=False)
-
-        expected_msg = (
-            "Problem: run_model must be called before total derivatives can be checked."
-        )
-
-        self.assertEqual(expected_msg, str(cm.exception))
-
-    def test_LN_COBYLA_linear_constraint(self):
-        # Bug where NLoptDriver tried to compute and cache the constraint derivatives for the
-        # lower and upper bounds of the desvars even though we were using a non-gradient optimizer.
-        # This causd a KeyError.
-        prob = om.Problem()
-        indeps = prob.model.add_subsystem("indeps", om.IndepVarComp())
-        indeps.add_output("x", 3.0)
-        indeps.add_output("y", -4.0)
-
-        prob.model.add_subsystem("parab", Paraboloid())
-
-        prob.model.add_subsystem("const", om.ExecComp("g = x + y"))
-
-        prob.model.connect("indeps.x", ["parab.x", "const.x"])
-        prob.model.connect("indeps.y", ["parab.y", "const.y"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LN_COBYLA"
-
-        prob.model.add_constraint("const.g", lower=0, upper=10.0)
-        prob.model.add_design_var(
-            "indeps.x", **{"ref0": 0, "ref": 2, "lower": -50, "upper": 50}
-        )
-        prob.model.add_design_var(
-            "indeps.y", **{"ref0": 0, "ref": 2, "lower": -50, "upper": 50}
-        )
-        prob.model.add_objective("parab.f_xy", scaler=4.0)
-        prob.setup()
-        prob.run_driver()
-
-        # minimum value
-        assert_near_equal(prob["parab.f_xy"], -27, 1e-6)
-
-    def test_multiple_objectives_error(self):
-
-        import openmdao.api as om
-        from openmdao.test_suite.components.paraboloid import Paraboloid
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        self.assertFalse(prob.driver.supports["multiple_objectives"])
-        prob.driver.options["debug_print"] = ["nl_cons", "objs"]
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_objective("c")  # Second objective
-        prob.setup()
-
-        with self.assertRaises(RuntimeError):
-            prob.run_model()
-
-        with self.assertRaises(RuntimeError):
-            prob.run_driver()
-
-    def test_GN_DIRECT(self):
-        import openmdao.api as om
-
-        np.random.seed(6)
-
-        size = 2  # size of the design variable
-
-        class Rastrigin(om.ExplicitComponent):
-            def setup(self):
-                self.add_input("x", 0.5 * np.ones(size))
-                self.add_output("f", 0.5)
-
-            def compute(
-                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
-            ):
-                x = inputs["x"]
-                outputs["f"] = rastrigin(x)
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
-        )
-        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
-
-        prob.driver = driver = NLoptDriver()
-        driver.options["optimizer"] = "GN_DIRECT"
-        driver.options["maxiter"] = 1000
-
-        model.add_design_var(
-            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
-        )
-        model.add_objective("f")
-        prob.setup()
-        prob.run_driver()
-        assert_near_equal(prob["x"], np.zeros(size), 1e-5)
-        assert_near_equal(prob["f"], 0.0, 1e-5)
-
-    def test_GN_DIRECT_L(self):
-        import openmdao.api as om
-
-        np.random.seed(6)
-
-        size = 2  # size of the design variable
-
-        class Rastrigin(om.ExplicitComponent):
-            def setup(self):
-                self.add_input("x", 0.5 * np.ones(size))
-                self.add_output("f", 0.5)
-
-            def compute(
-                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
-            ):
-                x = inputs["x"]
-                outputs["f"] = rastrigin(x)
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
-        )
-        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
-
-        prob.driver = driver = NLoptDriver()
-        driver.options["optimizer"] = "GN_DIRECT_L"
-        driver.options["maxiter"] = 500
-
-        model.add_design_var(
-            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
-        )
-        model.add_objective("f")
-        prob.setup()
-        prob.run_driver()
-        assert_near_equal(prob["x"], np.zeros(size), 1e-6)
-        assert_near_equal(prob["f"], 0.0, 1e-6)
-
-    def test_GN_DIRECT_L_NOSCAL(self):
-        import openmdao.api as om
-
-        np.random.seed(6)
-
-        size = 2  # size of the design variable
-
-        class Rastrigin(om.ExplicitComponent):
-            def setup(self):
-                self.add_input("x", 0.5 * np.ones(size))
-                self.add_output("f", 0.5)
-
-            def compute(
-                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
-            ):
-                x = inputs["x"]
-                outputs["f"] = rastrigin(x)
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
-        )
-        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
-
-        prob.driver = driver = NLoptDriver()
-        driver.options["optimizer"] = "GN_DIRECT_L_NOSCAL"
-        driver.options["maxiter"] = 500
-
-        model.add_design_var(
-            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
-        )
-        model.add_objective("f")
-        prob.setup()
-        prob.run_driver()
-        assert_near_equal(prob["x"], np.zeros(size), 1e-6)
-        assert_near_equal(prob["f"], 0.0, 1e-6)
-
-    def test_GN_ORIG_DIRECT(self):
-        import openmdao.api as om
-
-        np.random.seed(6)
-
-        size = 2  # size of the design variable
-
-        class Rastrigin(om.ExplicitComponent):
-            def setup(self):
-                self.add_input("x", 0.5 * np.ones(size))
-                self.add_output("f", 0.5)
-
-            def compute(
-                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
-            ):
-                x = inputs["x"]
-                outputs["f"] = rastrigin(x)
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
-        )
-        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
-
-        prob.driver = driver = NLoptDriver()
-        driver.options["optimizer"] = "GN_ORIG_DIRECT"
-        driver.options["maxiter"] = 1000
-
-        model.add_design_var(
-            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
-        )
-        model.add_objective("f")
-        prob.setup()
-        prob.run_driver()
-        assert_near_equal(prob["x"], np.zeros(size), 1e-5)
-        assert_near_equal(prob["f"], 0.0, 1e-5)
-
-    def test_GN_ORIG_DIRECT_L(self):
-        import openmdao.api as om
-
-        np.random.seed(6)
-
-        size = 2  # size of the design variable
-
-        class Rastrigin(om.ExplicitComponent):
-            def setup(self):
-                self.add_input("x", 0.5 * np.ones(size))
-                self.add_output("f", 0.5)
-
-            def compute(
-                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
-            ):
-                x = inputs["x"]
-                outputs["f"] = rastrigin(x)
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem(
-            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
-        )
-        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
-
-        prob.driver = driver = NLoptDriver()
-        driver.options["optimizer"] = "GN_ORIG_DIRECT_L"
-        driver.options["maxiter"] = 500
-
-        model.add_design_var(
-            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
-        )
-        model.add_objective("f")
-        prob.setup()
-        prob.run_driver()
-        assert_near_equal(prob["x"], np.zeros(size), 1e-6)
-        assert_near_equal(prob["f"], 0.0, 1e-6)
-
-    def test_simple_paraboloid_upper_LD_MMA(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_MMA"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"], 7.1666666, 1e-6)
-        assert_near_equal(prob["y"], -7.83333333, 1e-6)
-
-    def test_simple_paraboloid_upper_LD_CCSAQ(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_CCSAQ"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        assert_near_equal(prob["x"], 7.1666666, 1e-6)
-        assert_near_equal(prob["y"], -7.83333333, 1e-6)
-
-    def test_simple_paraboloid_upper_GN_ISRES(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 25.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 25.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ISRES"
-        prob.driver.options["tol"] = 1e-12
-
-        prob.driver.options["maxiter"] = 10000
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Just get pretty close to the optimum
-        assert_near_equal(prob["x"], 7.1666666, 1e-2)
-        assert_near_equal(prob["y"], -7.83333333, 1e-2)
-
-    def test_simple_paraboloid_upper_GN_ORIG_DIRECT(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.2), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 500
-
-        model.add_design_var("x", lower=5.0, upper=10.0)
-        model.add_design_var("y", lower=-10.0, upper=-5.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Just get pretty close to the optimum
-        assert_near_equal(prob["x"], 7.1666666, 1e-2)
-        assert_near_equal(prob["y"], -7.83333333, 1e-2)
-
-    def test_simple_paraboloid_upper_GN_ORIG_DIRECT_L(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.2), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT_L"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 500
-
-        model.add_design_var("x", lower=5.0, upper=10.0)
-        model.add_design_var("y", lower=-10.0, upper=-5.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Just get pretty close to the optimum
-        assert_near_equal(prob["x"], 7.1666666, 1e-2)
-        assert_near_equal(prob["y"], -7.83333333, 1e-2)
-
-    def test_simple_paraboloid_equality_COBYLA(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LN_COBYLA"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        assert_near_equal(prob["x"], 7.16667, 1e-4)
-        assert_near_equal(prob["y"], -7.833334, 1e-4)
-
-    def test_simple_paraboloid_equality_ISRES(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ISRES"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 20000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        # Loose tolerance
-        assert_near_equal(prob["x"], 7.16667, 1e-2)
-        assert_near_equal(prob["y"], -7.833334, 1e-2)
-
-    def test_simple_paraboloid_equality_failure_MMA(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_MMA"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 5000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        with self.assertRaises(NotImplementedError) as raises_msg:
-            failed = prob.run_driver()
-
-        exception = raises_msg.exception
-
-        msg = "The selected optimizer, LD_MMA, does not support equality constraints."
-
-        self.assertIn(msg, exception.args[0])
-
-    def test_simple_paraboloid_equality_failure_LD_CCSAQ(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_CCSAQ"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 5000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        with self.assertRaises(NotImplementedError) as raises_msg:
-            failed = prob.run_driver()
-
-        exception = raises_msg.exception
-
-        msg = "The selected optimizer, LD_CCSAQ, does not support equality constraints."
-
-        self.assertIn(msg, exception.args[0])
-
-    def test_simple_paraboloid_equality_failure_GN_ORIG_DIRECT(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 5000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        with self.assertRaises(NotImplementedError) as raises_msg:
-            failed = prob.run_driver()
-
-        exception = raises_msg.exception
-
-        msg = "The selected optimizer, GN_ORIG_DIRECT, does not support equality constraints."
-
-        self.assertIn(msg, exception.args[0])
-
-    def test_simple_paraboloid_equality_failure_GN_ORIG_DIRECT_L(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT_L"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 5000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        with self.assertRaises(NotImplementedError) as raises_msg:
-            failed = prob.run_driver()
-
-        exception = raises_msg.exception
-
-        msg = "The selected optimizer, GN_ORIG_DIRECT_L, does not support equality constraints."
-
-        self.assertIn(msg, exception.args[0])
-
-    def test_simple_paraboloid_equality_failure_GN_AGS(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_AGS"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 5000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", equals=-15.0)
-
-        prob.setup()
-
-        with self.assertRaises(NotImplementedError) as raises_msg:
-            failed = prob.run_driver()
-
-        exception = raises_msg.exception
-
-        msg = "The selected optimizer, GN_AGS, does not support equality constraints."
-
-        self.assertIn(msg, exception.args[0])
-
-    def test_maxtime(self):
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9, maxtime=0.0001)
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # It shouldn't have time to move from the initial point
-        assert_near_equal(prob["x"], 50.0, 1e-6)
-        assert_near_equal(prob["y"], 50.0, 1e-6)
-
-    def test_simple_paraboloid_inequalities(self):
-        # This test checks that you can set a constraint with the same value
-        # for both the lower and upper bounds to effectively create an equality
-        # constraint even if the optimization method doesn't allow equality constraints
-
-        prob = om.Problem()
-        model = prob.model
-
-        # Start very close to the correct answer with tight bounds to
-        # reduce test runtime
-        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
-
-        prob.set_solver_print(level=0)
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT"
-        prob.driver.options["tol"] = 1e-6
-
-        prob.driver.options["maxiter"] = 5000
-
-        model.add_design_var("x", lower=7.0, upper=7.5)
-        model.add_design_var("y", lower=-8.0, upper=-7.5)
-        model.add_objective("f_xy")
-        model.add_constraint("c", lower=-15.0, upper=-15.0)
-
-        prob.setup()
-
-        failed = prob.run_driver()
-
-        # Minimum should be at (7.166667, -7.833334)
-        # Loose tolerance
-        assert_near_equal(prob["x"], 7.16667, 1e-2)
-        assert_near_equal(prob["y"], -7.833334, 1e-2)
-
-
-@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
-class TestNLoptDriverFeatures(unittest.TestCase):
-    def test_feature_basic(self):
-        import openmdao.api as om
-        from openmdao.test_suite.components.paraboloid import Paraboloid
-        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["optimizer"] = "LD_SLSQP"
-        prob.driver.options["tol"] = 1e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-
-    def test_feature_optimizer(self):
-        import openmdao.api as om
-        from openmdao.test_suite.components.paraboloid import Paraboloid
-        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.driver = NLoptDriver(optimizer="LD_SLSQP")
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-
-    def test_feature_maxiter(self):
-        import openmdao.api as om
-        from openmdao.test_suite.components.paraboloid import Paraboloid
-        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["maxiter"] = 20
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-
-    def test_feature_tol(self):
-        import openmdao.api as om
-        from openmdao.test_suite.components.paraboloid import Paraboloid
-        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
-
-        prob = om.Problem()
-        model = prob.model
-
-        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
-        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
-        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
-
-        prob.driver = NLoptDriver()
-        prob.driver.options["tol"] = 1.0e-9
-
-        model.add_design_var("x", lower=-50.0, upper=50.0)
-        model.add_design_var("y", lower=-50.0, upper=50.0)
-        model.add_objective("f_xy")
-
-        prob.setup()
-
-        prob.run_driver()
-
-        assert_near_equal(prob["x"], 6.66666667, 1e-6)
-        assert_near_equal(prob["y"], -7.3333333, 1e-6)
-        
-@unittest.skipUnless(nlopt is None, "only run if NLopt is NOT installed.")
-class TestNotInstalled(unittest.TestCase):
-
-    def test_nlopt_not_installed(self):
-        # the import should not fail
-        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
-
-        # but we get a RuntimeError if we try to instantiate
-        with self.assertRaises(RuntimeError) as ctx:
-            NLoptDriver()
-
-        self.assertEqual(str(ctx.exception),
-                         'NLoptDriver is not available, NLopt is not installed.')
-
-
-if __name__ == "__main__":
-    unittest.main()
+""" Unit tests for the NLOpt Driver."""
+
+import copy
+import gc
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+import weakref
+from unittest import mock
+
+import numpy as np
+
+import openmdao.api as om
+from openmdao.test_suite.components.expl_comp_array import TestExplCompArrayDense
+from openmdao.test_suite.components.paraboloid import Paraboloid
+from openmdao.test_suite.components.paraboloid_distributed import DistParab
+from openmdao.test_suite.components.sellar import (
+    SellarDerivativesGrouped,
+    SellarDerivatives,
+)
+from openmdao.test_suite.components.simple_comps import NonSquareArrayComp
+from openmdao.test_suite.groups.sin_fitter import SineFitter
+from openmdao.utils.array_utils import evenly_distrib_idxs
+from openmdao.utils.assert_utils import assert_near_equal
+from openmdao.utils.general_utils import run_driver
+from openmdao.utils.mpi import MPI
+from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+try:
+    import nlopt
+except ImportError:
+    nlopt = None
+
+try:
+    from openmdao.vectors.petsc_vector import PETScVector
+except ImportError:
+    PETScVector = None
+
+
+def rastrigin(x):
+    a = 10  # constant
+    return np.sum(np.square(x) - a * np.cos(2 * np.pi * x)) + a * np.size(x)
+
+
+class TransientNoiseComp(om.ExplicitComponent):
+    """
+    Quadratic whose values are noisy during its first evaluations, like a model whose
+    solver is loosely converged until it warms up.
+    """
+
+    def initialize(self):
+        self.options.declare("noisy_evals", 10)
+        self.options.declare("amplitude", 1e-6)
+
+    def setup(self):
+        self.add_input("x", np.zeros(2))
+        self.add_output("f", 0.0)
+        self.declare_partials("f", "x")
+
+    def compute(self, inputs, outputs):
+        x = inputs["x"]
+        outputs["f"] = np.sum((x - 1.0) ** 2)
+        if self.iter_count < self.options["noisy_evals"]:
+            outputs["f"] += self.options["amplitude"] * np.sin(1e7 * x[0])
+
+    def compute_partials(self, inputs, partials):
+        partials["f", "x"] = 2.0 * (inputs["x"] - 1.0)
+
+
+class HangingParaboloid(Paraboloid):
+    """
+    Paraboloid whose evaluation hangs where x is large, like a model whose solver stalls.
+
+    Like many models, it carries on after errors of its own.
+    """
+
+    def compute(self, inputs, outputs):
+        if inputs["x"] > 8.0:
+            try:
+                time.sleep(60.0)
+            except Exception:
+                pass
+        super(HangingParaboloid, self).compute(inputs, outputs)
+
+
+@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+class TestNLoptDriver(unittest.TestCase):
+    def test_driver_supports(self):
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+
+        with self.assertRaises(KeyError) as raises_msg:
+            prob.driver.supports["equality_constraints"] = False
+
+        exception = raises_msg.exception
+
+        msg = "NLoptDriver: Tried to set read-only option 'equality_constraints'."
+
+        self.assertEqual(exception.args[0], msg)
+
+    def test_compute_totals_basic_return_array(self):
+        # Make sure 'array' return_format works.
+
+        prob = om.Problem()
+        model = prob.model
+        model.add_subsystem("p1", om.IndepVarComp("x", 0.0), promotes=["x"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 0.0), promotes=["y"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["x", "y", "f_xy"])
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup(check=False, mode="fwd")
+        prob.set_solver_print(level=0)
+
+        failed = prob.run_driver()
+
+        of = ["f_xy"]
+        wrt = ["x", "y"]
+        derivs = prob.compute_totals(of=of, wrt=wrt, return_format="array")
+
+        assert_near_equal(derivs[0, 0], -6.0, 1e-6)
+        assert_near_equal(derivs[0, 1], 8.0, 1e-6)
+
+        prob.setup(check=False, mode="rev")
+
+        prob.run_model()
+
+        of = ["f_xy"]
+        wrt = ["x", "y"]
+        derivs = prob.compute_totals(of=of, wrt=wrt, return_format="array")
+
+        assert_near_equal(derivs[0, 0], -6.0, 1e-6)
+        assert_near_equal(derivs[0, 1], 8.0, 1e-6)
+
+    def test_compute_totals_return_array_non_square(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("px", om.IndepVarComp(name="x", val=np.ones((2,))))
+        comp = model.add_subsystem("comp", NonSquareArrayComp())
+        model.connect("px.x", "comp.x1")
+
+        model.add_design_var("px.x")
+        model.add_objective("px.x")
+        model.add_constraint("comp.y1")
+        model.add_constraint("comp.y2")
+
+        prob.setup(check=False, mode="auto")
+
+        failed = prob.run_driver()
+
+        derivs = prob.compute_totals(
+            of=["comp.y1"], wrt=["px.x"], return_format="array"
+        )
+
+        J = comp.JJ[0:3, 0:2]
+        assert_near_equal(J, derivs, 1.0e-3)
+
+        # Support for a name to be in 'of' and 'wrt'
+
+        derivs = prob.compute_totals(
+            of=["comp.y2", "px.x", "comp.y1"], wrt=["px.x"], return_format="array"
+        )
+
+        assert_near_equal(J, derivs[3:, :], 1.0e-3)
+        assert_near_equal(comp.JJ[3:4, 0:2], derivs[0:1, :], 1.0e-3)
+        assert_near_equal(np.eye(2), derivs[1:3, :], 1.0e-3)
+
+    def test_deriv_wrt_self(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("px", om.IndepVarComp(name="x", val=np.ones((2,))))
+
+        model.add_design_var("px.x")
+        model.add_objective("px.x")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Support for a name to be in 'of' and 'wrt'
+
+        J = prob.driver._compute_totals(
+            of=["px.x"], wrt=["px.x"], return_format="array"
+        )
+
+        assert_near_equal(J, np.eye(2), 1.0e-3)
+
+    def test_optimizer_simple_paraboloid_unconstrained(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_simple_paraboloid_unconstrained(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_simple_paraboloid_unconstrained_LN_COBYLA(self):
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LN_COBYLA"
+        prob.driver.options["tol"] = 1e-12
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_simple_paraboloid_upper(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+    def test_simple_paraboloid_lower(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+    def test_simple_paraboloid_equality(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.833334, 1e-4)
+
+    def test_simple_paraboloid_equality_AUGLAG(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="AUGLAG", local_optimizer="LD_MMA", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.833334, 1e-4)
+
+    def test_simple_paraboloid_linear_AUGLAG(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="AUGLAG", local_optimizer="LD_MMA", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0, linear=True)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # The gradient of the linear constraint is computed once, for the local optimizer
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.833334, 1e-4)
+        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy"])
+
+    def test_simple_paraboloid_unconstrained_LD_LBFGS(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_LBFGS", tol=1e-9, vector_storage=3)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_G_MLSL_LDS_seed(self):
+
+        results = []
+        for i in range(2):
+            prob = om.Problem()
+            model = prob.model
+
+            model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+            model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+            model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+            prob.set_solver_print(level=0)
+
+            prob.driver = NLoptDriver(
+                optimizer="G_MLSL_LDS",
+                local_optimizer="LN_COBYLA",
+                population=4,
+                maxiter=300,
+                seed=11,
+            )
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+
+            prob.setup()
+
+            failed = prob.run_driver()
+
+            assert_near_equal(prob["x"], 6.66666667, 1e-3)
+            assert_near_equal(prob["y"], -7.3333333, 1e-3)
+            results.append(prob.driver.history["x"].copy())
+
+        # The same seed gives the same sequence of points
+        assert_near_equal(results[1], results[0], 1e-12)
+
+    def test_tuning_options_validation(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("comp", om.ExecComp("f = x**2"), promotes=["*"])
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_objective("f")
+
+        prob.driver = NLoptDriver(optimizer="AUGLAG")
+        prob.setup()
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.final_setup()
+        self.assertEqual(
+            str(raises_cm.exception), "NLoptDriver: Optimizer AUGLAG needs a 'local_optimizer'."
+        )
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", population=10)
+        prob.setup()
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.final_setup()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "NLoptDriver: Option 'population' is only used by ['GN_ISRES', 'G_MLSL_LDS'].",
+        )
+
+        # The option is fine as soon as one stage uses it
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", global_optimizer="GN_ISRES", population=10)
+        prob.setup()
+        prob.final_setup()
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", restart_rescale=True)
+        prob.setup()
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.final_setup()
+        self.assertEqual(
+            str(raises_cm.exception), "NLoptDriver: Option 'restart_rescale' requires 'auto_scale'."
+        )
+
+    def test_default_initial_step(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LN_COBYLA", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # The first steps are a tenth of the range between the bounds
+        history = prob.driver.history["x"]
+        assert_near_equal(history[1] - history[0], [-10.0, 0.0], 1e-12)
+        assert_near_equal(prob["x"], 6.66666667, 1e-4)
+        assert_near_equal(prob["y"], -7.3333333, 1e-4)
+
+    def test_missing_objective(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("x", om.IndepVarComp("x", 2.0), promotes=["*"])
+        model.add_subsystem("f_x", Paraboloid(), promotes=["*"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+
+        prob.model.add_design_var("x", lower=0)
+
+        prob.setup()
+
+        with self.assertRaises(Exception) as raises_msg:
+            prob.run_driver()
+
+        exception = raises_msg.exception
+
+        msg = "Driver requires objective to be declared"
+
+        self.assertEqual(exception.args[0], msg)
+
+    def test_simple_paraboloid_double_sided_low(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=-11.0, upper=-10.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["y"] - prob["x"], -11.0, 1e-6)
+
+    def test_simple_paraboloid_double_sided_high(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=10.0, upper=11.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
+
+    def test_simple_array_comp2D(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
+        )
+        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
+        model.add_subsystem(
+            "con",
+            om.ExecComp("c = areas - 20.0", c=np.zeros((2, 2)), areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+        model.add_subsystem(
+            "obj",
+            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("widths", lower=-50.0, upper=50.0)
+        model.add_objective("o")
+        model.add_constraint("c", equals=0.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        obj = prob["o"]
+        assert_near_equal(obj, 20.0, 1e-6)
+
+    def test_simple_array_comp2D_eq_con(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
+        )
+        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
+        model.add_subsystem(
+            "obj",
+            om.ExecComp("o = areas[0, 0] + areas[1, 1]", areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("widths", lower=-50.0, upper=50.0)
+        model.add_objective("o")
+        model.add_constraint("areas", equals=np.array([24.0, 21.0, 3.5, 17.5]))
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        obj = prob["o"]
+        assert_near_equal(obj, 41.5, 1e-6)
+
+    def test_simple_array_comp2D_dbl_sided_con(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
+        )
+        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
+        model.add_subsystem(
+            "obj",
+            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("widths", lower=-50.0, upper=50.0)
+        model.add_objective("o")
+        model.add_constraint(
+            "areas",
+            lower=np.array([24.0, 21.0, 3.5, 17.5]),
+            upper=np.array([24.0, 21.0, 3.5, 17.5]),
+        )
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        con = prob["areas"]
+        assert_near_equal(con, np.array([[24.0, 21.0], [3.5, 17.5]]), 1e-6)
+
+    def test_simple_array_comp2D_dbl_sided_con_array(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
+        )
+        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
+        model.add_subsystem(
+            "obj",
+            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("widths", lower=-50.0, upper=50.0)
+        model.add_objective("o")
+        model.add_constraint("areas", lower=20.0, upper=20.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        obj = prob["o"]
+        assert_near_equal(obj, 20.0, 1e-6)
+
+    def test_simple_array_comp2D_array_lo_hi(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "p1", om.IndepVarComp("widths", np.zeros((2, 2))), promotes=["*"]
+        )
+        model.add_subsystem("comp", TestExplCompArrayDense(), promotes=["*"])
+        model.add_subsystem(
+            "con",
+            om.ExecComp("c = areas - 20.0", c=np.zeros((2, 2)), areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+        model.add_subsystem(
+            "obj",
+            om.ExecComp("o = areas[0, 0]", areas=np.zeros((2, 2))),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var(
+            "widths", lower=-50.0 * np.ones((2, 2)), upper=50.0 * np.ones((2, 2))
+        )
+        model.add_objective("o")
+        model.add_constraint("c", equals=0.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        obj = prob["o"]
+        assert_near_equal(obj, 20.0, 1e-6)
+
+    def test_simple_paraboloid_scaled_desvars_fwd(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0, ref=0.02)
+        model.add_design_var("y", lower=-50.0, upper=50.0, ref=0.02)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=10.0, upper=11.0)
+
+        prob.setup(check=False, mode="fwd")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
+
+    def test_simple_paraboloid_scaled_desvars_rev(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0, ref=0.02)
+        model.add_design_var("y", lower=-50.0, upper=50.0, ref=0.02)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=10.0, upper=11.0)
+
+        prob.setup(check=False, mode="rev")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
+
+    def test_simple_paraboloid_scaled_constraint_fwd(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-8
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=10.0, upper=11.0, ref=10.0)
+
+        prob.setup(check=False, mode="fwd")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
+
+    def test_simple_paraboloid_scaled_objective_fwd(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        prob.set_solver_print(level=0)
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy", ref=10.0)
+        model.add_constraint("c", lower=10.0, upper=11.0)
+
+        prob.setup(check=False, mode="fwd")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
+
+    def test_simple_paraboloid_scaled_objective_rev(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        prob.set_solver_print(level=0)
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy", ref=10.0)
+        model.add_constraint("c", lower=10.0, upper=11.0)
+
+        prob.setup(check=False, mode="rev")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"] - prob["y"], 11.0, 1e-6)
+
+    def test_sellar_mdf(self):
+
+        prob = om.Problem()
+        model = prob.model = SellarDerivativesGrouped()
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var(
+            "z", lower=np.array([-10.0, 0.0]), upper=np.array([10.0, 10.0])
+        )
+        model.add_design_var("x", lower=0.0, upper=10.0)
+        model.add_objective("obj")
+        model.add_constraint("con1", upper=0.0)
+        model.add_constraint("con2", upper=0.0)
+
+        prob.setup(check=False, mode="rev")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["z"][0], 1.9776, 1e-3)
+        assert_near_equal(prob["z"][1], 0.0, 1e-3)
+        assert_near_equal(prob["x"], 0.0, 1e-3)
+
+    def test_bug_in_eq_constraints(self):
+        # We were getting extra constraints created because lower and upper are maxfloat instead of
+        # None when unused.
+        p = om.Problem(model=SineFitter())
+        p.driver = NLoptDriver()
+
+        p.setup()
+        p.run_driver()
+
+        max_defect = np.max(np.abs(p["defect.defect"]))
+        assert_near_equal(max_defect, 0.0, 1e-10)
+
+    def test_reraise_exception_from_callbacks(self):
+        class ReducedActuatorDisc(om.ExplicitComponent):
+            def setup(self):
+
+                # Inputs
+                self.add_input("a", 0.5, desc="Induced Velocity Factor")
+                self.add_input(
+                    "Vu",
+                    10.0,
+                    units="m/s",
+                    desc="Freestream air velocity, upstream of rotor",
+                )
+
+                # Outputs
+                self.add_output(
+                    "Vd",
+                    0.0,
+                    units="m/s",
+                    desc="Slipstream air velocity, downstream of rotor",
+                )
+
+            def compute(self, inputs, outputs):
+                a = inputs["a"]
+                Vu = inputs["Vu"]
+
+                outputs["Vd"] = Vu * (1 - 2 * a)
+
+            def compute_partials(self, inputs, J):
+                Vu = inputs["Vu"]
+
+                J["Vd", "a"] = -2.0 * Vu
+
+        prob = om.Problem()
+        indeps = prob.model.add_subsystem("indeps", om.IndepVarComp(), promotes=["*"])
+        indeps.add_output("a", 0.5)
+        indeps.add_output("Vu", 10.0, units="m/s")
+
+        prob.model.add_subsystem(
+            "a_disk", ReducedActuatorDisc(), promotes_inputs=["a", "Vu"]
+        )
+
+        # setup the optimization
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+
+        prob.model.add_design_var("a", lower=0.0, upper=1.0)
+        # negative one so we maximize the objective
+        prob.model.add_objective("a_disk.Vd", scaler=-1)
+
+        prob.setup()
+
+        with self.assertRaises(KeyError) as context:
+            prob.run_driver()
+
+        msg = 'Variable name pair ("Vd", "a") must first be declared.'
+        self.assertTrue(msg in str(context.exception))
+
+    def test_simple_paraboloid_upper_LN_COBYLA(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LN_COBYLA"
+        prob.driver.options["tol"] = 1e-12
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+    def test_sellar_mdf_LN_COBYLA(self):
+
+        prob = om.Problem()
+        model = prob.model = SellarDerivativesGrouped()
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LN_COBYLA"
+        prob.driver.options["tol"] = 1e-12
+
+        prob.set_solver_print(level=0)
+
+        model.add_design_var(
+            "z", lower=np.array([-10.0, 0.0]), upper=np.array([10.0, 10.0])
+        )
+        model.add_design_var("x", lower=0.0, upper=10.0)
+        model.add_objective("obj")
+        model.add_constraint("con1", upper=0.0)
+        model.add_constraint("con2", upper=0.0)
+
+        prob.setup(check=False, mode="rev")
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["z"][0], 1.9776, 1e-3)
+        assert_near_equal(prob["z"][1], 0.0, 1e-3)
+        assert_near_equal(prob["x"], 0.0, 1e-3)
+
+    def test_simple_paraboloid_lower_linear(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x - y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=15.0, linear=True)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy"])
+
+    def test_simple_paraboloid_equality_linear(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0, linear=True)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+    def test_debug_print_option_totals(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        prob.driver.options["debug_print"] = ["totals"]
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup(check=False, mode="rev")
+
+        failed, output = run_driver(prob)
+
+        self.assertTrue(
+            "In mode: rev, Solving variable(s) using simul coloring:" in output
+        )
+        self.assertTrue("('comp.f_xy', [0])" in output)
+        self.assertTrue("Elapsed Time:" in output)
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        prob.driver.options["debug_print"] = ["totals"]
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup(check=False, mode="fwd")
+
+        failed, output = run_driver(prob)
+
+        self.assertTrue(
+            "In mode: fwd, Solving variable(s) using simul coloring:" in output
+        )
+        self.assertTrue("('p1.x', [0])" in output)
+        self.assertTrue("Elapsed Time:" in output)
+
+    def test_debug_print_option(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        prob.driver.options["debug_print"] = ["desvars", "ln_cons", "nl_cons", "objs"]
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed, output = run_driver(prob)
+
+        output = output.split("\n")
+
+        self.assertTrue(
+            output.count("Design Vars") > 1,
+            "Should be more than one design vars header printed",
+        )
+        self.assertTrue(
+            output.count("Nonlinear constraints") > 1,
+            "Should be more than one nonlinear constraint header printed",
+        )
+        self.assertTrue(
+            output.count("Linear constraints") > 1,
+            "Should be more than one linear constraint header printed",
+        )
+        self.assertTrue(
+            output.count("Objectives") > 1,
+            "Should be more than one objective header printed",
+        )
+        self.assertTrue(
+            len([s for s in output if s.startswith("{'p1.x")]) > 1,
+            "Should be more than one p1.x printed",
+        )
+        self.assertTrue(
+            len([s for s in output if "'p2.y'" in s]) > 1,
+            "Should be more than one p2.y printed",
+        )
+        self.assertTrue(
+            len([s for s in output if s.startswith("{'con.c")]) > 1,
+            "Should be more than one con.c printed",
+        )
+        self.assertTrue(
+            len([s for s in output if s.startswith("{'comp.f_xy")]) > 1,
+            "Should be more than one comp.f_xy printed",
+        )
+
+    def test_sellar_mdf_linear_con_directsolver(self):
+        # This test makes sure that we call solve_nonlinear first if we have any linear constraints
+        # to cache.
+        prob = om.Problem()
+        model = prob.model = SellarDerivatives()
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-3
+
+        model.add_design_var(
+            "z", lower=np.array([-10.0, 0.0]), upper=np.array([10.0, 10.0])
+        )
+        model.add_design_var("x", lower=0.0, upper=10.0)
+        model.add_objective("obj")
+        model.add_constraint("con1", upper=0.0)
+        model.add_constraint("con2", upper=0.0)
+        model.add_constraint("x", upper=11.0, linear=True)
+
+        prob.setup(check=False, mode="rev")
+        prob.set_solver_print(level=0)
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["z"][0], 1.9776, 1e-3)
+        assert_near_equal(prob["z"][1], 0.0, 1e-3)
+        assert_near_equal(prob["x"], 0.0, 4e-3)
+
+        self.assertEqual(len(prob.driver._lincongrad_cache), 1)
+        # Piggyback test: make sure we can run the driver again as a subdriver without a keyerror.
+        prob.driver.run()
+        self.assertEqual(len(prob.driver._lincongrad_cache), 1)
+
+    def test_call_final_setup(self):
+        # Make sure we call final setup if our model hasn't been setup.
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        with self.assertRaises(RuntimeError) as cm:
+            totals = prob.check_totals(method="fd", out_stream=False)
+
+        expected_msg = (
+            "Problem: run_model must be called before total derivatives can be checked."
+        )
+
+        self.assertEqual(expected_msg, str(cm.exception))
+
+    def test_LN_COBYLA_linear_constraint(self):
+        # Bug where NLoptDriver tried to compute and cache the constraint derivatives for the
+        # lower and upper bounds of the desvars even though we were using a non-gradient optimizer.
+        # This causd a KeyError.
+        prob = om.Problem()
+        indeps = prob.model.add_subsystem("indeps", om.IndepVarComp())
+        indeps.add_output("x", 3.0)
+        indeps.add_output("y", -4.0)
+
+        prob.model.add_subsystem("parab", Paraboloid())
+
+        prob.model.add_subsystem("const", om.ExecComp("g = x + y"))
+
+        prob.model.connect("indeps.x", ["parab.x", "const.x"])
+        prob.model.connect("indeps.y", ["parab.y", "const.y"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LN_COBYLA"
+
+        prob.model.add_constraint("const.g", lower=0, upper=10.0)
+        prob.model.add_design_var(
+            "indeps.x", **{"ref0": 0, "ref": 2, "lower": -50, "upper": 50}
+        )
+        prob.model.add_design_var(
+            "indeps.y", **{"ref0": 0, "ref": 2, "lower": -50, "upper": 50}
+        )
+        prob.model.add_objective("parab.f_xy", scaler=4.0)
+        prob.setup()
+        prob.run_driver()
+
+        # minimum value
+        assert_near_equal(prob["parab.f_xy"], -27, 1e-6)
+
+    def test_multiple_objectives_error(self):
+
+        import openmdao.api as om
+        from openmdao.test_suite.components.paraboloid import Paraboloid
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        self.assertFalse(prob.driver.supports["multiple_objectives"])
+        prob.driver.options["debug_print"] = ["nl_cons", "objs"]
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_objective("c")  # Second objective
+        prob.setup()
+
+        with self.assertRaises(RuntimeError):
+            prob.run_model()
+
+        with self.assertRaises(RuntimeError):
+            prob.run_driver()
+
+    def test_GN_DIRECT(self):
+        import openmdao.api as om
+
+        np.random.seed(6)
+
+        size = 2  # size of the design variable
+
+        class Rastrigin(om.ExplicitComponent):
+            def setup(self):
+                self.add_input("x", 0.5 * np.ones(size))
+                self.add_output("f", 0.5)
+
+            def compute(
+                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
+            ):
+                x = inputs["x"]
+                outputs["f"] = rastrigin(x)
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
+        )
+        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
+
+        prob.driver = driver = NLoptDriver()
+        driver.options["optimizer"] = "GN_DIRECT"
+        driver.options["maxiter"] = 1000
+
+        model.add_design_var(
+            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
+        )
+        model.add_objective("f")
+        prob.setup()
+        prob.run_driver()
+        assert_near_equal(prob["x"], np.zeros(size), 1e-5)
+        assert_near_equal(prob["f"], 0.0, 1e-5)
+
+    def test_GN_DIRECT_L(self):
+        import openmdao.api as om
+
+        np.random.seed(6)
+
+        size = 2  # size of the design variable
+
+        class Rastrigin(om.ExplicitComponent):
+            def setup(self):
+                self.add_input("x", 0.5 * np.ones(size))
+                self.add_output("f", 0.5)
+
+            def compute(
+                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
+            ):
+                x = inputs["x"]
+                outputs["f"] = rastrigin(x)
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
+        )
+        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
+
+        prob.driver = driver = NLoptDriver()
+        driver.options["optimizer"] = "GN_DIRECT_L"
+        driver.options["maxiter"] = 500
+
+        model.add_design_var(
+            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
+        )
+        model.add_objective("f")
+        prob.setup()
+        prob.run_driver()
+        assert_near_equal(prob["x"], np.zeros(size), 1e-6)
+        assert_near_equal(prob["f"], 0.0, 1e-6)
+
+    def test_GN_DIRECT_L_NOSCAL(self):
+        import openmdao.api as om
+
+        np.random.seed(6)
+
+        size = 2  # size of the design variable
+
+        class Rastrigin(om.ExplicitComponent):
+            def setup(self):
+                self.add_input("x", 0.5 * np.ones(size))
+                self.add_output("f", 0.5)
+
+            def compute(
+                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
+            ):
+                x = inputs["x"]
+                outputs["f"] = rastrigin(x)
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
+        )
+        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
+
+        prob.driver = driver = NLoptDriver()
+        driver.options["optimizer"] = "GN_DIRECT_L_NOSCAL"
+        driver.options["maxiter"] = 500
+
+        model.add_design_var(
+            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
+        )
+        model.add_objective("f")
+        prob.setup()
+        prob.run_driver()
+        assert_near_equal(prob["x"], np.zeros(size), 1e-6)
+        assert_near_equal(prob["f"], 0.0, 1e-6)
+
+    def test_GN_ORIG_DIRECT(self):
+        import openmdao.api as om
+
+        np.random.seed(6)
+
+        size = 2  # size of the design variable
+
+        class Rastrigin(om.ExplicitComponent):
+            def setup(self):
+                self.add_input("x", 0.5 * np.ones(size))
+                self.add_output("f", 0.5)
+
+            def compute(
+                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
+            ):
+                x = inputs["x"]
+                outputs["f"] = rastrigin(x)
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
+        )
+        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
+
+        prob.driver = driver = NLoptDriver()
+        driver.options["optimizer"] = "GN_ORIG_DIRECT"
+        driver.options["maxiter"] = 1000
+
+        model.add_design_var(
+            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
+        )
+        model.add_objective("f")
+        prob.setup()
+        prob.run_driver()
+        assert_near_equal(prob["x"], np.zeros(size), 1e-5)
+        assert_near_equal(prob["f"], 0.0, 1e-5)
+
+    def test_GN_ORIG_DIRECT_L(self):
+        import openmdao.api as om
+
+        np.random.seed(6)
+
+        size = 2  # size of the design variable
+
+        class Rastrigin(om.ExplicitComponent):
+            def setup(self):
+                self.add_input("x", 0.5 * np.ones(size))
+                self.add_output("f", 0.5)
+
+            def compute(
+                self, inputs, outputs, discrete_inputs=None, discrete_outputs=None
+            ):
+                x = inputs["x"]
+                outputs["f"] = rastrigin(x)
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "indeps", om.IndepVarComp("x", np.ones(size)), promotes=["*"]
+        )
+        model.add_subsystem("rastrigin", Rastrigin(), promotes=["*"])
+
+        prob.driver = driver = NLoptDriver()
+        driver.options["optimizer"] = "GN_ORIG_DIRECT_L"
+        driver.options["maxiter"] = 500
+
+        model.add_design_var(
+            "x", lower=-5.12 * np.ones(size), upper=5.12 * np.ones(size)
+        )
+        model.add_objective("f")
+        prob.setup()
+        prob.run_driver()
+        assert_near_equal(prob["x"], np.zeros(size), 1e-6)
+        assert_near_equal(prob["f"], 0.0, 1e-6)
+
+    def test_simple_paraboloid_upper_LD_MMA(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_MMA"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 7.1666666, 1e-6)
+        assert_near_equal(prob["y"], -7.83333333, 1e-6)
+
+    def test_simple_paraboloid_upper_LD_CCSAQ(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_CCSAQ"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["x"], 7.1666666, 1e-6)
+        assert_near_equal(prob["y"], -7.83333333, 1e-6)
+
+    def test_simple_paraboloid_upper_GN_ISRES(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 25.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 25.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ISRES"
+        prob.driver.options["tol"] = 1e-12
+
+        prob.driver.options["maxiter"] = 10000
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Just get pretty close to the optimum
+        assert_near_equal(prob["x"], 7.1666666, 1e-2)
+        assert_near_equal(prob["y"], -7.83333333, 1e-2)
+
+    def test_simple_paraboloid_upper_GN_ORIG_DIRECT(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.2), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 500
+
+        model.add_design_var("x", lower=5.0, upper=10.0)
+        model.add_design_var("y", lower=-10.0, upper=-5.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Just get pretty close to the optimum
+        assert_near_equal(prob["x"], 7.1666666, 1e-2)
+        assert_near_equal(prob["y"], -7.83333333, 1e-2)
+
+    def test_simple_paraboloid_upper_GN_ORIG_DIRECT_L(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.2), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT_L"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 500
+
+        model.add_design_var("x", lower=5.0, upper=10.0)
+        model.add_design_var("y", lower=-10.0, upper=-5.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Just get pretty close to the optimum
+        assert_near_equal(prob["x"], 7.1666666, 1e-2)
+        assert_near_equal(prob["y"], -7.83333333, 1e-2)
+
+    def test_simple_paraboloid_equality_COBYLA(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LN_COBYLA"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.833334, 1e-4)
+
+    def test_simple_paraboloid_equality_ISRES(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ISRES"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 20000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        # Loose tolerance
+        assert_near_equal(prob["x"], 7.16667, 1e-2)
+        assert_near_equal(prob["y"], -7.833334, 1e-2)
+
+    def test_simple_paraboloid_equality_failure_MMA(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_MMA"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 5000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        with self.assertRaises(NotImplementedError) as raises_msg:
+            failed = prob.run_driver()
+
+        exception = raises_msg.exception
+
+        msg = "The selected optimizer, LD_MMA, does not support equality constraints."
+
+        self.assertIn(msg, exception.args[0])
+
+    def test_simple_paraboloid_equality_failure_LD_CCSAQ(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_CCSAQ"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 5000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        with self.assertRaises(NotImplementedError) as raises_msg:
+            failed = prob.run_driver()
+
+        exception = raises_msg.exception
+
+        msg = "The selected optimizer, LD_CCSAQ, does not support equality constraints."
+
+        self.assertIn(msg, exception.args[0])
+
+    def test_simple_paraboloid_equality_failure_GN_ORIG_DIRECT(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 5000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        with self.assertRaises(NotImplementedError) as raises_msg:
+            failed = prob.run_driver()
+
+        exception = raises_msg.exception
+
+        msg = "The selected optimizer, GN_ORIG_DIRECT, does not support equality constraints."
+
+        self.assertIn(msg, exception.args[0])
+
+    def test_simple_paraboloid_equality_failure_GN_ORIG_DIRECT_L(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT_L"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 5000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        with self.assertRaises(NotImplementedError) as raises_msg:
+            failed = prob.run_driver()
+
+        exception = raises_msg.exception
+
+        msg = "The selected optimizer, GN_ORIG_DIRECT_L, does not support equality constraints."
+
+        self.assertIn(msg, exception.args[0])
+
+    def test_simple_paraboloid_equality_failure_GN_AGS(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_AGS"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 5000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", equals=-15.0)
+
+        prob.setup()
+
+        with self.assertRaises(NotImplementedError) as raises_msg:
+            failed = prob.run_driver()
+
+        exception = raises_msg.exception
+
+        msg = "The selected optimizer, GN_AGS, does not support equality constraints."
+
+        self.assertIn(msg, exception.args[0])
+
+    def test_maxtime(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9, maxtime=0.0001)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # It shouldn't have time to move from the initial point
+        assert_near_equal(prob["x"], 50.0, 1e-6)
+        assert_near_equal(prob["y"], 50.0, 1e-6)
+
+    def test_simple_paraboloid_inequalities(self):
+        # This test checks that you can set a constraint with the same value
+        # for both the lower and upper bounds to effectively create an equality
+        # constraint even if the optimization method doesn't allow equality constraints
+
+        prob = om.Problem()
+        model = prob.model
+
+        # Start very close to the correct answer with tight bounds to
+        # reduce test runtime
+        model.add_subsystem("p1", om.IndepVarComp("x", 7.5), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", -7.6), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "GN_ORIG_DIRECT"
+        prob.driver.options["tol"] = 1e-6
+
+        prob.driver.options["maxiter"] = 5000
+
+        model.add_design_var("x", lower=7.0, upper=7.5)
+        model.add_design_var("y", lower=-8.0, upper=-7.5)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=-15.0, upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        # Minimum should be at (7.166667, -7.833334)
+        # Loose tolerance
+        assert_near_equal(prob["x"], 7.16667, 1e-2)
+        assert_near_equal(prob["y"], -7.833334, 1e-2)
+
+    def test_eval_cache(self):
+
+        evaluations = []
+        for cache_size in (None, 10):
+            prob = om.Problem()
+            model = prob.model
+
+            model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+            model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+            model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+            prob.set_solver_print(level=0)
+
+            prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+            if cache_size is not None:
+                prob.driver.options["eval_cache_size"] = cache_size
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+
+            prob.setup()
+            failed = prob.run_driver()
+
+            # Ask for a point again after another one, as NLopt can do
+            start_count = prob.driver.iter_count
+            for x in ([1.0, 2.0], [3.0, 4.0], [1.0, 2.0]):
+                f = prob.driver._objfunc(np.array(x), np.empty(0))
+
+            assert_near_equal(f, 39.0, 1e-9)
+            evaluations.append(prob.driver.iter_count - start_count)
+
+        # By default every point is run, the cache skips the repeated one
+        self.assertEqual(evaluations, [3, 2])
+
+    def test_telemetry_file(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, "telemetry.jsonl")
+
+            prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+            prob.driver.options["telemetry_file"] = fname
+            prob.driver.options["telemetry_flush_interval"] = 0.0
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+            model.add_constraint("c", upper=-15.0)
+
+            prob.setup()
+
+            failed = prob.run_driver()
+
+            with open(fname) as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertGreater(len(records), 1)
+        for record in records:
+            self.assertEqual(
+                set(record), {"iter", "time", "obj", "max_cv", "grad", "cache_hit", "timeout"}
+            )
+
+        # The first point NLopt asks for is the initial design, which was already run.
+        self.assertTrue(records[0]["cache_hit"])
+        self.assertTrue(any(record["grad"] for record in records))
+        assert_near_equal(records[-1]["obj"], prob["f_xy"], 1e-6)
+        assert_near_equal(records[-1]["max_cv"], 0.0, 1e-6)
+
+    def test_telemetry_socket_closed(self):
+        # A dashboard that goes away disables the stream but does not stop the run
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "telemetry.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+            server.listen(1)
+
+            prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+            prob.driver.options["telemetry_file"] = path
+            prob.driver.options["telemetry_flush_interval"] = 0.0
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+
+            prob.setup()
+
+            # The dashboard hangs up as soon as the driver has connected
+            log_evaluation = prob.driver._log_evaluation
+
+            def hang_up(*args):
+                if server.fileno() >= 0:
+                    conn, _ = server.accept()
+                    conn.close()
+                    server.close()
+                log_evaluation(*args)
+
+            prob.driver._log_evaluation = hang_up
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                failed = prob.run_driver()
+
+        self.assertFalse(failed)
+        assert_near_equal(prob["f_xy"], -27.33333, 1e-6)
+        messages = [str(w.message) for w in caught if "Telemetry" in str(w.message)]
+        self.assertEqual(len(messages), 1)
+
+    def test_evaluation_history(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, "history.npy")
+
+            prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+            prob.driver.options["history_file"] = fname
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+            model.add_constraint("c", upper=-15.0)
+
+            prob.setup()
+
+            failed = prob.run_driver()
+
+            history = prob.driver.history
+            saved = np.load(fname)
+            assert_near_equal(saved["obj"], history["obj"], 1e-12)
+
+            self.assertGreater(len(history), 1)
+            self.assertFalse(history.data.flags.writeable)
+            assert_near_equal(history["x"][0], [50.0, 50.0], 1e-12)
+            assert_near_equal(history["x"][-1], [prob["x"][0], prob["y"][0]], 1e-6)
+            assert_near_equal(history["obj"][-1], prob["f_xy"], 1e-6)
+            assert_near_equal(history["con"][-1], prob["c"], 1e-6)
+            self.assertTrue(np.all(np.diff(history["time"]) >= 0.0))
+            self.assertTrue(np.any(history["grad"]))
+            del history, saved
+
+    def test_history_closed_on_telemetry_error(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, "history.npy")
+
+            prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+            prob.driver.options["history_file"] = fname
+            prob.driver.options["telemetry_file"] = os.path.join(
+                tmpdir, "missing", "telemetry.jsonl"
+            )
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+
+            prob.setup()
+
+            with self.assertRaises(FileNotFoundError):
+                prob.run_driver()
+
+            # The history file was still truncated and closed
+            history = prob.driver.history
+            self.assertFalse(history.data.flags.writeable)
+            self.assertEqual(len(np.load(fname)), len(history))
+            del history
+
+    def test_continuation(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem(
+            "comp",
+            om.ExecComp("f = (x - a)**2 + x*y + (y + 4.0)**2 - 3.0"),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f")
+
+        prob.setup()
+        prob.final_setup()
+
+        settings = [{"a": 3.0}, {"a": 4.0}, {"a": 5.0}, {"a": 6.0}]
+        solutions = prob.driver.run_continuation(settings, predictor=True)
+
+        # The optimum moves linearly with a: x = (8 + 4a) / 3, y = -(16 + 2a) / 3
+        for setting, solution in zip(settings, solutions):
+            a = setting["a"]
+            x_exact = [(8.0 + 4.0 * a) / 3.0, -(16.0 + 2.0 * a) / 3.0]
+            assert_near_equal(solution["x"], x_exact, 1e-6)
+
+        # Warm-started solves need fewer evaluations than the cold first one
+        evaluations = [solution["evaluations"] for solution in solutions]
+        self.assertLess(sum(evaluations[1:]), 3 * evaluations[0])
+        assert_near_equal(prob["x"], 10.6666667, 1e-6)
+
+    def test_reuse_layout_between_runs(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+        opt_prob = prob.driver._nlopt_problems["LD_SLSQP"]
+
+        # Only the starting point changes, so the NLopt problem is reused
+        prob["x"] = -20.0
+        prob["y"] = 30.0
+        failed = prob.run_driver()
+        self.assertIs(prob.driver._nlopt_problems["LD_SLSQP"], opt_prob)
+
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+        # A new setup means a new layout
+        prob.setup()
+        failed = prob.run_driver()
+        self.assertIsNot(prob.driver._nlopt_problems["LD_SLSQP"], opt_prob)
+
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+    def test_cached_problems_release_driver(self):
+        # The NLopt problems kept for later runs must not keep the driver alive, with the
+        # model vectors it references
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+        failed = prob.run_driver()
+
+        driver = weakref.ref(prob.driver)
+        del prob
+        gc.collect()
+        self.assertIsNone(driver())
+
+    def test_layout_follows_stages(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(
+            optimizer="LD_LBFGS", global_optimizer="GN_ISRES", global_maxiter=50, seed=0
+        )
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy", "con.c"])
+
+        # Without the global stage, no optimizer handles the constraint
+        prob.driver.options["global_optimizer"] = None
+        prob["x"] = 50.0
+        prob["y"] = 50.0
+        failed = prob.run_driver()
+        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy"])
+
+        # A portfolio with a constrained optimizer brings it back
+        prob.driver.options["portfolio"] = ["LD_LBFGS", "LD_SLSQP"]
+        prob["x"] = 50.0
+        prob["y"] = 50.0
+        failed = prob.run_driver()
+        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy", "con.c"])
+
+    def test_speculative_gradients(self):
+
+        results = []
+        for speculative in (False, True):
+            prob = om.Problem()
+            model = prob.model
+
+            model.add_subsystem("p1", om.IndepVarComp("x", 0.0), promotes=["*"])
+            model.add_subsystem("p2", om.IndepVarComp("y", -20.0), promotes=["*"])
+            model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+            model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+            prob.set_solver_print(level=0)
+
+            prob.driver = NLoptDriver(
+                optimizer="LD_SLSQP", tol=1e-9, speculative_gradients=speculative
+            )
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+            model.add_constraint("c", upper=-15.0)
+
+            prob.setup()
+            with mock.patch.object(
+                NLoptDriver, "_compute_nl_totals", autospec=True,
+                side_effect=NLoptDriver._compute_nl_totals,
+            ) as totals:
+                failed = prob.run_driver()
+
+            assert_near_equal(prob["x"], 7.16667, 1e-6)
+            assert_near_equal(prob["y"], -7.833334, 1e-6)
+            self.assertIsNone(prob.driver._grad_executor)
+            self.assertIsNone(prob.driver._speculative_grad)
+            results.append((prob.driver.iter_count, prob.driver.history["x"].copy(),
+                            totals.call_count, prob.driver.speculative_hits))
+
+        # The background gradients do not change the course of the optimization
+        self.assertEqual(results[0][0], results[1][0])
+        assert_near_equal(results[1][1], results[0][1], 1e-12)
+
+        # The line search points that SLSQP accepts get their gradients in the background,
+        # and the points it rejects do not cost gradients
+        self.assertEqual(results[0][3], 0)
+        self.assertEqual(results[1][3], 2)
+        self.assertEqual(results[1][2], results[0][2])
+
+    def test_reuse_totals_plan_between_runs(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+        model.add_subsystem("lin", om.ExecComp("d = x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+        model.add_constraint("d", upper=100.0, linear=True)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+        plan = prob.driver._totals_plan
+        self.assertIsNotNone(plan)
+        self.assertFalse(plan.has_lin_cons)
+
+        # The plan of the nonlinear responses survives the next run
+        prob["x"] = -20.0
+        prob["y"] = 30.0
+        failed = prob.run_driver()
+        self.assertIs(prob.driver._totals_plan, plan)
+
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+        # Gradients from the reused plan match a freshly computed Jacobian
+        totals = prob.compute_totals(of=["f_xy", "c"], wrt=["x", "y"], return_format="array")
+        assert_near_equal(prob.driver._compute_nl_totals(), totals, 1e-10)
+
+    def test_global_local_pipeline(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+        prob.driver.options["global_optimizer"] = "GN_DIRECT_L"
+        prob.driver.options["global_maxiter"] = 50
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        history = prob.driver.stage_history
+        self.assertEqual([stage["optimizer"] for stage in history], ["GN_DIRECT_L", "LD_SLSQP"])
+        self.assertEqual(history[0]["evaluations"], 50)
+        self.assertLess(history[1]["evaluations"], 20)
+
+        # Optimal solution (minimum): x = 6.6667; y = -7.3333
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_global_stage_constraints(self):
+        # The global optimizer handles the constraint even though the local one does not
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_LBFGS", maxiter=1)
+        prob.driver.options["global_optimizer"] = "GN_ORIG_DIRECT_L"
+        prob.driver.options["global_maxiter"] = 300
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", lower=10.0)
+
+        prob.setup()
+        prob.run_driver()
+
+        # The constrained minimum is f = 58 at x = 12, y = -2. Without the constraint,
+        # DIRECT searches around the unconstrained minimum and its best feasible point
+        # has f close to 79.
+        self.assertGreater(prob["c"], 10.0 - 1e-6)
+        self.assertLess(prob["f_xy"], 62.0)
+
+    def test_auto_scale_badly_scaled(self):
+        # The three design variables differ by several orders of magnitude, which makes
+        # SLSQP stop far from the optimum unless the problem is rescaled.
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem(
+            "p", om.IndepVarComp("x", np.array([1.0, 1.0e4, 1.0e-3])), promotes=["*"]
+        )
+        model.add_subsystem(
+            "comp",
+            om.ExecComp(
+                [
+                    "f = (x[0] - 3.0)**2 + 1.0e-6 * (x[1] - 2.0e3)**2 "
+                    "+ 1.0e6 * (x[2] - 5.0e-3)**2 + 1.0e-3 * x[0] * x[1] + 10.0 * x[0] * x[2]",
+                    "c = x[0] + 1.0e-3 * x[1] + 1.0e3 * x[2]",
+                ],
+                x=np.ones(3),
+            ),
+            promotes=["*"],
+        )
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-10, auto_scale=True)
+
+        model.add_design_var(
+            "x", lower=np.array([-10.0, -1.0e5, -1.0]), upper=np.array([10.0, 1.0e5, 1.0])
+        )
+        model.add_objective("f")
+        model.add_constraint("c", upper=8.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        assert_near_equal(prob["f"], 3.83859367, 1e-6)
+        assert_near_equal(prob["x"], [2.5473, 595.88, 4.8568e-3], 1e-3)
+        assert_near_equal(prob["c"], 8.0, 1e-6)
+
+    def test_blocked_jacobian(self):
+
+        results = []
+        for limit in (None, 1e-6):
+            prob = om.Problem()
+            model = prob.model
+
+            model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+            model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+            model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+            model.add_subsystem(
+                "cons",
+                om.ExecComp(
+                    ["c = - x + y", "d = a * x + b * y", "g = x + 2.0 * y"],
+                    d=np.ones(3),
+                    a=np.array([1.0, 1.0, 0.0]),
+                    b=np.array([-1.0, 0.0, 1.0]),
+                ),
+                promotes=["*"],
+            )
+
+            prob.set_solver_print(level=0)
+
+            prob.driver = NLoptDriver(
+                optimizer="LD_SLSQP", tol=1e-9, auto_scale=True, jac_memory_limit=limit
+            )
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+            model.add_constraint("c", upper=-15.0)
+            model.add_constraint("d", upper=40.0)
+            model.add_constraint("g", lower=-20.0, linear=True)
+
+            prob.setup()
+            failed = prob.run_driver()
+
+            assert_near_equal(prob["x"], 7.16667, 1e-6)
+            assert_near_equal(prob["y"], -7.833334, 1e-6)
+            results.append(prob.driver)
+
+        # One response per block, with the linear constraint kept in a temporary file
+        blocked = results[1]
+        self.assertEqual(
+            [block[0] for block in blocked._jac_blocks], [["comp.f_xy"], ["cons.c"], ["cons.d"]]
+        )
+        self.assertIsInstance(blocked._lincongrad_cache, np.memmap)
+
+        assert_near_equal(blocked._x_scale, results[0]._x_scale, 1e-12)
+        self.assertEqual(blocked.iter_count, results[0].iter_count)
+        assert_near_equal(blocked.history["x"], results[0].history["x"], 1e-10)
+
+    def test_portfolio_race(self):
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-9)
+        prob.driver.options["portfolio"] = ["LD_SLSQP", "LD_MMA", "LN_COBYLA"]
+        prob.driver.options["portfolio_maxtime"] = 60.0
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        history = prob.driver.stage_history
+        self.assertEqual(
+            [stage["optimizer"] for stage in history], ["LD_SLSQP", "LD_MMA", "LN_COBYLA"]
+        )
+        self.assertEqual(sum(stage["winner"] for stage in history), 1)
+        self.assertEqual([stage["attempt"] for stage in history], [0, 0, 0])
+
+        # Minimum should be at (7.166667, -7.833334)
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.833334, 1e-4)
+
+    def test_portfolio_gradients(self):
+        # The gradient-based members of the portfolio get gradients even though the main
+        # optimizer is derivative-free
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="LN_COBYLA", tol=1e-9)
+        prob.driver.options["portfolio"] = ["LD_SLSQP", "LD_MMA"]
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0, linear=True)
+
+        prob.setup()
+        prob.final_setup()
+        self.assertTrue(prob.driver.supports["gradients"])
+
+        prob.run_driver()
+
+        self.assertEqual(prob.driver._obj_and_nlcons, ["comp.f_xy"])
+        assert_near_equal(prob["x"], 7.16667, 1e-4)
+        assert_near_equal(prob["y"], -7.833334, 1e-4)
+
+    def test_restart_after_failure(self):
+        # The noise makes LBFGS fail before reaching the optimum, and a restart from the
+        # best point found by then converges once the noise is gone.
+
+        def build(**options):
+            prob = om.Problem()
+            model = prob.model
+
+            model.add_subsystem(
+                "p", om.IndepVarComp("x", np.array([4.0, -3.0])), promotes=["*"]
+            )
+            model.add_subsystem("comp", TransientNoiseComp(), promotes=["*"])
+
+            prob.set_solver_print(level=0)
+
+            prob.driver = NLoptDriver(optimizer="LD_LBFGS", **options)
+
+            model.add_design_var("x", lower=-5.0, upper=5.0)
+            model.add_objective("f")
+
+            prob.setup()
+            return prob
+
+        prob = build()
+        with self.assertRaises(RuntimeError):
+            prob.run_driver()
+        self.assertEqual(prob.driver.stage_history[0]["result"], nlopt.FAILURE)
+
+        for options in ({}, {"restart_perturbation": 0.01, "seed": 3}):
+            prob = build(restarts=2, **options)
+            prob.run_driver()
+
+            history = prob.driver.stage_history
+            self.assertEqual([stage["attempt"] for stage in history], [0, 1])
+            self.assertEqual(history[0]["result"], nlopt.FAILURE)
+            self.assertEqual(prob.driver.result, nlopt.SUCCESS)
+            self.assertEqual(
+                sum(stage["evaluations"] for stage in history), prob.driver.iter_count - 1
+            )
+            assert_near_equal(prob["x"], [1.0, 1.0], 1e-6)
+
+        prob = build(restarts=2, auto_scale=True, restart_rescale=True)
+        prob.model.comp.options["amplitude"] = 1e-3
+        prob.run_driver()
+
+        self.assertEqual(len(prob.driver.stage_history), 2)
+        assert_near_equal(prob["x"], [1.0, 1.0], 1e-6)
+
+    def test_eval_timeout(self):
+        # The optimizers step into the region where the model hangs, get the penalty there
+        # and carry on to the optimum.
+        for optimizer in ("LN_COBYLA", "LD_SLSQP"):
+            prob = om.Problem()
+            model = prob.model
+
+            model.add_subsystem("comp", HangingParaboloid(), promotes=["*"])
+            model.set_input_defaults("x", 0.0)
+            model.set_input_defaults("y", 0.0)
+
+            prob.driver = NLoptDriver(optimizer=optimizer, tol=1e-9, eval_timeout=0.1)
+
+            model.add_design_var("x", lower=-50.0, upper=50.0)
+            model.add_design_var("y", lower=-50.0, upper=50.0)
+            model.add_objective("f_xy")
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                filename = os.path.join(tmpdir, "cases.sql")
+                prob.driver.add_recorder(om.SqliteRecorder(filename))
+                prob.setup()
+
+                start_time = time.perf_counter()
+                prob.run_driver()
+                self.assertLess(time.perf_counter() - start_time, 30.0)
+                prob.cleanup()
+
+                cr = om.CaseReader(filename)
+                cases = cr.list_cases("driver", recurse=False, out_stream=None)
+                failed = [cr.get_case(case) for case in cases if not cr.get_case(case).success]
+
+            self.assertEqual(prob.driver.timeout_count, 1)
+            self.assertEqual(len(failed), 1)
+            self.assertEqual(
+                failed[0].msg, "Evaluation exceeded 'eval_timeout' and was aborted."
+            )
+            assert_near_equal(prob["x"], 6.66666667, 1e-4)
+            assert_near_equal(prob["y"], -7.33333333, 1e-4)
+
+    def test_partial_evaluation_GN_AGS(self):
+        # AGS evaluates the constraint first and only evaluates the objective at points
+        # that satisfy it, so the objective component does not run at every point.
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+        model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+        prob.set_solver_print(level=0)
+
+        prob.driver = NLoptDriver(optimizer="GN_AGS", maxiter=200)
+        prob.driver.options["partial_evaluation"] = True
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+        model.add_constraint("c", upper=-15.0)
+
+        prob.setup()
+
+        failed = prob.run_driver()
+
+        self.assertLess(model.comp.iter_count, model.con.iter_count)
+        self.assertLessEqual(prob["c"][0], -15.0)
+        assert_near_equal(prob["f_xy"], -27.0833, 0.05)
+
+
+@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+class TestNLoptDriverFeatures(unittest.TestCase):
+    def test_feature_basic(self):
+        import openmdao.api as om
+        from openmdao.test_suite.components.paraboloid import Paraboloid
+        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["optimizer"] = "LD_SLSQP"
+        prob.driver.options["tol"] = 1e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_feature_optimizer(self):
+        import openmdao.api as om
+        from openmdao.test_suite.components.paraboloid import Paraboloid
+        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.driver = NLoptDriver(optimizer="LD_SLSQP")
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_feature_maxiter(self):
+        import openmdao.api as om
+        from openmdao.test_suite.components.paraboloid import Paraboloid
+        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["maxiter"] = 20
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+
+    def test_feature_tol(self):
+        import openmdao.api as om
+        from openmdao.test_suite.components.paraboloid import Paraboloid
+        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+        prob = om.Problem()
+        model = prob.model
+
+        model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+        model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+        model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+
+        prob.driver = NLoptDriver()
+        prob.driver.options["tol"] = 1.0e-9
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_objective("f_xy")
+
+        prob.setup()
+
+        prob.run_driver()
+
+        assert_near_equal(prob["x"], 6.66666667, 1e-6)
+        assert_near_equal(prob["y"], -7.3333333, 1e-6)
+        
+@unittest.skipUnless(MPI and PETScVector and nlopt, "MPI, PETSc and NLopt are required.")
+class TestNLoptDriverMPI(unittest.TestCase):
+
+    N_PROCS = 2
+
+    def _build_dist_problem(self, size):
+        prob = om.Problem()
+        model = prob.model
+
+        # Design variable x is distributed over the processes
+        comm = MPI.COMM_WORLD
+        sizes, offsets = evenly_distrib_idxs(comm.size, size)
+        dist_ivc = om.IndepVarComp(distributed=True)
+        dist_ivc.add_output("x", np.ones(sizes[comm.rank]))
+
+        ivc = om.IndepVarComp()
+        ivc.add_output("y", np.ones((size,)))
+        ivc.add_output("a", -3.0 + 0.6 * np.arange(size))
+
+        model.add_subsystem("dist_p", dist_ivc, promotes=["*"])
+        model.add_subsystem("p", ivc, promotes=["*"])
+        model.add_subsystem("parab", DistParab(arr_size=size, deriv_type="dense"))
+        model.connect("y", "parab.y")
+        model.connect("a", "parab.a")
+        model.connect("x", "parab.x")
+        model.add_subsystem(
+            "sum",
+            om.ExecComp("f_sum = sum(f_xy)", f_sum=np.ones((size,)), f_xy=np.ones((size,))),
+        )
+        model.connect("parab.f_xy", "sum.f_xy")
+
+        model.add_design_var("x", lower=-50.0, upper=50.0)
+        model.add_design_var("y", lower=-50.0, upper=50.0)
+        model.add_constraint("parab.f_xy", lower=0.0)
+        model.add_objective("sum.f_sum", index=-1)
+
+        return prob
+
+    def test_distributed_desvars_gather_to_root(self):
+        size = 7
+        prob = self._build_dist_problem(size)
+
+        prob.driver = NLoptDriver(optimizer="LD_MMA", tol=1e-9, gather_to_root=True)
+
+        prob.setup()
+        prob.run_driver()
+
+        obj = prob.driver.get_objective_values()
+        con = prob.driver.get_constraint_values()
+
+        assert_near_equal(obj["sum.f_sum"], 0.0, 2e-6)
+        assert_near_equal(con["parab.f_xy"], np.zeros(size), 1e-5)
+
+        # Every rank ends at the same optimum and knows the result of the root rank
+        self.assertEqual(prob.driver.result, nlopt.FTOL_REACHED)
+
+    def test_gather_to_root_restart_rescale(self):
+        prob = self._build_dist_problem(7)
+
+        prob.driver = NLoptDriver(
+            optimizer="LD_MMA", gather_to_root=True, auto_scale=True, restart_rescale=True
+        )
+
+        prob.setup()
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.final_setup()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "NLoptDriver: Option 'restart_rescale' cannot be used with 'gather_to_root'.",
+        )
+
+
+@unittest.skipUnless(nlopt is None, "only run if NLopt is NOT installed.")
+class TestNotInstalled(unittest.TestCase):
+
+    def test_nlopt_not_installed(self):
+        # the import should not fail
+        from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+
+        # but we get a RuntimeError if we try to instantiate
+        with self.assertRaises(RuntimeError) as ctx:
+            NLoptDriver()
+
+        self.assertEqual(str(ctx.exception),
+                         'NLoptDriver is not available, NLopt is not installed.')
+
+
+if __name__ == "__main__":
+    unittest.main()
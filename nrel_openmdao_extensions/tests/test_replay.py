@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import openmdao.api as om
+from openmdao.test_suite.components.paraboloid import Paraboloid
+from openmdao.utils.assert_utils import assert_near_equal
+
+try:
+    import nlopt
+    from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+    from nrel_openmdao_extensions.replay import ReplayDatabase
+except ImportError:
+    nlopt = None
+
+
+def build_paraboloid_problem(**options):
+    prob = om.Problem()
+    model = prob.model
+
+    model.add_subsystem("p1", om.IndepVarComp("x", 50.0), promotes=["*"])
+    model.add_subsystem("p2", om.IndepVarComp("y", 50.0), promotes=["*"])
+    model.add_subsystem("comp", Paraboloid(), promotes=["*"])
+    model.add_subsystem("con", om.ExecComp("c = - x + y"), promotes=["*"])
+
+    prob.set_solver_print(level=0)
+
+    prob.driver = NLoptDriver(**options)
+
+    model.add_design_var("x", lower=-50.0, upper=50.0)
+    model.add_design_var("y", lower=-50.0, upper=50.0)
+    model.add_objective("f_xy")
+    model.add_constraint("c", upper=-15.0)
+
+    prob.setup()
+    return prob
+
+
+@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+class TestReplayDatabase(unittest.TestCase):
+
+    def test_replay_case_database(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "cases.sql")
+
+            prob = build_paraboloid_problem(optimizer="LD_SLSQP", tol=1e-9)
+            prob.driver.add_recorder(om.SqliteRecorder(filename))
+            prob.driver.recording_options["record_derivatives"] = True
+            prob.run_driver()
+            prob.cleanup()
+            num_evals = prob.driver.iter_count
+
+            # The same settings ask for the recorded points only
+            replay = ReplayDatabase(filename)
+            prob = build_paraboloid_problem(optimizer="LD_SLSQP", tol=1e-9, replay=replay)
+            prob.run_driver()
+
+        self.assertEqual(replay.misses, [])
+        self.assertEqual(prob.model.comp.iter_count, 0)
+        self.assertEqual(prob.driver.iter_count, num_evals - 1)
+
+        assert_near_equal(prob["x"], 7.16667, 1e-6)
+        assert_near_equal(prob["y"], -7.833334, 1e-6)
+
+    def test_replay_history(self):
+        prob = build_paraboloid_problem(optimizer="LN_COBYLA", tol=1e-9)
+        prob.run_driver()
+        history = prob.driver.history
+        x_opt = np.array([prob["x"][0], prob["y"][0]])
+
+        # A looser tolerance stops earlier on the recorded trajectory
+        replay = ReplayDatabase(history)
+        prob = build_paraboloid_problem(optimizer="LN_COBYLA", tol=1e-4, replay=replay)
+        prob.run_driver()
+
+        self.assertEqual(replay.misses, [])
+        self.assertEqual(prob.model.comp.iter_count, 0)
+        self.assertLess(prob.driver.iter_count, len(history))
+        assert_near_equal(np.array([prob["x"][0], prob["y"][0]]), x_opt, 1e-3)
+
+        # Points off the trajectory are approximated and flagged
+        replay = ReplayDatabase(history)
+        prob = build_paraboloid_problem(optimizer="LD_SLSQP", tol=1e-6, replay=replay)
+        prob.run_driver()
+
+        self.assertGreater(len(replay.misses), 0)
+        self.assertEqual(prob.model.comp.iter_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_near_equal
+from openmdao.utils.mpi import MPI
+
+try:
+    import nlopt
+    from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+    from nrel_openmdao_extensions.scenarios import ScenarioSet
+except ImportError:
+    nlopt = None
+
+try:
+    from openmdao.vectors.petsc_vector import PETScVector
+except ImportError:
+    PETScVector = None
+
+
+LOAD_CASES = [{"a": a} for a in (1.0, 2.0, 3.0, 4.0)]
+
+
+class LoadCase(om.ExplicitComponent):
+    def setup(self):
+        self.add_input("x", 0.0)
+        self.add_input("y", 0.0)
+        self.add_input("a", 0.0)
+        self.add_output("f", 0.0)
+        self.add_output("g", 0.0)
+        self.declare_partials("*", ["x", "y"])
+
+    def compute(self, inputs, outputs):
+        x, y, a = inputs["x"], inputs["y"], inputs["a"]
+        outputs["f"] = (x - a) ** 2 + (y + a) ** 2
+        outputs["g"] = x + a * y
+
+    def compute_partials(self, inputs, partials):
+        x, y, a = inputs["x"], inputs["y"], inputs["a"]
+        partials["f", "x"] = 2.0 * (x - a)
+        partials["f", "y"] = 2.0 * (y + a)
+        partials["g", "x"] = 1.0
+        partials["g", "y"] = a
+
+
+def build_load_case_problem(setting=None, comm=None, **options):
+    prob = om.Problem(comm=comm)
+    model = prob.model
+
+    model.add_subsystem("p1", om.IndepVarComp("x", 3.0), promotes=["*"])
+    model.add_subsystem("p2", om.IndepVarComp("y", -2.0), promotes=["*"])
+    model.add_subsystem("load", LoadCase(), promotes=["*"])
+    model.set_input_defaults("a", 0.0)
+
+    prob.set_solver_print(level=0)
+
+    prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-10, **options)
+
+    model.add_design_var("x", lower=-10.0, upper=10.0)
+    model.add_design_var("y", lower=-10.0, upper=10.0)
+    model.add_objective("f")
+    model.add_constraint("g", upper=-4.0)
+
+    prob.setup()
+    if setting is not None:
+        prob.set_val("a", setting["a"])
+    return prob
+
+
+@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+class TestScenarioSet(unittest.TestCase):
+
+    def test_aggregation_rules(self):
+        # The mean objective is minimized with the constraint on the mean, largest or KS
+        # aggregate of the load cases.
+        expected = {
+            "sum": [2.46551724, -2.58620690],
+            "max": [0.5, -4.5],
+            "ks": [0.5, -4.5],
+        }
+        for rule, x_opt in expected.items():
+            scenarios = ScenarioSet(LOAD_CASES, aggregation={"load.g": rule}, num_procs=2)
+            prob = build_load_case_problem(scenarios=scenarios)
+            prob.run_driver()
+
+            assert_near_equal([prob["x"][0], prob["y"][0]], x_opt, 1e-6)
+
+        # The model of the problem is left at the optimum in its own setting
+        assert_near_equal(prob["f"], 0.5 ** 2 + 4.5 ** 2, 1e-6)
+
+    def test_build_problem(self):
+        # Each scenario gets its own problem, and their weights favor the first one
+        weights = [0.4, 0.3, 0.2, 0.1]
+        scenarios = ScenarioSet(
+            LOAD_CASES, weights=weights, build_problem=build_load_case_problem, num_procs=3
+        )
+        prob = build_load_case_problem(scenarios=scenarios)
+        prob.run_driver()
+
+        # The weighted sum of the objectives is a paraboloid centered on (a_mean, -a_mean),
+        # and the optimum is the projection of its center onto x + a_mean * y = -4.
+        a_mean = np.dot(weights, [1.0, 2.0, 3.0, 4.0])
+        t = (a_mean - a_mean ** 2 + 4.0) / (1.0 + a_mean ** 2)
+        assert_near_equal(prob["x"], a_mean - t, 1e-6)
+        assert_near_equal(prob["y"], -a_mean - t * a_mean, 1e-6)
+
+    def test_ks_derivatives(self):
+        scenarios = ScenarioSet(LOAD_CASES, aggregation={"g": "ks"}, ks_rho=5.0)
+        values = np.array([[1.0, -2.0], [1.2, 0.5], [0.7, 0.4], [-1.0, 0.0]])
+        jacs = np.arange(24.0).reshape(4, 2, 3)
+
+        value, jac = scenarios._aggregate("g", values, jacs)
+        self.assertTrue(np.all(value > np.max(values, axis=0)))
+
+        # Chain rule through the KS function, with its derivatives by finite differences
+        step = 1e-7
+        expected = np.zeros((2, 3))
+        for i in range(4):
+            perturbed = values.copy()
+            perturbed[i] += step
+            dvalue = (scenarios._aggregate("g", perturbed)[0] - value) / step
+            expected += dvalue[:, np.newaxis] * jacs[i]
+        assert_near_equal(jac, expected, 1e-5)
+
+    def test_scenario_errors(self):
+        with self.assertRaises(ValueError):
+            ScenarioSet(LOAD_CASES, aggregation={"load.g": "min"})
+        with self.assertRaises(ValueError):
+            ScenarioSet(LOAD_CASES, weights=[1.0, 2.0])
+
+        prob = build_load_case_problem(
+            scenarios=ScenarioSet(LOAD_CASES), portfolio=["LD_SLSQP", "LD_MMA"]
+        )
+        with self.assertRaises(RuntimeError) as raises_cm:
+            prob.final_setup()
+        self.assertEqual(
+            str(raises_cm.exception),
+            "NLoptDriver: Option 'portfolio' cannot be used with scenarios.",
+        )
+
+
+@unittest.skipUnless(MPI and PETScVector and nlopt, "MPI, PETSc and NLopt are required.")
+class TestScenarioSetMPI(unittest.TestCase):
+
+    N_PROCS = 2
+
+    def test_sub_communicators(self):
+        scenarios = ScenarioSet(
+            LOAD_CASES, aggregation={"load.g": "max"}, build_problem=build_load_case_problem
+        )
+        prob = build_load_case_problem(scenarios=scenarios)
+        prob.run_driver()
+
+        assert_near_equal([prob["x"][0], prob["y"][0]], [0.5, -4.5], 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_near_equal
+from nrel_openmdao_extensions.sweep import pareto_sweep, _solve_setting
+
+try:
+    import nlopt
+    from nrel_openmdao_extensions.nlopt_driver import NLoptDriver
+except ImportError:
+    nlopt = None
+
+
+def build_epsilon_problem(eps):
+    # Minimize f1 with f2 bounded by eps. The trade-off between the two lies on y = 0
+    # with x between -1 and 1.
+    prob = om.Problem()
+    model = prob.model
+
+    model.add_subsystem("p1", om.IndepVarComp("x", 3.0), promotes=["*"])
+    model.add_subsystem("p2", om.IndepVarComp("y", 2.0), promotes=["*"])
+    model.add_subsystem("f1", om.ExecComp("f1 = (x - 1.0)**2 + y**2"), promotes=["*"])
+    model.add_subsystem("f2", om.ExecComp("f2 = (x + 1.0)**2 + y**2"), promotes=["*"])
+
+    prob.set_solver_print(level=0)
+
+    prob.driver = NLoptDriver(optimizer="LD_SLSQP", tol=1e-8)
+
+    model.add_design_var("x", lower=-5.0, upper=5.0)
+    model.add_design_var("y", lower=-5.0, upper=5.0)
+    model.add_objective("f1")
+    model.add_constraint("f2", upper=eps)
+
+    prob.setup()
+    return prob
+
+
+def build_limited_problem(eps):
+    # Too few evaluations for SLSQP to converge
+    prob = build_epsilon_problem(eps)
+    prob.driver.options["maxiter"] = 3
+    return prob
+
+
+@unittest.skipIf(nlopt is None, "only run if NLopt is installed.")
+class TestParetoSweep(unittest.TestCase):
+
+    def test_epsilon_constraint_sweep(self):
+        settings = [0.5, 1.5, 2.5, 3.5]
+        front = pareto_sweep(build_epsilon_problem, settings, ["f1", "f2"], num_procs=2)
+
+        self.assertFalse(np.any(front["failed"]))
+        self.assertTrue(np.all(front["pareto"]))
+        self.assertEqual(front["objectives"].shape, (4, 2))
+        self.assertEqual(len(front["status"]), 4)
+
+        # On the front, x = sqrt(eps) - 1 and f1 = (sqrt(eps) - 2)**2
+        x_exact = np.sqrt(settings) - 1.0
+        assert_near_equal(front["x"][:, 0], x_exact, 1e-5)
+        assert_near_equal(front["objectives"][:, 0], (x_exact - 1.0)**2, 1e-5)
+        assert_near_equal(front["objectives"][:, 1], settings, 1e-5)
+
+    def test_warm_start(self):
+        settings = [0.5, 1.5, 2.5, 3.5]
+        cold = pareto_sweep(
+            build_epsilon_problem, settings, ["f1", "f2"], num_procs=1, warm_start=False
+        )
+        warm = pareto_sweep(build_epsilon_problem, settings, ["f1", "f2"], num_procs=1)
+
+        assert_near_equal(warm["objectives"], cold["objectives"], 1e-5)
+        self.assertLess(np.sum(warm["evaluations"]), np.sum(cold["evaluations"]))
+
+    def test_roundoff_limited(self):
+        # Started on the front of another setting, SLSQP reaches the bound of this one and
+        # then stops with a roundoff error, which is a converged solution
+        x0 = {"p1.x": np.sqrt(1.5) - 1.0, "p2.y": 0.0}
+        with self.assertRaises(nlopt.RoundoffLimited):
+            prob = build_epsilon_problem(0.5)
+            prob.final_setup()
+            for name, value in x0.items():
+                prob.driver.set_design_var(name, value)
+            prob.run_driver()
+
+        with self.assertWarns(UserWarning):
+            result = _solve_setting(build_epsilon_problem, 0.5, ["f1", "f2"], x0)
+
+        self.assertFalse(result["failed"])
+        self.assertEqual(result["status"], nlopt.ROUNDOFF_LIMITED)
+        assert_near_equal(result["x"], [np.sqrt(0.5) - 1.0, 0.0], 1e-6)
+        assert_near_equal(result["objectives"][1], 0.5, 1e-6)
+
+    def test_returns_start(self):
+        # Started at the optimum of a tighter bound, SLSQP evaluates the optimum of this
+        # one but returns its starting point
+        x0 = {"p1.x": np.sqrt(0.5) - 1.0, "p2.y": 0.0}
+        prob = build_epsilon_problem(1.5)
+        prob.final_setup()
+        for name, value in x0.items():
+            prob.driver.set_design_var(name, value)
+        prob.run_driver()
+
+        assert_near_equal(prob["x"], np.sqrt(0.5) - 1.0, 1e-12)
+
+        result = _solve_setting(build_epsilon_problem, 1.5, ["f1", "f2"], x0)
+
+        self.assertFalse(result["failed"])
+        assert_near_equal(result["x"], [np.sqrt(1.5) - 1.0, 0.0], 1e-5)
+        assert_near_equal(result["objectives"][1], 1.5, 1e-5)
+
+    def test_failed_status(self):
+        front = pareto_sweep(build_limited_problem, [0.5, 1.5], ["f1", "f2"], num_procs=1)
+
+        self.assertTrue(np.all(front["failed"]))
+        self.assertFalse(np.any(front["pareto"]))
+        self.assertEqual(front["status"], [nlopt.MAXEVAL_REACHED] * 2)
+
+    def test_without_fork(self):
+        # Platforms that cannot fork, such as Windows, solve the settings one by one
+        settings = [0.5, 1.5, 2.5]
+        with mock.patch("multiprocessing.get_all_start_methods", return_value=["spawn"]):
+            front = pareto_sweep(build_epsilon_problem, settings, ["f1", "f2"], num_procs=2)
+
+        self.assertFalse(np.any(front["failed"]))
+        assert_near_equal(front["objectives"][:, 1], settings, 1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
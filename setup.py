@@ -39,12 +39,20 @@ metadata = dict(
     classifiers=[_f for _f in CLASSIFIERS.split("\n") if _f],
     packages=["nrel_openmdao_extensions"],
     install_requires=["openmdao"],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     zip_safe=True,
     keywords="openmdao openmdao_driver",
     entry_points={
         "openmdao_driver": [
-            "nlopt_driver = nrel_openmdao_extensions.nrel_openmdao_extensions.nlopt_driver:NLoptDriver",
+            "nlopt_driver = nrel_openmdao_extensions.nlopt_driver:NLoptDriver",
+            "differential_evolution_driver = "
+            "nrel_openmdao_extensions.differential_evolution_driver:DifferentialEvolutionDriver",
+            "bayesian_optimization_driver = "
+            "nrel_openmdao_extensions.bayesian_optimization_driver:BayesianOptimizationDriver",
+        ],
+        "openmdao_component": [
+            "intermittent_component = "
+            "nrel_openmdao_extensions.intermittent_component:IntermittentComponent",
         ],
     },
 )